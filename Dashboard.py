@@ -1,46 +1,21 @@
 import streamlit as st
-import json
-import os
-import plotly.graph_objects as go
-import pandas as pd
-from PIL import Image
-
-DATA_FILE = "kpi_data.json"
-
-# Daten laden oder initialisieren
-if os.path.exists(DATA_FILE):
-    with open(DATA_FILE, "r") as f:
-        kpi_data = json.load(f)
-else:
-    kpi_data = {"monatsziele": {"Umsatz": 500, "Gewinn": 500}, "wochenwerte": {}}
-
-# Funktion zum Speichern der Daten
-def save_data():
-    with open(DATA_FILE, "w") as f:
-        json.dump(kpi_data, f, indent=4)
-
-def create_gauge(title, value, max_value):
-    fig = go.Figure(go.Indicator(
-        mode = "gauge+number+delta",
-        value = value,
-        domain = {'x': [0, 1], 'y': [0, 1]},
-        title = {'text': title, 'font': {'size': 14}},
-        delta = {'reference': max_value, 'increasing': {'color': "green"}, 'decreasing': {'color': "red"}},
-        gauge = {
-            'axis': {'range': [None, max_value], 'tickwidth': 1, 'tickcolor': "darkblue"},
-            'bar': {'color': "lightgray"},
-            'bgcolor': "white",
-            'borderwidth': 2,
-            'bordercolor': "gray",
-            'steps': [
-                {'range': [0, value], 'color': "blue"}
-            ],
-            'threshold' : {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': value}}))
-    fig.update_layout(width=300, height=250, margin=dict(l=10, r=10, t=30, b=10), paper_bgcolor="rgba(0,0,0,0)", font={'color': "darkblue", 'family': "Arial"})
-    return fig
+from kpi_store import get_kpi_store
+from kpi_history import get_history_engine
+from kpi_analytics import get_kpi_analytics, select_stage
+from gauges import GaugePanel
+from instrumentation import tracer
+
+@st.cache_resource
+def load_image(path):
+    # Bild nur einmal pro Prozess laden und dekodieren
+    from PIL import Image
+    image = Image.open(path)
+    image.load()
+    return image
+
+# Gemeinsamer KPI-Speicher (SQLite) für alle Seiten und Sessions
+store = get_kpi_store()
+
 # Wochenwerte und -übersicht
 st.subheader("Wochenwerte & Wochenübersicht")
 aktuelle_woche = st.number_input("Aktuelle Woche", min_value=1, step=1)
@@ -61,75 +36,110 @@ st.markdown(
 st.markdown("<h1 style='text-align: center; color: #007bff; font-family: Cursive;'>Gabi's Antikmöbel-Erfolge</h1>", unsafe_allow_html=True)
 
 # Bild mit Styling
-image = Image.open("th.jpg")
+image = load_image("th.jpg")
 st.image(image, use_container_width=False, width=400)
 
 # Standard KPIs
 default_monatsziele = ["Anzahl Einkäufe", "Ausgabenbudget", "Anzahl Verkäufe", "Umsatz", "Gewinn"]
-monatsziele_keys = list(kpi_data.get("monatsziele", default_monatsziele))
+monatsziele = store.monatsziele()
+monatsziele_keys = list(monatsziele or default_monatsziele)
 
 # Anzahl der Spalten für Wochenwerte
 number_of_wochenwerte_columns = len(monatsziele_keys)
 wochenwerte_columns = st.columns(number_of_wochenwerte_columns)
 
-if str(aktuelle_woche) not in kpi_data["wochenwerte"]:
-    kpi_data["wochenwerte"][str(aktuelle_woche)] = {}
+# Nur die angezeigte Woche laden und nur geänderte Zellen speichern
+wochenwerte = store.wochenwerte([aktuelle_woche])[aktuelle_woche]
 
 for kpi_index, kpi_name in enumerate(monatsziele_keys):
-    if kpi_name not in kpi_data["wochenwerte"][str(aktuelle_woche)]:
-        kpi_data["wochenwerte"][str(aktuelle_woche)][kpi_name] = 0
-    kpi_data["wochenwerte"][str(aktuelle_woche)][kpi_name] = wochenwerte_columns[kpi_index].number_input(
+    alter_wert = wochenwerte.get(kpi_name, 0)
+    wochenwerte[kpi_name] = wochenwerte_columns[kpi_index].number_input(
         f"Wert für {kpi_name} (Woche {aktuelle_woche})",
-        value=kpi_data["wochenwerte"][str(aktuelle_woche)][kpi_name],
+        value=alter_wert,
         key=f"wochenwert_{kpi_name}_{aktuelle_woche}",
         step=100 if kpi_name in ("Umsatz", "Gewinn") else 1
     )
-save_data()
-
-# Wochenübersicht (Tachos)
-if str(aktuelle_woche) in kpi_data["wochenwerte"]:
-    for kpi_index, kpi_name in enumerate(monatsziele_keys):
-        with wochenwerte_columns[kpi_index]:
-            if kpi_data["monatsziele"].get(kpi_name, 0) != 0:
-                prozentsatz = (kpi_data["wochenwerte"][str(aktuelle_woche)][kpi_name] / kpi_data["monatsziele"][kpi_name]) * 100
-                st.plotly_chart(create_gauge(kpi_name, prozentsatz, 100), use_container_width=True)
-
-                # Wochenziel berechnen
-                wochenziel = kpi_data["monatsziele"][kpi_name] / 4  # Annahme: 4 Wochen pro Monat
-
-                # Motivierende Texte mit dynamischem Wochenziel
-                motivation_stufen = [
-                    (0, "Gabi, du schaffst das! 💪"),
-                    (25, "Gib Gas, Gabi! 🏎️ Das Ziel ist in Sicht!"),
-                    (wochenziel / kpi_data["monatsziele"][kpi_name] * 100, f"Halbzeit! Weiter so, Gabi! 👍 (Wochenziel: {wochenziel:.0f})"),  # Dynamisches Wochenziel
-                    (75, "Du bist auf dem besten Weg, Gabi! 💪 {prozentsatz}% erreicht!"),
-                    (100, "Super Arbeit, Gabi! Du rockst das! 🎉")
-                ]
-
-                for stufe, text in motivation_stufen:
-                    if prozentsatz <= stufe:
-                        st.write(text.format(prozentsatz=prozentsatz))
-                        break
-
-            else:
-                st.write(f"{kpi_name}: Monatsziel ist 0, daher keine Prozentanzeige")
+    if wochenwerte[kpi_name] != alter_wert:
+        store.set_wochenwert(aktuelle_woche, kpi_name, wochenwerte[kpi_name])
+
+# Auswertung der Woche für alle KPIs auf einmal, mit echten Kalenderwochen je Monat
+analytics = get_kpi_analytics()
+with tracer.span("kpi.analytics", kpis=len(monatsziele_keys)):
+    auswertung = analytics.analyse(aktuelle_woche, monatsziele_keys)
+wochen_im_monat = auswertung["wochen_im_monat"].iloc[0]
+
+# Wochenübersicht (Tachos) – alle KPIs in einer gemeinsamen Grafik
+gauge_kpis = [kpi_name for kpi_name in monatsziele_keys if monatsziele.get(kpi_name, 0) != 0]
+prozentsaetze = auswertung.loc[gauge_kpis, "prozent_woche"]
+
+if gauge_kpis:
+    # Layout nur neu aufbauen, wenn sich die KPIs ändern; sonst nur Werte aktualisieren
+    panel = st.session_state.get("gauge_panel")
+    if panel is None or panel.titles != tuple(gauge_kpis):
+        panel = st.session_state["gauge_panel"] = GaugePanel(gauge_kpis, 100)
+    with tracer.span("plotly.render", kpis=len(gauge_kpis)):
+        st.plotly_chart(panel.update([prozentsaetze[k] for k in gauge_kpis]), use_container_width=True)
+
+# Motivierende Texte mit dynamischem Wochenziel (Monatsziel / Wochen dieses Monats)
+motivation_stufen = [
+    (0, "Gabi, du schaffst das! 💪"),
+    (25, "Gib Gas, Gabi! 🏎️ Das Ziel ist in Sicht!"),
+    (100 / wochen_im_monat, "Halbzeit! Weiter so, Gabi! 👍 (Wochenziel: {wochenziel:.0f})"),
+    (75, "Du bist auf dem besten Weg, Gabi! 💪 {prozentsatz}% erreicht!"),
+    (100, "Super Arbeit, Gabi! Du rockst das! 🎉")
+]
+# Stufe aller KPIs in einem Schritt: die erste Schwelle, die nicht überschritten ist
+stufen = dict(zip(gauge_kpis, select_stage(prozentsaetze, [stufe for stufe, _ in motivation_stufen])))
+
+motivation_columns = st.columns(number_of_wochenwerte_columns)
+for kpi_index, kpi_name in enumerate(monatsziele_keys):
+    with motivation_columns[kpi_index]:
+        if kpi_name in stufen:
+            if stufen[kpi_name] >= 0:
+                text = motivation_stufen[stufen[kpi_name]][1]
+                st.write(text.format(prozentsatz=prozentsaetze[kpi_name], wochenziel=auswertung.at[kpi_name, "wochenziel"]))
+        else:
+            st.write(f"{kpi_name}: Monatsziel ist 0, daher keine Prozentanzeige")
+
+# Hochrechnung: Durchschnitt der bisherigen Wochen bis Monatsende fortgeschrieben
+if gauge_kpis:
+    st.subheader(
+        f"Prognose zum Monatsende ({auswertung['monat'].iloc[0]}, "
+        f"Woche {auswertung['woche_im_monat'].iloc[0]} von {wochen_im_monat})"
+    )
+    prognose = auswertung.loc[gauge_kpis, [
+        "monat_bisher", "prognose", "prognose_min", "prognose_max", "prognose_prozent", "benoetigt_pro_woche"
+    ]].round(1)
+    prognose.columns = [
+        "Bisher im Monat", "Prognose", f"Untergrenze ({analytics.band:.0%})", f"Obergrenze ({analytics.band:.0%})",
+        "Prognose (% vom Ziel)", "Nötig pro Woche"
+    ]
+    st.dataframe(prognose, use_container_width=True)
 
 # Verlaufsanzeige mit separaten Graphen für jedes KPI
 st.subheader("Verlauf")
 
-if not kpi_data["wochenwerte"]:
+history = get_history_engine()
+with tracer.span("kpi.history"):
+    wochen_df = history.refresh()
+if wochen_df.empty:
     st.write("Noch keine Daten für den Verlauf vorhanden.")
 else:
     try:
-        wochen_df = pd.DataFrame.from_dict(kpi_data["wochenwerte"], orient='index')
-        wochen_df = wochen_df.sort_index(axis=1)
-
-        if wochen_df.empty:
-            st.write("Noch keine Daten für den Verlauf vorhanden.")
-        else:
-            for kpi_name in wochen_df.columns:
-                st.write(f"**{kpi_name}**")  # KPI-Name als Überschrift
-                st.line_chart(wochen_df[kpi_name])  # Separater Graph für jedes KPI
+        for kpi_name in wochen_df.columns:
+            st.write(f"**{kpi_name}**")  # KPI-Name als Überschrift
+            st.line_chart(wochen_df[kpi_name])  # Separater Graph für jedes KPI
+
+        with st.expander("Monatsauswertung"):
+            st.write("**Monatssummen**")
+            st.dataframe(history.monthly_sums())
+            st.write(f"**Gleitender Durchschnitt ({history.rolling_window} Wochen)**")
+            st.line_chart(history.rolling_average())
+            st.write("**Fortschritt zum Monatsziel (kumuliert, %)**")
+            st.line_chart(history.cumulative_progress())
+            if gauge_kpis:
+                st.write("**Prognose zum Monatsende je Woche (% vom Ziel)**")
+                st.line_chart(analytics.compute(gauge_kpis)["prognose_prozent"])
     except Exception as e:
         st.write("Fehler beim Erstellen des Verlaufsdiagramms.")
         st.write(f"Details: {e}")
@@ -3,17 +3,44 @@
 import streamlit as st
 from utils import (
     extract_info_from_url,
-    analyze_manual_text,
+    extract_info_from_urls,
+    analyze_manual_listings,
     fetch_calendar_events,
+    fetch_google_busy,
+    find_appointment_slots,
     add_event_to_google_calendar,
-    search_hotels_near_location,
-    ExtractionError
+    add_events_to_google_calendar,
+    get_hotel_lookup,
+    get_listing_archive,
+    check_duplicates,
+    find_duplicates,
+    get_duplicate_index,
+    get_listing_cache
 )
-from negotiation import generate_personal_message
+from negotiation import (
+    stream_personal_message,
+    stream_polished_message,
+    generate_bulk_messages,
+    export_messages,
+    format_slots
+)
+from templates import get_template_library
 from llm_manager import LLMManager
-import pyperclip
+from response_cache import ResponseCache
+from jobs import JobManager, job_key, DONE, FAILED, CANCELLED
 import datetime
-from config import SETTINGS
+import time
+from config import (
+    SETTINGS,
+    RESPONSE_CACHE_SETTINGS,
+    BULK_SETTINGS,
+    CALENDAR_SETTINGS,
+    AVAILABILITY_SETTINGS,
+    JOB_SETTINGS,
+    OLLAMA_SETTINGS,
+    ARCHIVE_SETTINGS,
+    DEDUP_SETTINGS
+)
 
 # Set up page
 st.set_page_config(page_title="Möbelkauf-Assistent", layout="wide", page_icon="🪑")
@@ -22,12 +49,54 @@ st.set_page_config(page_title="Möbelkauf-Assistent", layout="wide", page_icon="
 if "llm_provider" not in st.session_state:
     st.session_state.llm_provider = "ollama"
 
-if "llm_manager" not in st.session_state:
-    st.session_state.llm_manager = LLMManager(
-        provider=st.session_state.llm_provider,
+@st.cache_resource
+def get_response_cache():
+    # One cache per process, shared by all sessions
+    return ResponseCache(
+        RESPONSE_CACHE_SETTINGS["path"],
+        max_memory_entries=RESPONSE_CACHE_SETTINGS["max_memory_entries"],
+        ttl=RESPONSE_CACHE_SETTINGS["ttl"]
+    )
+
+if "batch_results" not in st.session_state:
+    st.session_state.batch_results = []
+
+if "batch_source" not in st.session_state:
+    st.session_state.batch_source = None
+
+if "bulk_job" not in st.session_state:
+    st.session_state.bulk_job = None
+
+if "job_keys" not in st.session_state:
+    # Jobs started from this session, listed in the sidebar
+    st.session_state.job_keys = []
+
+@st.cache_resource
+def get_llm_manager(provider):
+    # One manager per provider and process instead of one per session
+    llm = LLMManager(
+        provider=provider,
         ollama_config=SETTINGS,  # e.g. { "model": "llama3.2:3b", ... }
-        openai_model="gpt-3.5-turbo"
+        openai_model="gpt-3.5-turbo",
+        response_cache=get_response_cache(),
+        ollama_host=OLLAMA_SETTINGS["host"],
+        keep_alive=OLLAMA_SETTINGS["keep_alive"]
     )
+    if provider == "ollama" and OLLAMA_SETTINGS["preload"]:
+        # Load the model while the user is still entering a listing
+        llm.warm_up_in_background()
+    return llm
+
+@st.cache_resource
+def get_job_manager():
+    # One worker pool per process; finished jobs survive reruns
+    return JobManager(max_workers=JOB_SETTINGS["max_workers"], max_finished=JOB_SETTINGS["max_finished"])
+
+def start_job(key, fn, *args, label, force=False):
+    job = get_job_manager().submit(key, fn, *args, label=label, force=force)
+    if key not in st.session_state.job_keys:
+        st.session_state.job_keys.append(key)
+    return job
 
 def main():
     st.title("🪑 Möbelkauf-Assistent")
@@ -40,40 +109,406 @@ def main():
         index=0 if st.session_state.llm_provider == "ollama" else 1
     )
 
-    # Update the manager's provider if changed
-    st.session_state.llm_manager.set_provider(st.session_state.llm_provider)
+    if st.session_state.llm_provider == "ollama":
+        show_ollama_stats(get_llm_manager("ollama"))
+    show_cache_stats()
+    show_jobs()
 
-    input_method = st.radio("Input-Methode wählen:", ["URL analysieren", "Text einfügen"])
+    input_method = st.radio(
+        "Input-Methode wählen:",
+        ["URL analysieren", "Mehrere URLs analysieren", "Text einfügen", "Archiv durchsuchen"]
+    )
     extracted_info = {}
+    duplicates = []
 
     # Step 1: Extract info
     if input_method == "URL analysieren":
         url = st.text_input("Kleinanzeigen-URL:", placeholder="https://www.kleinanzeigen.de/...")
         if st.button("Anzeige analysieren"):
-            try:
-                with st.spinner("Analysiere die Anzeige..."):
-                    extracted_info = extract_info_from_url(url)
+            st.session_state.url_job = start_job(
+                job_key("extract", url.strip()), _extract_job, url.strip(), label="Analyse der Anzeige"
+            ).key
+        job = get_job_manager().get(st.session_state.get("url_job"))
+        if job:
+            show_job_status(job)
+            if job.status == DONE:
+                extracted_info = job.result["info"]
+                duplicates = job.result["duplicates"]
                 st.success("Anzeige erfolgreich analysiert!")
                 st.json(extracted_info)
-            except ExtractionError as e:
-                st.error(f"Fehler bei der Analyse: {e}")
-            except Exception as e:
-                st.error(f"Unerwarteter Fehler: {e}")
-    else:
-        # "Text einfügen"
+    elif input_method == "Mehrere URLs analysieren":
+        urls_text = st.text_area(
+            "Kleinanzeigen-URLs (eine pro Zeile):",
+            placeholder="https://www.kleinanzeigen.de/...\nhttps://www.kleinanzeigen.de/..."
+        )
+        if st.button("Anzeigen analysieren"):
+            run_batch_analysis(urls_text.splitlines())
+        if st.session_state.batch_source == "urls":
+            show_batch_job()
+            extracted_info, duplicates = show_batch_results()
+            show_bulk_messages()
+    elif input_method == "Text einfügen":
         manual_text = st.text_area("Fügen Sie den Text hier ein:")
         if st.button("Text analysieren"):
             with st.spinner("Analysiere den Text..."):
-                extracted_info = analyze_manual_text(manual_text)
-            st.success("Text erfolgreich analysiert!")
-            st.json(extracted_info)
+                listings = analyze_manual_listings(manual_text)
+                get_listing_archive().add_many((info, None) for info in listings)
+                matches = check_duplicates([(info, None) for info in listings])
+            if len(listings) == 1:
+                # Kept in the session so reruns (e.g. while a message is generated) still see it
+                st.session_state.manual_info = listings[0]
+                st.session_state.manual_duplicates = matches[0]
+                if st.session_state.batch_source == "text":
+                    st.session_state.batch_source = None
+                st.success("Text erfolgreich analysiert!")
+                st.json(listings[0])
+            else:
+                st.session_state.manual_info = None
+                # Several listings in one paste are handled like a batch
+                st.session_state.batch_results = [
+                    {"url": None, "info": info, "error": None, "duplicates": found}
+                    for info, found in zip(listings, matches)
+                ]
+                st.session_state.batch_source = "text"
+                st.session_state.bulk_job = None
+                st.success(f"{len(listings)} Anzeigen im Text erkannt!")
+        if st.session_state.batch_source == "text":
+            extracted_info, duplicates = show_batch_results()
+            show_bulk_messages()
+        else:
+            extracted_info = st.session_state.get("manual_info") or {}
+            duplicates = st.session_state.get("manual_duplicates") or []
+    else:
+        extracted_info, duplicates = show_archive_search()
 
     # Step 2: If we have extracted info, show text options
     if extracted_info:
-        show_text_options(extracted_info)
+        show_text_options(extracted_info, duplicates)
+
+    # Poll while this session's jobs are still running
+    if any(job.active for job in get_job_manager().jobs(st.session_state.job_keys)):
+        time.sleep(JOB_SETTINGS["poll_interval"])
+        st.rerun()
+
+def show_ollama_stats(llm):
+    """Warm-up state and the timings of the last Ollama response (cold vs. warm model)."""
+    with st.sidebar.expander("Ollama-Modell"):
+        warmup = llm.warmup_stats
+        if llm.warming_up:
+            st.write("Modell wird geladen...")
+        elif warmup is None:
+            st.write("Modell noch nicht vorgeladen.")
+        elif "error" in warmup:
+            st.warning(f"Vorladen fehlgeschlagen: {warmup['error']}")
+        else:
+            st.write(f"Vorgeladen in {warmup['load']:.2f} s, bleibt {llm.keep_alive} geladen.")
+
+        stats = llm.last_stats
+        if stats:
+            st.write("Letzte Antwort:")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Laden", f"{stats['load']:.2f} s")
+            col2.metric("Prompt", f"{stats['prompt_eval']:.2f} s")
+            col3.metric("Generierung", f"{stats['eval']:.2f} s")
+            st.caption(f"{stats['prompt_tokens']} Prompt-Tokens ausgewertet, {stats['eval_tokens']} Tokens generiert")
+        if st.button("Modell vorladen", disabled=llm.warming_up):
+            llm.warm_up_in_background()
+
+def show_cache_stats():
+    st.sidebar.subheader("Anzeigen-Cache")
+    stats = get_listing_cache().stats
+    col1, col2, col3 = st.sidebar.columns(3)
+    col1.metric("Treffer", stats["hits"])
+    col2.metric("Revalidiert", stats["revalidated"])
+    col3.metric("Abrufe", stats["misses"])
+    if st.sidebar.button("Cache leeren"):
+        get_listing_cache().clear()
+        st.sidebar.success("Cache geleert.")
+
+    with st.sidebar.expander("LLM-Statistik"):
+        stats = LLMManager.router_stats()
+        if stats:
+            st.dataframe(stats, hide_index=True)
+        else:
+            st.write("Noch keine Anfragen.")
+
+    with st.sidebar.expander("HTTP-Statistik"):
+        from http_client import get_client
+        metrics = get_client().host_metrics()
+        if metrics:
+            st.dataframe(metrics, hide_index=True)
+        else:
+            st.write("Noch keine Anfragen.")
+
+def show_jobs():
+    manager = get_job_manager()
+    jobs = manager.jobs(st.session_state.job_keys)
+    # Forget keys of jobs the manager has already dropped
+    st.session_state.job_keys = [job.key for job in reversed(jobs)]
+    if not jobs:
+        return
+
+    status_labels = {
+        "pending": "wartet", "running": "läuft", DONE: "fertig",
+        FAILED: "fehlgeschlagen", CANCELLED: "abgebrochen"
+    }
+    st.sidebar.subheader("Hintergrundaufgaben")
+    for job in jobs:
+        col_label, col_cancel = st.sidebar.columns([3, 1])
+        col_label.write(f"{job.label}: {status_labels[job.status]}")
+        if job.active and col_cancel.button("✖", key=f"sidebar_cancel_{job.key}"):
+            manager.cancel(job.key)
+
+def show_job_status(job):
+    """Progress bar and cancel button while a job runs; a notice if it failed or was cancelled."""
+    if job.active:
+        st.progress(job.progress, text=job.progress_text or f"{job.label} läuft...")
+        if st.button("Abbrechen", key=f"cancel_{job.key}"):
+            get_job_manager().cancel(job.key)
+    elif job.status == FAILED:
+        st.error(f"{job.label} fehlgeschlagen: {job.error}")
+    elif job.status == CANCELLED:
+        st.warning(f"{job.label} abgebrochen.")
+
+def _extract_job(job, url):
+    job.report(text="Analysiere die Anzeige...")
+    info = extract_info_from_url(url)
+    get_listing_archive().add(info, url)
+    return {"info": info, "duplicates": check_duplicates([(info, url)])[0]}
+
+def _batch_job(job, urls):
+    results = []
+    job.report(text=f"0 von {len(urls)} Anzeigen analysiert")
+    for url, info, error in extract_info_from_urls(urls):
+        # Errors are kept as text so finished jobs hold plain data
+        results.append({
+            "url": url, "info": info, "error": str(error) if error else None,
+            "duplicates": check_duplicates([(info, url)], save=False)[0]
+        })
+        job.report(len(results) / len(urls), f"{len(results)} von {len(urls)} Anzeigen analysiert", list(results))
+        if job.cancelled:
+            break
+    get_listing_archive().add_many((r["info"], r["url"]) for r in results)
+    get_duplicate_index().save(force=True)
+    return results
+
+def _message_job(job, llm, info, purposes, slots, refresh):
+    message = ""
+    for token in stream_personal_message(llm, info, purposes, slots=slots, refresh=refresh):
+        if job.cancelled:
+            break
+        message += token
+        job.report(partial=message)
+    return message
+
+def _polish_job(job, llm, draft):
+    message = ""
+    for token in stream_polished_message(llm, draft):
+        if job.cancelled:
+            break
+        message += token
+        job.report(partial=message)
+    return message
+
+def _bulk_job(job, llm, items, max_concurrency):
+    job.report(text=f"Generiere {len(items)} Nachrichten...")
+    return generate_bulk_messages(llm, items, max_concurrency=max_concurrency)
+
+def _hotels_job(job, location, pages):
+    lookup = get_hotel_lookup()
+    hotels = []
+    has_more = False
+    for page in range(pages):
+        if job.cancelled:
+            break
+        page_hotels, has_more = lookup.page(location, page)
+        hotels.extend(page_hotels)
+        job.report((page + 1) / pages, partial=list(hotels))
+    return hotels, has_more
+
+def run_batch_analysis(urls):
+    urls = list(dict.fromkeys(u.strip() for u in urls if u.strip()))
+    if not urls:
+        st.error("Bitte mindestens eine URL angeben.")
+        return
+
+    st.session_state.batch_results = []
+    st.session_state.batch_source = "urls"
+    st.session_state.bulk_job = None
+    st.session_state.batch_job = start_job(
+        job_key("batch", urls), _batch_job, urls, label=f"Analyse von {len(urls)} Anzeigen"
+    ).key
+
+def show_batch_job():
+    """Copies the (partial) results of the running or finished batch job into the session."""
+    job = get_job_manager().get(st.session_state.get("batch_job"))
+    if job is None:
+        return
+    show_job_status(job)
+    st.session_state.batch_results = job.result if job.status == DONE else job.partial or []
 
-def show_text_options(extracted_info):
+def show_batch_results():
+    """
+    Lists the results of the last batch run and returns the listing the
+    user picked for the message and its similar listings (or an empty
+    dict and list).
+    """
+    results = st.session_state.batch_results
+    if not results:
+        return {}, []
+
+    succeeded = [r for r in results if r["info"]]
+    st.write(f"{len(succeeded)} von {len(results)} Anzeigen erfolgreich analysiert.")
+    for result in results:
+        if result["error"]:
+            st.markdown(f"- ❌ {result['url']}: {result['error']}")
+        else:
+            marker = "⚠️" if is_duplicate(result.get("duplicates")) else "✅"
+            with st.expander(f"{marker} {result['info']['title']}"):
+                if result["url"]:
+                    st.write(result["url"])
+                show_duplicates(result.get("duplicates"))
+                st.json(result["info"])
+
+    if not succeeded:
+        return {}, []
+    choice = st.selectbox(
+        "Für welche Anzeige soll eine Nachricht erstellt werden?",
+        options=range(len(succeeded)),
+        format_func=lambda i: succeeded[i]["info"]["title"]
+    )
+    return succeeded[choice]["info"], succeeded[choice].get("duplicates") or []
+
+def is_duplicate(matches):
+    return bool(matches) and matches[0]["similarity"] >= DEDUP_SETTINGS["duplicate_threshold"]
+
+def show_duplicates(matches):
+    """Flags listings seen before that look like the same item (most similar first)."""
+    for match in (matches or [])[:3]:
+        where = f" ({match['key']})" if match["key"].startswith("http") else ""
+        text = f"„{match['label']}“{where}, Ähnlichkeit {match['similarity']:.0%}"
+        if match["similarity"] >= DEDUP_SETTINGS["duplicate_threshold"]:
+            st.warning(f"Wahrscheinlich ein Duplikat von {text}.")
+        else:
+            st.info(f"Ähnlich zu {text}.")
+
+def show_archive_search():
+    """
+    Full-text search over all listings analysed so far, with price and
+    postal-code filters and price statistics for the search. Returns the
+    listing the user picked for the message and its similar listings.
+    """
+    archive = get_listing_archive()
+    st.write(f"{archive.count()} Anzeigen im Archiv.")
+    text = st.text_input("Suchbegriffe:", placeholder="z. B. Biedermeier Kommode")
+    col_min, col_max, col_plz, col_days = st.columns(4)
+    price_min = col_min.number_input("Preis ab (€)", min_value=0, value=0, step=10)
+    price_max = col_max.number_input("Preis bis (€)", min_value=0, value=0, step=10, help="0 = keine Grenze")
+    plz = col_plz.text_input("PLZ (Anfang):", max_chars=5)
+    days = col_days.selectbox("Gesehen in den letzten", [None, 7, 30, 90, 365],
+                              format_func=lambda d: "beliebig" if d is None else f"{d} Tagen")
+    filters = {
+        "price_min": price_min or None,
+        "price_max": price_max or None,
+        "plz": plz.strip() or None,
+        "since": time.time() - days * 86400 if days else None
+    }
+
+    stats = archive.price_stats(text, **filters)
+    if stats["count"]:
+        col_count, col_min, col_median, col_mean, col_max = st.columns(5)
+        col_count.metric("Mit Preis", stats["count"])
+        col_min.metric("Min", f"{stats['min']:.0f} €")
+        col_median.metric("Median", f"{stats['median']:.0f} €")
+        col_mean.metric("Mittel", f"{stats['mean']:.0f} €")
+        col_max.metric("Max", f"{stats['max']:.0f} €")
+
+    results = archive.search(text, limit=ARCHIVE_SETTINGS["search_limit"], **filters)
+    if not results:
+        st.write("Keine passenden Anzeigen im Archiv.")
+        return {}, []
+    st.dataframe(
+        [{"titel": r["title"], "preis": r["price_raw"], "ort": r["location"],
+          "gesehen": datetime.datetime.fromtimestamp(r["last_seen"]).strftime("%d.%m.%Y")} for r in results],
+        hide_index=True, use_container_width=True
+    )
+    choice = st.selectbox(
+        "Für welche Anzeige soll eine Nachricht erstellt werden?",
+        options=range(len(results)),
+        format_func=lambda i: results[i]["title"]
+    )
+    chosen = results[choice]
+    fields = ("seller_name", "title", "condition", "location", "description")
+    info = {field: chosen[field] for field in fields if chosen[field]}
+    if chosen["price_raw"]:
+        info["price"] = chosen["price_raw"]
+    return info, find_duplicates(info, chosen["key"])
+
+def show_bulk_messages():
+    succeeded = [r for r in st.session_state.batch_results if r["info"]]
+    if not succeeded:
+        return
+
+    st.subheader("Nachrichten für alle Anzeigen")
+    purposes = st.multiselect(
+        "Textbausteine für alle Nachrichten:",
+        options=["Erstkontakt", "Preisverhandlung", "Zustandsabfrage", "Terminvereinbarung"],
+        default=["Erstkontakt"],
+        key="bulk_purposes"
+    )
+    provider = st.session_state.llm_provider
+    # Ollama requests share the process-wide slots of llm_manager, so more
+    # parallel requests than ollama_concurrency would only wait in line
+    max_concurrency = BULK_SETTINGS["ollama_concurrency"] if provider == "ollama" else BULK_SETTINGS["max_concurrency"]
+    if max_concurrency > 1:
+        concurrency = st.slider(
+            "Parallele Anfragen:",
+            min_value=1,
+            max_value=max_concurrency,
+            value=min(BULK_SETTINGS[f"{provider}_concurrency"], max_concurrency),
+            key=f"bulk_concurrency_{provider}"
+        )
+    else:
+        concurrency = 1
+        st.caption("Der lokale Ollama-Server bearbeitet die Anfragen nacheinander (`ollama_concurrency` in config.py).")
+    duplicates = sum(1 for r in succeeded if is_duplicate(r.get("duplicates")))
+    skip = duplicates and st.checkbox(f"Wahrscheinliche Duplikate überspringen ({duplicates})", value=True)
+    if st.button("Nachrichten für alle generieren"):
+        items = [(r["info"], purposes) for r in succeeded if not (skip and is_duplicate(r.get("duplicates")))]
+        st.session_state.bulk_job = start_job(
+            job_key("bulk", provider, items, concurrency), _bulk_job,
+            get_llm_manager(provider), items, concurrency,
+            label=f"{len(items)} Nachrichten", force=True
+        ).key
+
+    job = get_job_manager().get(st.session_state.bulk_job)
+    if job:
+        show_job_status(job)
+    if job and job.status == DONE:
+        results, report = job.result
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Gesamtzeit", f"{report['total_seconds']:.1f} s")
+        col2.metric("Durchsatz", f"{report['throughput']:.2f} / s")
+        col3.metric("Latenz p50", f"{report['latency_p50']:.1f} s")
+        col4.metric("Latenz p95", f"{report['latency_p95']:.1f} s")
+        if report["errors"]:
+            st.warning(f"{report['errors']} Nachrichten konnten nicht erstellt werden.")
+        st.dataframe(results, use_container_width=True)
+
+        col_csv, col_json = st.columns(2)
+        col_csv.download_button(
+            "Als CSV exportieren", export_messages(results, "csv"),
+            file_name="nachrichten.csv", mime="text/csv"
+        )
+        col_json.download_button(
+            "Als JSON exportieren", export_messages(results, "json"),
+            file_name="nachrichten.json", mime="application/json"
+        )
+
+def show_text_options(extracted_info, duplicates=()):
     st.subheader("Schritt 2: Textbausteine auswählen")
+    # Before anything is generated: did we see (and maybe contact) this item already?
+    show_duplicates(duplicates)
     st.write("Anzeigendetails:")
     st.json(extracted_info)
 
@@ -83,45 +518,193 @@ def show_text_options(extracted_info):
         default=["Erstkontakt"]
     )
 
+    slots = None
     if "Terminvereinbarung" in selected_options:
         show_calendar_section()
+        slots = show_slot_proposals(extracted_info)
 
     # Step: Hotel search
     st.subheader("Hotels in der Nähe suchen")
-    if st.button("Hotels suchen"):
+    search = st.button("Hotels suchen")
+    if search:
         location = extracted_info.get("location", "")
         if not location or location == "Keine Adresse gefunden":
             st.error("Keine gültige Ortsangabe gefunden.")
+            search = False
         else:
-            with st.spinner("Suche nach Hotels..."):
-                hotels = search_hotels_near_location(location)
-            if hotels and "error" not in hotels[0]:
-                st.write("Gefundene Hotels:")
-                for hotel in hotels:
-                    st.markdown(
-                        f"- **{hotel['name']}**\n"
-                        f"  - Adresse: {hotel['address']}\n"
-                        f"  - Bewertung: {hotel['rating']}"
-                    )
-            else:
-                st.error(f"Fehler bei der Hotelsuche: {hotels[0].get('error')}")
+            st.session_state.hotel_location = location
+            st.session_state.hotel_pages = 1
+    if st.session_state.get("hotel_location"):
+        show_hotels(st.session_state.hotel_location, retry=search)
+
+    if st.toggle("Schnellmodus (Vorlagen, ohne KI)"):
+        show_quick_message(extracted_info, selected_options, slots)
+        return
+
+    # Generate the message ("Neu generieren" skips the response cache).
+    # The job key covers the inputs, so every listing keeps its own message.
+    # Slots enter it at minute precision only, so the key never depends on
+    # when the script happened to run.
+    provider = st.session_state.llm_provider
+    slot_key = [(start.strftime("%Y-%m-%d %H:%M"), end.strftime("%Y-%m-%d %H:%M")) for start, end in slots or []]
+    key = job_key("message", provider, extracted_info, selected_options, slot_key)
+    col_generate, col_refresh = st.columns(2)
+    generate = col_generate.button("Nachricht generieren")
+    refresh = col_refresh.button("Neu generieren")
+    if generate or refresh:
+        start_job(
+            key, _message_job, get_llm_manager(provider), extracted_info, selected_options, slots, refresh,
+            label=f"Nachricht: {extracted_info.get('title')}", force=refresh
+        )
+
+    show_message_job(key, "Generierte Nachricht:")
+
+def show_message_job(key, label):
+    """Streams the partial text of a message job and shows the finished message."""
+    job = get_job_manager().get(key)
+    if job:
+        show_job_status(job)
+        if job.active and job.partial:
+            st.markdown(job.partial + "▌")
+    if job and job.status == DONE:
+        message = job.result
+        st.text_area(label, value=message, height=300)
+        copy_button(message, key=f"copy_{key}")
+
+def copy_button(message, key):
+    if st.button("Nachricht kopieren", key=key):
+        import pyperclip
+        pyperclip.copy(message)
+        st.success("Nachricht in die Zwischenablage kopiert!")
+
+def show_quick_message(extracted_info, selected_options, slots):
+    """
+    Schnellmodus: renders the message from the text templates without an
+    LLM call; the LLM only polishes it when asked to.
+    """
+    library = get_template_library()
+    category_labels = {"furniture": "Möbel", "general": "Allgemein"}
+    categories = {category_labels.get(c, c): c for c in library.categories()}
+    category = categories[st.radio("Vorlagen:", list(categories), horizontal=True)]
+    templates = library.templates(category)
+    for broken, error in library.errors.items():
+        st.warning(f"Vorlagen '{category_labels.get(broken, broken)}' fehlerhaft, die letzte gültige Version wird verwendet: {error}")
 
-    # Generate the message
-    if st.button("Nachricht generieren"):
-        llm = st.session_state.llm_manager
-        with st.spinner("Generiere Nachricht..."):
-            message = generate_personal_message(llm, extracted_info, selected_options)
-        st.text_area("Generierte Nachricht:", value=message, height=300)
+    names = st.multiselect(
+        "Vorlagen auswählen:",
+        options=list(templates),
+        default=[name for name in selected_options if name in templates] or list(templates)[:1],
+        key=f"quick_templates_{category}"
+    )
+    betrag = None
+    if any(templates[name].fields & {"betrag", "betrag_eur"} for name in names):
+        betrag = st.number_input("Angebotener Betrag (€):", min_value=0.0, step=10.0)
+
+    message = library.render_message(category, names, extracted_info, betrag=betrag, slots=slots)
+    message = st.text_area("Nachricht:", value=message, height=300)
+    copy_button(message, key="copy_quick")
+
+    provider = st.session_state.llm_provider
+    key = job_key("polish", provider, message)
+    if st.button("Mit KI verfeinern"):
+        start_job(key, _polish_job, get_llm_manager(provider), message, label="Nachricht verfeinern")
+    show_message_job(key, "Verfeinerte Nachricht:")
+
+def show_hotels(location, retry=False):
+    """
+    Lists all loaded result pages; further pages are only fetched on request.
+    A failed search is only started again with retry=True.
+    """
+    pages = st.session_state.hotel_pages
+    key = job_key("hotels", location, pages)
+    job = get_job_manager().get(key)
+    if job is None or retry:
+        job = start_job(key, _hotels_job, location, pages, label=f"Hotels in {location}")
+    show_job_status(job)
+    has_more = False
+    hotels = job.partial or []
+    if job.status == DONE:
+        hotels, has_more = job.result
+
+    if hotels:
+        st.write(f"Gefundene Hotels in {location}:")
+        for hotel in hotels:
+            st.markdown(
+                f"- **{hotel['name']}**\n"
+                f"  - Adresse: {hotel['address']}\n"
+                f"  - Bewertung: {hotel['rating']}"
+            )
+    if has_more and st.button("Mehr Hotels laden"):
+        st.session_state.hotel_pages += 1
+        st.rerun()
+    stats = get_hotel_lookup().stats
+    st.caption(f"Hotel-Cache: {stats['hits']} Treffer, {stats['api_calls']} API-Aufrufe")
+
+def show_slot_proposals(extracted_info):
+    """
+    Shows free appointment slots (ICS calendar, optionally Google Calendar)
+    and returns the ones the user wants to offer in the message.
+    """
+    st.subheader("Terminvorschläge")
+    extra_busy = []
+    if st.checkbox("Google Kalender einbeziehen"):
+        busy = google_busy(refresh=st.button("Google Kalender neu laden"))
+        if busy["error"]:
+            st.warning(f"Google Kalender nicht verfügbar: {busy['error']}")
+        extra_busy = busy["intervals"]
+
+    proposals = find_appointment_slots(extra_busy)
+    if not proposals:
+        st.write("Keine freien Termine im Planungszeitraum gefunden.")
+        return None
+    selected = st.multiselect(
+        "Diese Termine in der Nachricht vorschlagen:",
+        options=proposals,
+        default=proposals,
+        format_func=lambda slot: format_slots([slot])
+    )
+    if selected and st.button("Termine im Google Kalender vormerken"):
+        summary = f"Besichtigung: {extracted_info.get('title')}"
+        with st.spinner("Füge Termine hinzu..."):
+            # One batch request for all selected slots
+            created = add_events_to_google_calendar([(summary, start, end) for start, end in selected])
+        failed = [event["error"] for event in created if "error" in event]
+        for error in failed:
+            st.error(error)
+        if len(failed) < len(created):
+            st.success(f"{len(created) - len(failed)} Termine vorgemerkt.")
+            # The new events are busy now: query free/busy again on the next run
+            st.session_state.pop("google_busy", None)
+    return selected
 
-        if st.button("Nachricht kopieren"):
-            pyperclip.copy(message)
-            st.success("Nachricht in die Zwischenablage kopiert!")
+def google_busy(refresh=False):
+    """
+    Busy intervals from the Google free/busy query, kept in the session for
+    `busy_ttl` seconds per horizon, so reruns (e.g. while a job is polled)
+    don't query the API each time. Returns {"intervals", "error"}.
+    """
+    horizon_days = AVAILABILITY_SETTINGS["horizon_days"]
+    cached = st.session_state.get("google_busy")
+    if (refresh or cached is None or cached["horizon_days"] != horizon_days
+            or time.time() - cached["fetched_at"] > AVAILABILITY_SETTINGS["busy_ttl"]):
+        now = datetime.datetime.now()
+        try:
+            cached = {"intervals": fetch_google_busy(now, now + datetime.timedelta(days=horizon_days)), "error": None}
+        except Exception as e:
+            # Failures are kept as well, so they aren't retried on every rerun
+            cached = {"intervals": [], "error": str(e)}
+        cached.update(horizon_days=horizon_days, fetched_at=time.time())
+        st.session_state.google_busy = cached
+    return cached
 
 def show_calendar_section():
     st.subheader("📅 Kalender-Übersicht")
 
-    events = fetch_calendar_events()
-    if events and "Fehler" not in events[0]["summary"]:
+    days = st.slider("Zeitraum (Tage):", min_value=1, max_value=90, value=CALENDAR_SETTINGS["upcoming_days"])
+    events = fetch_calendar_events(days=days)
+    if not events:
+        st.write("Keine Termine in diesem Zeitraum.")
+    elif "Fehler" not in events[0]["summary"]:
         for event in events:
             start_time = event["start"].strftime("%d.%m.%Y %H:%M") if event["start"] else "Unbekannt"
             end_time = event["end"].strftime("%d.%m.%Y %H:%M") if event["end"] else "Unbekannt"
@@ -0,0 +1,237 @@
+# archive.py
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+from hotels import PLZ_RE
+from listing_cache import normalize_url
+from instrumentation import tracer
+
+# "1.200", "1 200", "1.250,50", "99.5": thousands dots or spaces, decimal comma or dot
+NUMBER = r"(?<!\d)(\d{1,3}(?:\.\d{3})+|\d{1,3}(?:[ \u00a0\u202f]\d{3})+|\d+)(?:[,.](\d{1,2}))?(?!\d)"
+CURRENCY = r"(?:€|EUR\b|Euro\b)"
+# The number right before or after the currency wins over other numbers
+# ("2 Stühle je 40 €" is 40); without a currency the first number counts.
+PRICE_RES = [
+    re.compile(NUMBER + r"\s*" + CURRENCY, re.IGNORECASE),
+    re.compile(CURRENCY + r"\s*" + NUMBER, re.IGNORECASE),
+    re.compile(NUMBER)
+]
+FREE_RE = re.compile(r"zu verschenken|gratis|kostenlos", re.IGNORECASE)
+TERM_RE = re.compile(r"\w+")
+
+def parse_price(raw):
+    """
+    Normalises a raw price string to a float in euros. Thousands dots or
+    spaces and decimal commas are handled, and the amount next to '€' or
+    'EUR' is preferred; 'Zu verschenken' is 0. Returns None if the string
+    holds no price (e.g. 'VB' alone or 'Nicht gefunden').
+    """
+    if not raw:
+        return None
+    if FREE_RE.search(raw):
+        return 0.0
+    match = next(filter(None, (regex.search(raw) for regex in PRICE_RES)), None)
+    if match is None:
+        return None
+    euros = float(re.sub(r"\D", "", match.group(1)))
+    if match.group(2):
+        euros += float(match.group(2).ljust(2, "0")) / 100
+    return euros
+
+def fts_query(text):
+    """
+    Turns free text into an FTS5 query: every word must occur, as a prefix
+    ('komm' finds 'Kommode'). Quoting keeps user input from being read as
+    FTS5 syntax.
+    """
+    return " ".join(f'"{term}"*' for term in TERM_RE.findall(text.lower()))
+
+def listing_key(info, url=None):
+    """Identity of a listing: its normalised URL, or a hash of the content for pasted text."""
+    if url:
+        return normalize_url(url)
+    content = "\n".join(str(info.get(f) or "") for f in ("seller_name", "title", "description", "location"))
+    return "text:" + hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+class ListingArchive:
+    """
+    Every analysed listing in one SQLite table with an FTS5 index over
+    title, description and location.
+
+    Listings from a URL are stored once per (normalised) URL and updated
+    when they are analysed again; pasted listings are keyed by their
+    content. Prices are kept both raw and as numbers, so search results
+    can be filtered by price range and postal code and summarised per
+    search term.
+    """
+
+    # bm25 weights for title, description, location
+    RANK_WEIGHTS = (5.0, 1.0, 2.0)
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS listings ("
+                " id INTEGER PRIMARY KEY,"
+                " key TEXT NOT NULL UNIQUE,"
+                " url TEXT,"
+                " title TEXT,"
+                " description TEXT,"
+                " location TEXT,"
+                " plz TEXT,"
+                " seller_name TEXT,"
+                " condition TEXT,"
+                " price_raw TEXT,"
+                " price REAL,"
+                " first_seen REAL NOT NULL,"
+                " last_seen REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS listings_price ON listings (price)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS listings_plz ON listings (plz)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS listings_last_seen ON listings (last_seen)")
+            # External-content index: the text lives only in `listings`,
+            # the triggers keep the index in step with it.
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5("
+                " title, description, location,"
+                " content='listings', content_rowid='id',"
+                " tokenize='unicode61 remove_diacritics 2')"
+            )
+            self._conn.executescript(
+                "CREATE TRIGGER IF NOT EXISTS listings_ai AFTER INSERT ON listings BEGIN"
+                " INSERT INTO listings_fts (rowid, title, description, location)"
+                " VALUES (new.id, new.title, new.description, new.location);"
+                " END;"
+                "CREATE TRIGGER IF NOT EXISTS listings_ad AFTER DELETE ON listings BEGIN"
+                " INSERT INTO listings_fts (listings_fts, rowid, title, description, location)"
+                " VALUES ('delete', old.id, old.title, old.description, old.location);"
+                " END;"
+                "CREATE TRIGGER IF NOT EXISTS listings_au AFTER UPDATE OF title, description, location ON listings BEGIN"
+                " INSERT INTO listings_fts (listings_fts, rowid, title, description, location)"
+                " VALUES ('delete', old.id, old.title, old.description, old.location);"
+                " INSERT INTO listings_fts (rowid, title, description, location)"
+                " VALUES (new.id, new.title, new.description, new.location);"
+                " END;"
+            )
+
+    def add(self, info, url=None, seen_at=None):
+        """Stores (or refreshes) one extracted listing."""
+        self.add_many([(info, url)], seen_at)
+
+    def add_many(self, items, seen_at=None):
+        """Stores (info, url) pairs in one transaction; error results (info is None) are skipped."""
+        now = seen_at or time.time()
+        rows = [self._row(info, url, now) for info, url in items if info]
+        if not rows:
+            return
+        with tracer.span("archive.add", rows=len(rows)), self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO listings (key, url, title, description, location, plz, seller_name,"
+                " condition, price_raw, price, first_seen, last_seen)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET"
+                " title = excluded.title, description = excluded.description,"
+                " location = excluded.location, plz = excluded.plz,"
+                " seller_name = excluded.seller_name, condition = excluded.condition,"
+                " price_raw = excluded.price_raw, price = excluded.price,"
+                " last_seen = excluded.last_seen",
+                rows
+            )
+
+    def _row(self, info, url, now):
+        location = info.get("location") or ""
+        match = PLZ_RE.search(location)
+        return (
+            listing_key(info, url), url, info.get("title"), info.get("description"), location,
+            match.group(1) if match else None, info.get("seller_name"), info.get("condition"),
+            info.get("price"), parse_price(info.get("price")), now, now
+        )
+
+    def search(self, text="", price_min=None, price_max=None, plz=None, since=None, limit=50):
+        """
+        Listings matching `text` (best match first, title hits weigh most),
+        optionally within a price range, a postal code (prefix, so '10'
+        is all of 10xxx) and seen after the timestamp `since`. Without
+        text the most recently seen listings come first.
+        """
+        sql, params = self._select("l.*", text, price_min, price_max, plz, since)
+        if fts_query(text):
+            sql += " ORDER BY bm25(listings_fts, ?, ?, ?)"
+            params.extend(self.RANK_WEIGHTS)
+        else:
+            sql += " ORDER BY l.last_seen DESC"
+        sql += " LIMIT ?"
+        params.append(limit)
+        with tracer.span("archive.search", text=text, limit=limit) as span, self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, params)]
+            span["results"] = len(rows)
+        return rows
+
+    def price_stats(self, text="", price_min=None, price_max=None, plz=None, since=None):
+        """
+        Count, minimum, median, mean and maximum price of the matching
+        listings that have a price; None values if there are none.
+        """
+        sql, params = self._select("l.price", text, price_min, price_max, plz, since)
+        sql += " AND l.price IS NOT NULL"
+        with tracer.span("archive.stats", text=text), self._lock:
+            row = self._conn.execute(
+                f"SELECT COUNT(*), MIN(price), AVG(price), MAX(price) FROM ({sql})", params
+            ).fetchone()
+            count = row[0]
+            median = None
+            if count:
+                # Middle value (mean of the two middle values for even counts)
+                median = self._conn.execute(
+                    f"SELECT AVG(price) FROM (SELECT price FROM ({sql}) ORDER BY price LIMIT ? OFFSET ?)",
+                    params + [2 - count % 2, (count - 1) // 2]
+                ).fetchone()[0]
+        return {"count": count, "min": row[1], "median": median, "mean": row[2], "max": row[3]}
+
+    def _select(self, columns, text, price_min, price_max, plz, since):
+        query = fts_query(text)
+        if query:
+            sql = (
+                f"SELECT {columns} FROM listings_fts JOIN listings l ON l.id = listings_fts.rowid"
+                " WHERE listings_fts MATCH ?"
+            )
+            params = [query]
+        else:
+            sql = f"SELECT {columns} FROM listings l WHERE 1"
+            params = []
+        if price_min is not None:
+            sql += " AND l.price >= ?"
+            params.append(price_min)
+        if price_max is not None:
+            sql += " AND l.price <= ?"
+            params.append(price_max)
+        if plz:
+            sql += " AND l.plz LIKE ?"
+            params.append(plz + "%")
+        if since is not None:
+            sql += " AND l.last_seen >= ?"
+            params.append(since)
+        return sql, params
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    def clear(self):
+        """Removes all archived listings."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM listings")
+            self._conn.execute("INSERT INTO listings_fts (listings_fts) VALUES ('rebuild')")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,102 @@
+# availability.py
+
+import datetime
+
+# Sweep-line event kinds. At equal times a window closes before anything
+# else and busy intervals start before others end, so back-to-back
+# appointments don't leave zero-length gaps between them.
+_WORK_END, _BUSY_START, _BUSY_END, _WORK_START = 0, 1, 2, 3
+
+def _parse_time(value):
+    if isinstance(value, datetime.time):
+        return value
+    return datetime.time.fromisoformat(value)
+
+def round_up(moment, minutes):
+    """`moment` rounded up to the next full multiple of `minutes` (within its day)."""
+    midnight = datetime.datetime.combine(moment.date(), datetime.time(), moment.tzinfo)
+    step = datetime.timedelta(minutes=minutes)
+    return midnight + -((midnight - moment) // step) * step
+
+def earliest_start(now, lead_minutes=0, round_minutes=30):
+    """
+    First moment an appointment may start: `lead_minutes` after `now`
+    (time to answer and travel), rounded up to the slot grid. Stable for
+    a whole grid interval, so proposals don't change on every call.
+    """
+    return round_up(now + datetime.timedelta(minutes=lead_minutes), round_minutes)
+
+def working_windows(start, end, work_start="09:00", work_end="18:00", workdays=(0, 1, 2, 3, 4, 5)):
+    """Working-hour windows (start, end) of all workdays between `start` and `end`."""
+    work_start, work_end = _parse_time(work_start), _parse_time(work_end)
+    windows = []
+    day = start.date()
+    while day <= end.date():
+        if day.weekday() in workdays:
+            window_start = max(start, datetime.datetime.combine(day, work_start))
+            window_end = min(end, datetime.datetime.combine(day, work_end))
+            if window_start < window_end:
+                windows.append((window_start, window_end))
+        day += datetime.timedelta(days=1)
+    return windows
+
+def find_free_slots(busy, windows, min_minutes=60, buffer_minutes=0):
+    """
+    Free (start, end) intervals of at least `min_minutes` inside `windows`
+    that don't touch any `busy` interval widened by `buffer_minutes` on both
+    sides (travel time). One sweep over all interval boundaries, so the cost
+    is O(n log n) in the number of busy intervals and windows.
+    """
+    buffer = datetime.timedelta(minutes=buffer_minutes)
+    min_length = datetime.timedelta(minutes=min_minutes)
+
+    points = []
+    for window_start, window_end in windows:
+        points.append((window_start, _WORK_START))
+        points.append((window_end, _WORK_END))
+    for busy_start, busy_end in busy:
+        points.append((busy_start - buffer, _BUSY_START))
+        points.append((busy_end + buffer, _BUSY_END))
+    points.sort()
+
+    slots = []
+    open_windows = busy_depth = 0
+    free_since = None
+    for moment, kind in points:
+        if kind == _WORK_START:
+            open_windows += 1
+        elif kind == _WORK_END:
+            open_windows -= 1
+        elif kind == _BUSY_START:
+            busy_depth += 1
+        else:
+            busy_depth -= 1
+
+        is_free = open_windows > 0 and busy_depth == 0
+        if is_free and free_since is None:
+            free_since = moment
+        elif not is_free and free_since is not None:
+            if moment > free_since and moment - free_since >= min_length:
+                slots.append((free_since, moment))
+            free_since = None
+    return slots
+
+def propose_slots(free_slots, count=3, slot_minutes=60, round_minutes=None):
+    """
+    Picks up to `count` appointment proposals: the earliest free slot of
+    each day, so the seller gets a choice of different days. With
+    `round_minutes`, proposals start on that grid (e.g. 14:30, not 14:37).
+    """
+    length = datetime.timedelta(minutes=slot_minutes)
+    proposals = []
+    seen_days = set()
+    for slot_start, slot_end in free_slots:
+        if round_minutes:
+            slot_start = round_up(slot_start, round_minutes)
+        if slot_start.date() in seen_days or slot_end - slot_start < length:
+            continue
+        seen_days.add(slot_start.date())
+        proposals.append((slot_start, slot_start + length))
+        if len(proposals) == count:
+            break
+    return proposals
@@ -0,0 +1,694 @@
+# benchmark.py
+"""
+Offline benchmarks for the performance-sensitive parts of the app.
+
+    python benchmark.py                                  # run all benchmarks
+    python benchmark.py gauges                           # run selected benchmarks
+    python benchmark.py pipeline --output results.json   # save the results
+    python benchmark.py --baseline                       # flag regressions against
+                                                         # benchmark_baseline.json (exit code 1)
+    python benchmark.py --baseline results.json          # ... or against an earlier run
+
+Timings depend on the machine: after hardware or environment changes,
+regenerate the baseline with `--output benchmark_baseline.json`.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BENCHMARKS = {}
+# name -> (fields that identify a row, {field: +1 if higher is better, -1 if lower is better})
+COMPARED = {}
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+def benchmark(name, key=(), compare=None):
+    """
+    Registers a benchmark function that returns a list of result rows (dicts).
+    `key` names the fields that identify a row across runs; only the fields
+    in `compare` are checked for regressions, all others (input sizes, the
+    old code paths kept for reference) are just reported.
+    """
+    def register(fn):
+        BENCHMARKS[name] = fn
+        COMPARED[name] = (tuple(key), dict(compare or {}))
+        return fn
+    return register
+
+def measure(fn, repeat=5):
+    """Median wall time of `fn()` in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+##################################################################
+# Dashboard gauges: one figure per KPI vs. one combined panel
+##################################################################
+
+@benchmark("gauges", key=["kpis"], compare={"panel_ms": -1, "panel_bytes": -1})
+def bench_gauges():
+    import plotly.io as pio
+    from gauges import create_gauge, GaugePanel
+
+    rows = []
+    for count in (5, 20, 50):
+        titles = [f"KPI {i}" for i in range(count)]
+        values = [random.uniform(0, 120) for _ in titles]
+        panel = GaugePanel(titles)
+        panel.update(values)
+
+        def old_path():
+            return [pio.to_json(create_gauge(t, v, 100), validate=False) for t, v in zip(titles, values)]
+
+        def new_path():
+            # A typical rerun: one KPI value changed
+            values[0] = random.uniform(0, 120)
+            return pio.to_json(panel.update(values), validate=False)
+
+        rows.append({
+            "kpis": count,
+            "einzeln_ms": round(measure(old_path), 2),
+            "panel_ms": round(measure(new_path), 2),
+            "einzeln_bytes": sum(len(p) for p in old_path()),
+            "panel_bytes": len(new_path())
+        })
+    return rows
+
+##################################################################
+# Availability: free-slot sweep over a busy calendar
+##################################################################
+
+@benchmark("availability", key=["termine", "wochen"], compare={"ms": -1})
+def bench_availability():
+    import datetime
+    from availability import working_windows, find_free_slots, propose_slots
+
+    start = datetime.datetime(2026, 1, 5, 0, 0)
+    rows = []
+    for events_per_week, weeks in ((100, 1), (500, 1), (500, 4)):
+        end = start + datetime.timedelta(weeks=weeks)
+        span = int((end - start).total_seconds() // 60)
+        busy = []
+        for _ in range(events_per_week * weeks):
+            event_start = start + datetime.timedelta(minutes=random.randrange(span))
+            busy.append((event_start, event_start + datetime.timedelta(minutes=random.choice((15, 30, 60, 120)))))
+
+        def run():
+            windows = working_windows(start, end)
+            return propose_slots(find_free_slots(busy, windows, 60, 45), 3, 60)
+
+        elapsed = measure(run)
+        rows.append({
+            "termine": len(busy),
+            "wochen": weeks,
+            "ms": round(elapsed, 2),
+            "unter_100ms": elapsed < 100
+        })
+    return rows
+
+##################################################################
+# Manual text parser: rule engine vs. the original line-by-line version
+##################################################################
+
+def _legacy_analyze_manual_text(text):
+    # The original utils.analyze_manual_text, kept as the baseline.
+    import re
+    extracted_info = {"seller_name": None, "title": None, "condition": None, "location": None, "description": None}
+    for line in text.splitlines():
+        line = line.strip().lower()
+        if "verkäufer" in line and not extracted_info["seller_name"]:
+            extracted_info["seller_name"] = line.split(":")[-1].strip().title()
+        elif len(line) > 10 and not extracted_info["title"]:
+            extracted_info["title"] = line.capitalize()
+        elif "zustand" in line and not extracted_info["condition"]:
+            extracted_info["condition"] = line.split(":")[-1].strip()
+        elif re.match(r"\d{5}\s+\w+", line) and not extracted_info["location"]:
+            extracted_info["location"] = line
+        elif not extracted_info["description"]:
+            extracted_info["description"] = line
+    return extracted_info
+
+def _synthetic_paste(listings, chat_lines=40):
+    parts = []
+    for i in range(listings):
+        lines = [
+            f"Verkäufer: Person {i}",
+            f"Biedermeier Kommode Nr. {i} aus Kirschholz",
+            "Zustand: gut erhalten",
+            f"{10000 + i % 89999} Berlin",
+            "Schöne alte Kommode mit Gebrauchsspuren."
+        ]
+        lines += [f"Nachricht {j}: Ist die Kommode noch da? Ich könnte am Samstag kommen." for j in range(chat_lines)]
+        parts.append("\n".join(lines))
+    return "\n---\n".join(parts)
+
+@benchmark("parser", key=["anzeigen"], compare={"neu_mb_s": 1})
+def bench_parser():
+    from listing_parser import parse_listings
+
+    rows = []
+    for listings in (1, 100, 1000):
+        text = _synthetic_paste(listings)
+        megabytes = len(text.encode("utf-8")) / 1e6
+        legacy_ms = measure(lambda: _legacy_analyze_manual_text(text))
+        engine_ms = measure(lambda: parse_listings(text))
+        rows.append({
+            "anzeigen": listings,
+            "mb": round(megabytes, 2),
+            "alt_mb_s": round(megabytes / (legacy_ms / 1000), 1),
+            "neu_mb_s": round(megabytes / (engine_ms / 1000), 1),
+            "neu_datensaetze": len(parse_listings(text))
+        })
+    return rows
+
+##################################################################
+# HTML extraction: full html.parser tree vs. lean extractor
+##################################################################
+
+def _synthetic_listing_page(blocks=400):
+    # Roughly the shape of a large listing page: lots of navigation,
+    # recommendations and inline scripts around a few relevant nodes.
+    noise = "".join(
+        f'<div class="teaser"><a href="/s-anzeige/{i}"><img src="/img/{i}.jpg">'
+        f'<span class="title">Ähnliche Anzeige {i}</span></a><ul><li>Tag {i}</li><li>Ort {i}</li></ul></div>'
+        for i in range(blocks)
+    )
+    scripts = "".join(f"<script>window.data{i} = {{values: [{i}, {i + 1}]}};</script>" for i in range(blocks // 10))
+    return (
+        '<html><head><meta property="og:title" content="Biedermeier Kommode">'
+        f"{scripts}</head><body><nav>{noise}</nav>"
+        '<h1 id="viewad-title">Biedermeier Kommode</h1>'
+        '<h2 id="viewad-price">250 € VB</h2><span id="viewad-locality">10115 Berlin</span>'
+        '<p id="viewad-description-text">Schöne alte Kommode aus Kirschholz.</p>'
+        f"<footer>{noise}</footer></body></html>"
+    ).encode("utf-8")
+
+def _legacy_extract(content):
+    # The original parsing code of utils.extract_info_from_url.
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, 'html.parser')
+    title = soup.find('h1').text.strip() if soup.find('h1') else "Nicht gefunden"
+    description = soup.find('p').text.strip() if soup.find('p') else "Nicht gefunden"
+    price_span = soup.find('span', class_='price')
+    price = price_span.text.strip() if price_span else "Nicht gefunden"
+    return {"title": title, "description": description, "price": price}
+
+def _peak_kib(fn):
+    import tracemalloc
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(peak / 1024)
+
+@benchmark("html", key=["kib", "parser"], compare={"neu_ms": -1, "neu_peak_kib": -1})
+def bench_html():
+    from extractors import extract_listing, parser_name
+
+    url = "https://www.kleinanzeigen.de/s-anzeige/kommode/123"
+    rows = []
+    for blocks in (100, 400, 1600):
+        page = _synthetic_listing_page(blocks)
+        rows.append({
+            "kib": round(len(page) / 1024),
+            "parser": parser_name(),
+            "alt_ms": round(measure(lambda: _legacy_extract(page)), 2),
+            "neu_ms": round(measure(lambda: extract_listing(page, url)), 2),
+            "alt_peak_kib": _peak_kib(lambda: _legacy_extract(page)),
+            "neu_peak_kib": _peak_kib(lambda: extract_listing(page, url))
+        })
+    return rows
+
+##################################################################
+# Startup: import time of the app modules (python -X importtime)
+##################################################################
+
+# App modules imported before the first widget renders.
+STARTUP_MODULES = ["config", "utils", "negotiation", "response_cache", "listing_parser"]
+
+# Integrations that must only be imported on first use.
+HEAVY_MODULES = ["googleapiclient", "google.auth", "icalendar", "bs4", "openai", "ollama", "requests"]
+
+def import_times(modules):
+    """
+    Runs `python -X importtime -c "import ..."` in a fresh interpreter and
+    returns {module: cumulative microseconds} for every imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        times[name] = int(cumulative)
+    return times
+
+def heavy_imports(times):
+    """The HEAVY_MODULES (and their submodules) among the imported modules."""
+    return sorted(m for m in times if any(m == h or m.startswith(h + ".") for h in HEAVY_MODULES))
+
+@benchmark("startup", key=["module"], compare={"ms": -1})
+def bench_startup():
+    times = import_times(STARTUP_MODULES)
+    heavy = heavy_imports(times)
+    if heavy:
+        raise RuntimeError("Beim Start importiert: " + ", ".join(heavy))
+    rows = [{
+        "module": "gesamt",
+        "ms": round(sum(times.get(m, 0) for m in STARTUP_MODULES) / 1000, 1)
+    }]
+    for name, cumulative in sorted(times.items(), key=lambda item: -item[1])[:10]:
+        rows.append({"module": name, "kumuliert_ms": round(cumulative / 1000, 1)})
+    return rows
+
+##################################################################
+# Pipeline: paste listing -> message, against a local stub LLM server
+##################################################################
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_listings.json")
+
+class StubOllama:
+    """
+    Minimal Ollama-compatible server on localhost for offline runs. /api/chat
+    streams `tokens` NDJSON chunks `token_delay` seconds apart; /api/generate
+    answers the warm-up request. Use as a context manager yielding the URL.
+    """
+
+    def __init__(self, tokens=40, token_delay=0.005):
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self._server = None
+
+    def __enter__(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                if self.path == "/api/chat":
+                    for i in range(stub.tokens):
+                        time.sleep(stub.token_delay)
+                        self._chunk(request, {"message": {"role": "assistant", "content": f"Wort{i} "}, "done": False})
+                    self._chunk(request, {
+                        "message": {"role": "assistant", "content": ""}, "done": True,
+                        "prompt_eval_count": len(json.dumps(request.get("messages", []))) // 4,
+                        "eval_count": stub.tokens, "eval_duration": int(stub.tokens * stub.token_delay * 1e9)
+                    })
+                else:
+                    self._chunk(request, {"response": "", "done": True})
+
+            def _chunk(self, request, fields):
+                fields.update(model=request.get("model", "stub"), created_at="2026-01-01T00:00:00Z")
+                self.wfile.write(json.dumps(fields).encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+def _render(message, final=False):
+    # What the app draws per streamed token and for the finished message
+    import streamlit as st
+    if final:
+        st.text_area("Generierte Nachricht:", value=message, height=300)
+    else:
+        st.markdown(message + "▌")
+
+def _run_session(llm, fixtures, timings):
+    from negotiation import build_prompt, SYSTEM_PROMPT
+    from utils import analyze_manual_text
+
+    for fixture in fixtures:
+        start = time.perf_counter()
+        info = analyze_manual_text(fixture["text"])
+        parsed = time.perf_counter()
+        prompt = build_prompt(info, fixture["purposes"])
+        built = time.perf_counter()
+
+        message = ""
+        render = 0.0
+        for token in llm.generate_stream(prompt, refresh=True, system=SYSTEM_PROMPT):
+            message += token
+            render_start = time.perf_counter()
+            _render(message)
+            render += time.perf_counter() - render_start
+        render_start = time.perf_counter()
+        _render(message, final=True)
+        render += time.perf_counter() - render_start
+        done = time.perf_counter()
+
+        timings["parse"].append(parsed - start)
+        timings["prompt"].append(built - parsed)
+        timings["llm"].append(done - built - render)
+        timings["render"].append(render)
+        timings["total"].append(done - start)
+
+@benchmark("pipeline", key=["sitzungen"],
+           compare={"total_p50_ms": -1, "total_p95_ms": -1, "durchsatz_per_s": 1})
+def bench_pipeline():
+    import logging
+    import tracemalloc
+    from config import SETTINGS
+    from llm_manager import LLMManager
+
+    # Streamlit warns about the missing script context on every element
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    with open(FIXTURES, encoding="utf-8") as f:
+        fixtures = json.load(f)
+
+    rows = []
+    with StubOllama() as url:
+        for sessions in (1, 4, 16):
+            llm = LLMManager(provider="ollama", ollama_config=SETTINGS, ollama_host=url, fallback=[], hedge_after=0)
+            # One untimed message pays for lazy imports and the first connection
+            _run_session(llm, fixtures[:1], {stage: [] for stage in ("parse", "prompt", "llm", "render", "total")})
+            timings = {stage: [] for stage in ("parse", "prompt", "llm", "render", "total")}
+            workers = [
+                threading.Thread(target=_run_session, args=(llm, fixtures, timings)) for _ in range(sessions)
+            ]
+            tracemalloc.start()
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            row = {"sitzungen": sessions, "nachrichten": len(timings["total"])}
+            for stage, values in timings.items():
+                values.sort()
+                row[f"{stage}_p50_ms"] = round(values[len(values) // 2] * 1000, 3)
+                row[f"{stage}_p95_ms"] = round(values[round(0.95 * (len(values) - 1))] * 1000, 3)
+            row["durchsatz_per_s"] = round(len(timings["total"]) / elapsed, 2)
+            row["kib_pro_sitzung"] = round(peak / 1024 / sessions)
+            rows.append(row)
+    return rows
+
+##################################################################
+# Schnellmodus: template rendering instead of an LLM call
+##################################################################
+
+@benchmark("templates", key=["kategorie"], compare={"render_us": -1})
+def bench_templates():
+    from templates import get_template_library
+
+    library = get_template_library()
+    info = {"seller_name": "Helga Schmidt", "title": "Biedermeier Kommode", "price": "250 € VB"}
+    rows = []
+    for category in library.categories():
+        names = list(library.templates(category))
+        repeat = 10000
+        start = time.perf_counter()
+        for _ in range(repeat):
+            library.render_message(category, names, info, betrag=200)
+        rows.append({
+            "kategorie": category,
+            "vorlagen": len(names),
+            "render_us": round((time.perf_counter() - start) / repeat * 1e6, 2)
+        })
+    return rows
+
+##################################################################
+# Listing archive: FTS5 search and price statistics over 100k listings
+##################################################################
+
+def _synthetic_archive_listings(count):
+    furniture = ["Kommode", "Sofa", "Esstisch", "Stuhl", "Sessel", "Regal", "Kleiderschrank",
+                 "Sideboard", "Couchtisch", "Bett", "Schreibtisch", "Vitrine"]
+    materials = ["Eiche", "Buche", "Kirschholz", "Nussbaum", "Kiefer", "Teak", "Metall", "Glas"]
+    styles = ["Biedermeier", "Vintage", "Landhaus", "Modern", "60er Jahre", "Jugendstil", "IKEA"]
+    places = ["10115 Berlin", "10437 Berlin", "80331 München", "50667 Köln", "20095 Hamburg",
+              "04109 Leipzig", "60311 Frankfurt", "70173 Stuttgart"]
+    words = ["gut", "erhalten", "Abholung", "Gebrauchsspuren", "Nichtraucherhaushalt", "Maße",
+             "Schubladen", "massiv", "restauriert", "original", "Tür", "Griffe", "neu", "Polster"]
+    for i in range(count):
+        item = random.choice(furniture)
+        yield {
+            "seller_name": f"Verkäufer {i % 5000}",
+            "title": f"{random.choice(styles)} {item} {random.choice(materials)}",
+            "description": " ".join(random.choices(words, k=25)),
+            "location": random.choice(places),
+            "condition": "gebraucht",
+            "price": f"{random.randrange(5, 2000)} €" + random.choice(["", " VB"])
+        }, f"https://www.kleinanzeigen.de/s-anzeige/{i}"
+
+@benchmark("archive", key=["abfrage"], compare={"anzeigen_per_s": 1, "ms": -1})
+def bench_archive():
+    import tempfile
+    from archive import ListingArchive
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = ListingArchive(os.path.join(tmp, "archive.sqlite"))
+        count = 100_000
+        start = time.perf_counter()
+        archive.add_many(_synthetic_archive_listings(count))
+        elapsed = time.perf_counter() - start
+        rows.append({"abfrage": f"{count} Anzeigen speichern", "anzeigen_per_s": round(count / elapsed)})
+
+        queries = (
+            ("kommode", {}),
+            ("biedermeier kommode kirsch", {}),
+            ("sofa", {"price_min": 100, "price_max": 400}),
+            ("", {"plz": "10"}),
+            ("stuhl eiche", {"price_max": 150, "plz": "80331"}),
+        )
+        for text, filters in queries:
+            hits = len(archive.search(text, **filters))
+            elapsed = measure(lambda: archive.search(text, **filters), repeat=20)
+            rows.append({
+                "abfrage": " ".join([text] + [f"{k}={v}" for k, v in filters.items()]).strip(),
+                "treffer": hits,
+                "ms": round(elapsed, 2)
+            })
+        for text in ("kommode", "sessel vintage"):
+            stats = archive.price_stats(text)
+            elapsed = measure(lambda: archive.price_stats(text), repeat=20)
+            rows.append({"abfrage": f"Preisstatistik {text}", "treffer": stats["count"], "ms": round(elapsed, 2)})
+        archive.close()
+    return rows
+
+##################################################################
+# Near-duplicate detection: MinHash signatures and LSH lookups
+##################################################################
+
+@benchmark("dedup", key=["signaturen"], compare={
+    "signatur_us": -1, "aufbau_per_s": 1, "insert_us": -1, "query_p50_us": -1, "query_p95_us": -1
+})
+def bench_dedup():
+    import numpy as np
+    from dedup import DuplicateIndex
+
+    rng = np.random.default_rng(7)
+    index = DuplicateIndex()
+    listings = [info for info, _ in _synthetic_archive_listings(2000)]
+    start = time.perf_counter()
+    base = np.array([index.signature(info) for info in listings])
+    rows = [{"signaturen": len(listings), "signatur_us": round((time.perf_counter() - start) / len(listings) * 1e6, 1)}]
+
+    def variants(source, count, keep):
+        # Signatures from `source` with a share `keep` of their values left intact
+        picked = source[rng.integers(0, len(source), count)]
+        mask = rng.random(picked.shape) < keep[:, None]
+        return np.where(mask, picked, rng.integers(0, 2**32, picked.shape, dtype=np.uint32))
+
+    for count in (10_000, 100_000, 1_000_000):
+        index = DuplicateIndex()
+        signatures = variants(base, count, rng.uniform(0.0, 0.3, count))
+        keys = [str(i) for i in range(count)]
+        start = time.perf_counter()
+        index.add_signatures(keys, keys, signatures)
+        build = time.perf_counter() - start
+
+        # Reposts: about 80 % similar to an indexed listing
+        queries = variants(signatures, 1000, np.full(1000, 0.8))
+        timings = []
+        matches = 0
+        for signature in queries:
+            start = time.perf_counter()
+            matches += len(index.query(signature, 0.5))
+            timings.append((time.perf_counter() - start) * 1e6)
+        timings.sort()
+
+        start = time.perf_counter()
+        for i, signature in enumerate(queries):
+            index.add(f"neu{i}", "", signature)
+        insert = (time.perf_counter() - start) / len(queries)
+
+        rows.append({
+            "signaturen": count,
+            "aufbau_per_s": round(count / build),
+            "insert_us": round(insert * 1e6, 1),
+            "query_p50_us": round(timings[len(timings) // 2], 1),
+            "query_p95_us": round(timings[int(len(timings) * 0.95)], 1),
+            "treffer_pro_abfrage": round(matches / len(queries), 2)
+        })
+        del index, signatures
+    return rows
+
+##################################################################
+# KPI analytics: vectorised progress/projection vs. the per-KPI loop
+##################################################################
+
+def _legacy_weekly_progress(wochenwerte, monatsziele):
+    # Former Dashboard loop: one KPI at a time, 4 weeks per month
+    result = {}
+    for kpi_name, ziel in monatsziele.items():
+        if ziel == 0:
+            continue
+        prozentsatz = wochenwerte.get(kpi_name, 0) / ziel * 100
+        wochenziel = ziel / 4
+        stufen = [0, 25, wochenziel / ziel * 100, 75, 100]
+        for index, stufe in enumerate(stufen):
+            if prozentsatz <= stufe:
+                result[kpi_name] = (prozentsatz, index)
+                break
+    return result
+
+@benchmark("kpi", key=["kpis", "wochen"], compare={
+    "erster_aufruf_ms": -1, "woche_ms": -1, "was_waere_wenn_ms": -1, "alle_wochen_ms": -1
+})
+def bench_kpi():
+    import tempfile
+    from kpi_store import KPIStore
+    from kpi_history import HistoryEngine
+    from kpi_analytics import KPIAnalytics, select_stage
+
+    rows = []
+    for kpi_count, weeks in ((5, 52), (100, 260), (500, 260)):
+        kpis = [f"KPI {i}" for i in range(kpi_count)]
+        monatsziele = {kpi: random.randrange(10, 5000) for kpi in kpis}
+        data = {
+            "monatsziele": monatsziele,
+            "wochenwerte": {
+                str(woche): {kpi: random.randrange(0, ziel // 2) for kpi, ziel in monatsziele.items()}
+                for woche in range(1, weeks + 1)
+            }
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy_json = os.path.join(tmp, "kpi_data.json")
+            with open(legacy_json, "w") as f:
+                json.dump(data, f)
+            store = KPIStore(os.path.join(tmp, "kpi.sqlite"), legacy_json=legacy_json)
+            analytics = KPIAnalytics(HistoryEngine(store, 2026))
+
+            start = time.perf_counter()
+            analytics.analyse(weeks, kpis)
+            first = (time.perf_counter() - start) * 1000
+
+            wochenwerte = store.wochenwerte([weeks])[weeks]
+            legacy = measure(lambda: _legacy_weekly_progress(wochenwerte, monatsziele), repeat=20)
+
+            def week():
+                auswertung = analytics.analyse(weeks, kpis)
+                return select_stage(auswertung["prozent_woche"], [0, 25, 25, 75, 100])
+
+            what_if = {kpis[0]: monatsziele[kpis[0]] * 2}
+            rows.append({
+                "kpis": kpi_count,
+                "wochen": weeks,
+                "erster_aufruf_ms": round(first, 2),
+                "schleife_woche_ms": round(legacy, 3),
+                "woche_ms": round(measure(week, repeat=20), 2),
+                "was_waere_wenn_ms": round(measure(lambda: analytics.analyse(weeks, kpis, what_if), repeat=20), 2),
+                "alle_wochen_ms": round(measure(lambda: analytics.compute(kpis), repeat=5), 2)
+            })
+            store._conn().close()
+    return rows
+
+##################################################################
+# Result files and regression check
+##################################################################
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Matches rows to the baseline by their key fields and returns a message
+    for every compared field (see benchmark()) that got worse by more than
+    `tolerance` (a fraction) relative to the baseline.
+    """
+    regressions = []
+    for name, rows in results.items():
+        key, compare = COMPARED.get(name, ((), {}))
+        base_rows = {tuple(base.get(field) for field in key): base for base in baseline.get(name, [])}
+        for row in rows:
+            row_key = tuple(row.get(field) for field in key)
+            base = base_rows.get(row_key, {})
+            label = ", ".join(f"{field}={value}" for field, value in zip(key, row_key))
+            for field, direction in compare.items():
+                value, old = row.get(field), base.get(field)
+                if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                    continue
+                change = (value - old) / old * direction
+                if change < -tolerance:
+                    regressions.append(f"{name} ({label}): {field} {old} -> {value} ({abs(change):.0%} schlechter)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", nargs="?", const=BASELINE,
+                        help="JSON file of an earlier run to compare against (default: benchmark_baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown relative to the baseline (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.names or list(BENCHMARKS):
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+        print(f"== {name}")
+        results[name] = BENCHMARKS[name]()
+        for row in results[name]:
+            print("   " + "  ".join(f"{k}={v}" for k, v in row.items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": sys.version.split()[0],
+                "results": results
+            }, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# calendar_client.py
+
+import datetime
+import os
+import threading
+
+SCOPES = ["https://www.googleapis.com/auth/calendar"]
+
+# Google accepts at most 50 calls per batch request.
+MAX_BATCH_SIZE = 50
+
+def _event_body(summary, start_datetime, end_datetime):
+    return {
+        "summary": summary,
+        "start": {"dateTime": start_datetime.isoformat()},
+        "end": {"dateTime": end_datetime.isoformat()},
+    }
+
+class CalendarClient:
+    """
+    Long-lived Google Calendar client.
+
+    Credentials and the discovery-based service are built once and kept in
+    memory. A background timer refreshes the access token `refresh_margin`
+    seconds before it expires (and updates token.json), so requests never
+    wait for a refresh. Several inserts are sent as one batch HTTP request.
+    """
+
+    def __init__(self, token_path="token.json", credentials_path="credentials.json", refresh_margin=300):
+        self.token_path = token_path
+        self.credentials_path = credentials_path
+        self.refresh_margin = refresh_margin
+        self.last_refresh_error = None
+        self._creds = None
+        self._service = None
+        self._timer = None
+        # The service's httplib2 transport is not thread-safe
+        self._lock = threading.RLock()
+
+    def service(self):
+        """The cached Calendar API service, built on first use."""
+        with self._lock:
+            if self._service is None:
+                from googleapiclient.discovery import build
+
+                self._creds = self._load_credentials()
+                self._service = build("calendar", "v3", credentials=self._creds, cache_discovery=False)
+                self._schedule_refresh()
+            return self._service
+
+    def _load_credentials(self):
+        import google.auth.transport.requests
+        from google.oauth2.credentials import Credentials
+
+        creds = None
+        if os.path.exists(self.token_path):
+            creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
+
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(google.auth.transport.requests.Request())
+            else:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+                flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, SCOPES)
+                creds = flow.run_local_server(port=8080)
+            self._save(creds)
+        return creds
+
+    def _save(self, creds):
+        with open(self.token_path, "w") as token:
+            token.write(creds.to_json())
+
+    def _schedule_refresh(self, delay=None):
+        if self._timer:
+            self._timer.cancel()
+        if not self._creds.refresh_token:
+            return
+        if delay is None:
+            if self._creds.expiry is None:
+                return
+            # google-auth keeps the expiry as naive UTC
+            now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            delay = max(0, (self._creds.expiry - now).total_seconds() - self.refresh_margin)
+        self._timer = threading.Timer(delay, self._refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh(self):
+        import google.auth.transport.requests
+
+        try:
+            with self._lock:
+                self._creds.refresh(google.auth.transport.requests.Request())
+                self._save(self._creds)
+            self.last_refresh_error = None
+            self._schedule_refresh()
+        except Exception as e:
+            # Try again in a minute; the transport still refreshes on demand
+            self.last_refresh_error = e
+            self._schedule_refresh(delay=60)
+
+    def insert_events(self, events, calendar_id="primary"):
+        """
+        Inserts (summary, start_datetime, end_datetime) tuples with batch
+        requests of up to 50 events each. Returns the created events in
+        input order, with {"error": ...} dicts for failed inserts.
+        """
+        service = self.service()
+        results = [None] * len(events)
+
+        def store_result(request_id, response, exception):
+            if exception is not None:
+                results[int(request_id)] = {"error": f"An error occurred: {exception}"}
+            else:
+                results[int(request_id)] = response
+
+        for offset in range(0, len(events), MAX_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=store_result)
+            for i, (summary, start, end) in enumerate(events[offset:offset + MAX_BATCH_SIZE], start=offset):
+                batch.add(
+                    service.events().insert(calendarId=calendar_id, body=_event_body(summary, start, end)),
+                    request_id=str(i)
+                )
+            with self._lock:
+                batch.execute()
+        return results
+
+    def freebusy(self, start, end, calendar_id="primary"):
+        """Busy intervals of the calendar as returned by the free/busy API."""
+        body = {
+            "timeMin": start.astimezone().isoformat(),
+            "timeMax": end.astimezone().isoformat(),
+            "items": [{"id": calendar_id}]
+        }
+        service = self.service()
+        with self._lock:
+            response = service.freebusy().query(body=body).execute()
+        return response.get("calendars", {}).get(calendar_id, {}).get("busy", [])
@@ -0,0 +1,157 @@
+# calendar_index.py
+
+import bisect
+import datetime
+import hashlib
+import threading
+import time
+
+from availability import find_free_slots
+from instrumentation import tracer
+
+# Events longer than this are kept outside the sorted index, so a single
+# multi-week event doesn't widen every window query.
+LONG_EVENT = datetime.timedelta(days=7)
+
+def _to_local_naive(value):
+    """Dates become midnight, aware datetimes local time, so all events compare."""
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            return value.astimezone().replace(tzinfo=None)
+        return value
+    return datetime.datetime.combine(value, datetime.time())
+
+def parse_ics(content):
+    """Parses an ICS feed into a list of {"summary", "start", "end", "all_day"} dicts."""
+    with tracer.span("ics.parse", bytes=len(content)) as span:
+        events = _parse_events(content)
+        span["events"] = len(events)
+    return events
+
+def _parse_events(content):
+    from icalendar import Calendar
+
+    events = []
+    for component in Calendar.from_ical(content).walk("VEVENT"):
+        dtstart = component.get("dtstart")
+        if dtstart is None:
+            continue
+        all_day = not isinstance(dtstart.dt, datetime.datetime)
+        start = _to_local_naive(dtstart.dt)
+
+        dtend = component.get("dtend")
+        duration = component.get("duration")
+        if dtend is not None:
+            end = _to_local_naive(dtend.dt)
+        elif duration is not None:
+            end = start + duration.dt
+        else:
+            end = start + datetime.timedelta(days=1) if all_day else start
+
+        events.append({
+            "summary": str(component.get("summary", "")),
+            "start": start,
+            "end": end,
+            "all_day": all_day
+        })
+    return events
+
+class EventIndex:
+    """
+    Immutable index of events sorted by start time. Window queries use
+    binary search, so they cost O(log n + k) instead of a full scan.
+    """
+
+    def __init__(self, events):
+        self.events = sorted(events, key=lambda e: e["start"])
+        self._short = [e for e in self.events if e["end"] - e["start"] <= LONG_EVENT]
+        self._long = [e for e in self.events if e["end"] - e["start"] > LONG_EVENT]
+        self._starts = [e["start"] for e in self._short]
+
+    def between(self, start, end):
+        """Events overlapping the interval [start, end), sorted by start."""
+        lo = bisect.bisect_left(self._starts, start - LONG_EVENT)
+        hi = bisect.bisect_left(self._starts, end)
+        hits = [e for e in self._short[lo:hi] if e["end"] > start]
+        long_hits = [e for e in self._long if e["start"] < end and e["end"] > start]
+        if long_hits:
+            hits = sorted(hits + long_hits, key=lambda e: e["start"])
+        return hits
+
+    def upcoming(self, days, now=None):
+        """Events in the next `days` days (including ones already running)."""
+        now = now or datetime.datetime.now()
+        return self.between(now, now + datetime.timedelta(days=days))
+
+    def free_slots(self, date, day_start=datetime.time(9), day_end=datetime.time(18)):
+        """Gaps between events on `date` within the given day hours, as (start, end) tuples."""
+        window = (datetime.datetime.combine(date, day_start), datetime.datetime.combine(date, day_end))
+        busy = [(e["start"], e["end"]) for e in self.between(*window)]
+        return find_free_slots(busy, [window], min_minutes=0)
+
+class CalendarFeed:
+    """
+    Cached ICS feed. The first call loads the feed synchronously; after
+    that get_index() always answers from memory and, once the data is older
+    than `max_age` seconds, revalidates it in a background thread with a
+    conditional GET. The feed is only reparsed when its content changed.
+    `session` is anything with a requests-style get(), e.g. the shared
+    HttpClient or a requests.Session.
+    """
+
+    def __init__(self, url, session, max_age=300):
+        self.url = url
+        self.max_age = max_age
+        self.session = session
+        self.error = None
+        self._index = None
+        self._etag = None
+        self._last_modified = None
+        self._digest = None
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get_index(self):
+        """Returns the current EventIndex, or None if the feed never loaded."""
+        if self._index is None:
+            self.refresh()
+        elif time.time() - self._fetched_at > self.max_age:
+            self._refresh_in_background()
+        return self._index
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def refresh(self):
+        """Revalidates the feed now and rebuilds the index if it changed."""
+        import requests
+
+        headers = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+        try:
+            with tracer.span("ics.fetch") as span:
+                response = self.session.get(self.url, headers=headers)
+                span["status_code"] = response.status_code
+            if response.status_code != 304:
+                response.raise_for_status()
+                digest = hashlib.sha256(response.content).hexdigest()
+                if digest != self._digest:
+                    self._index = EventIndex(parse_ics(response.content))
+                    self._digest = digest
+                self._etag = response.headers.get("ETag")
+                self._last_modified = response.headers.get("Last-Modified")
+            self.error = None
+        except (requests.RequestException, ValueError) as e:
+            # Keep serving the last good index; retry after max_age
+            self.error = e
+        finally:
+            self._fetched_at = time.time()
+            self._refreshing = False
@@ -7,3 +7,145 @@ SETTINGS = {
     "top_p": 0.9,
     "top_k": 40
 }
+
+# Scraping of Kleinanzeigen listings (single and batch mode).
+SCRAPER_SETTINGS = {
+    "max_workers": 4,            # parallel downloads in batch mode
+    "min_host_interval": 2.0,    # seconds between two requests to the same host
+    "host_interval_jitter": 1.0  # random extra delay on top of min_host_interval
+}
+
+# Shared HTTP client for scraping, the ICS feed and Google Places.
+HTTP_SETTINGS = {
+    "connect_timeout": 3.05,     # seconds
+    "read_timeout": 15,          # seconds
+    "retries": 3,                # extra attempts on connection errors, timeouts, 429 and 5xx
+    "backoff": 1.0,              # base of the exponential backoff (seconds)
+    "max_backoff": 8.0,
+    "max_retry_after": 30.0,     # longest Retry-After (429/503) still waited for
+    "pool_maxsize": 10           # keep-alive connections kept per host
+}
+
+# On-disk cache for extracted listings.
+CACHE_SETTINGS = {
+    "path": "listing_cache.sqlite",
+    "ttl": 6 * 3600,            # seconds an entry is served without revalidation
+    "max_bytes": 5 * 1024 * 1024
+}
+
+# Cache for generated LLM messages (keyed by provider, model, options and prompt).
+RESPONSE_CACHE_SETTINGS = {
+    "path": "response_cache.sqlite",
+    "max_memory_entries": 256,
+    "ttl": 7 * 24 * 3600
+}
+
+# Bulk message generation: parallel LLM requests per provider.
+BULK_SETTINGS = {
+    "ollama_concurrency": 1,     # the local Ollama server works through a queue (also caps the slider)
+    "openai_concurrency": 8,
+    "max_concurrency": 16        # upper end of the "Parallele Anfragen" slider
+}
+
+# KPI dashboard storage. kpi_data.json is imported once into the database.
+KPI_SETTINGS = {
+    "db_path": "kpi_data.sqlite",
+    "legacy_json": "kpi_data.json",
+    "start_year": 2026,          # "Woche 1" is ISO week 1 of this year, later weeks continue
+    "rolling_window": 4,         # weeks in the rolling average of the Verlauf
+    "projection_band": 0.8       # confidence of the band around the month-end projection
+}
+
+# ICS calendar feed.
+CALENDAR_SETTINGS = {
+    "max_age": 300,              # seconds before the feed is revalidated in the background
+    "upcoming_days": 14          # default window of the calendar overview
+}
+
+# Free-slot finder for appointment proposals.
+AVAILABILITY_SETTINGS = {
+    "work_start": "09:00",
+    "work_end": "18:00",
+    "workdays": [0, 1, 2, 3, 4, 5],  # Monday to Saturday
+    "travel_buffer_minutes": 45,     # kept free before and after every appointment
+    "slot_minutes": 60,              # length of a viewing appointment
+    "lead_minutes": 120,             # earliest proposal: this long after now ...
+    "round_minutes": 30,             # ... and on this grid (14:30, not 14:37)
+    "horizon_days": 7,
+    "busy_ttl": 15 * 60,             # seconds the Google free/busy answer is reused
+    "top_n": 3
+}
+
+# Hotel search via Google Places (base_url can point to a local stub server).
+PLACES_SETTINGS = {
+    "api_key": "YOUR_GOOGLE_API_KEY_HERE",
+    "base_url": "https://maps.googleapis.com/maps/api/place/textsearch/json",
+    "cache_path": "hotel_cache.sqlite",
+    "ttl": 7 * 24 * 3600,
+    "token_ttl": 120             # seconds a stored next_page_token is used (Google expires them)
+}
+
+# Google Calendar access (OAuth2). The token is refreshed this many seconds before it expires.
+GOOGLE_CALENDAR_SETTINGS = {
+    "token_path": "token.json",
+    "credentials_path": "credentials.json",
+    "refresh_margin": 300
+}
+
+# Background jobs (scraping, LLM generation, hotel search)
+JOB_SETTINGS = {
+    "max_workers": 4,
+    "max_finished": 50,
+    "poll_interval": 0.5
+}
+
+# Local Ollama server. keep_alive holds the model in memory between requests
+# (Ollama duration string, e.g. "30m"; -1 keeps it loaded indefinitely).
+OLLAMA_SETTINGS = {
+    "host": "http://localhost:11434",
+    "keep_alive": "30m",
+    "preload": True              # load the model in the background when the app starts
+}
+
+# LLM routing: providers tried after the chosen one fails, optional hedging
+# (seconds without a first token before the next provider is asked as well)
+# and the number of recent requests behind the latency statistics.
+ROUTER_SETTINGS = {
+    "fallback": ["ollama", "openai"],
+    "hedge_after": None,
+    "window": 100
+}
+
+# Span/counter recording for the performance page (pages/Performance.py, open with ?perf=1).
+INSTRUMENTATION_SETTINGS = {
+    "enabled": True,
+    "max_spans": 5000,           # ring buffer of finished spans
+    "export_path": None          # e.g. "traces.jsonl" to append every span as a JSON line
+}
+
+# Text templates for the Schnellmodus (no LLM). Files are reloaded when they change on disk.
+TEMPLATE_SETTINGS = {
+    "files": {
+        "furniture": "text_templates_furniture.json",
+        "general": "text_templates.json"
+    },
+    "check_interval": 1.0,       # seconds between modification-time checks
+    "closing": "Viele Grüße\nGabi"
+}
+
+# Archive of every analysed listing with full-text search (see archive.py).
+ARCHIVE_SETTINGS = {
+    "path": "listing_archive.sqlite",
+    "search_limit": 50           # results shown per search
+}
+
+# Near-duplicate detection of listings (MinHash/LSH, see dedup.py).
+DEDUP_SETTINGS = {
+    "path": "dedup_index.npz",
+    "num_perm": 128,             # MinHash values per listing
+    "bands": 32,                 # LSH bands (num_perm / bands values each)
+    "shingle_size": 5,           # characters per shingle
+    "similar_threshold": 0.5,    # estimated similarity shown as "ähnlich"
+    "duplicate_threshold": 0.75, # ... and as "wahrscheinlich ein Duplikat"
+    "save_interval": 30.0        # seconds between two saves of the index file
+}
@@ -0,0 +1,237 @@
+# dedup.py
+
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from extractors import DEFAULTS as PAGE_DEFAULTS
+from listing_parser import DEFAULTS as TEXT_DEFAULTS
+
+# Placeholders of missing fields would make unrelated listings look alike.
+PLACEHOLDERS = frozenset(PAGE_DEFAULTS.values()) | frozenset(TEXT_DEFAULTS.values())
+NON_WORD_RE = re.compile(r"\W+")
+
+def listing_text(info):
+    """Title and description of a listing, lower-cased, punctuation collapsed."""
+    parts = [info.get(field) for field in ("title", "description")]
+    text = " ".join(part for part in parts if part and part not in PLACEHOLDERS)
+    return NON_WORD_RE.sub(" ", text.lower()).strip()
+
+def shingle_hashes(text, size=5):
+    """
+    64-bit hashes of the distinct character `size`-grams of `text`,
+    computed as a polynomial rolling hash over all windows at once.
+    """
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) == 0:
+        return codes
+    if len(codes) < size:
+        codes = np.concatenate([codes, np.zeros(size - len(codes), dtype=np.uint64)])
+    windows = np.lib.stride_tricks.sliding_window_view(codes, size)
+    powers = np.uint64(1_000_003) ** np.arange(size - 1, -1, -1, dtype=np.uint64)
+    return np.unique((windows * powers).sum(axis=1))
+
+class DuplicateIndex:
+    """
+    Near-duplicate detection for listings with MinHash and LSH.
+
+    Each listing's title and description are shingled into character
+    n-grams and reduced to a MinHash signature of `num_perm` values; the
+    share of equal values between two signatures estimates the Jaccard
+    similarity of the shingle sets. The signatures are split into `bands`
+    bands, and listings that agree on a whole band are candidates, so a
+    lookup only compares against a few candidates instead of every
+    listing seen so far.
+
+    The band keys live in sorted arrays ("runs"): new listings collect in
+    a small unsorted tail, which becomes a run once it is full, and runs
+    of similar size are merged, so inserts stay cheap and a lookup is a
+    binary search per run. With a `path`, signatures are saved by save()
+    and loaded again on start; save() writes at most every `save_interval`
+    seconds unless forced.
+    """
+
+    def __init__(self, path=None, num_perm=128, bands=32, shingle_size=5, seed=1, tail_size=256,
+                 save_interval=0.0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.tail_size = tail_size
+        self.save_interval = save_interval
+        rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash functions (a odd); uint64 arithmetic wraps
+        self._a = rng.integers(0, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self._band_mult = rng.integers(0, 2**63, rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._band_salt = rng.integers(0, 2**63, bands, dtype=np.uint64)
+        self._signatures = np.empty((1024, num_perm), dtype=np.uint32)
+        self._keys = []
+        self._labels = []
+        self._positions = {}
+        self._runs = []
+        self._tail_start = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = float("-inf")
+        if path and os.path.exists(path):
+            self._load()
+            self._dirty = False
+
+    def __len__(self):
+        return len(self._positions)
+
+    def signature(self, info):
+        """MinHash signature of a listing, or None if it has no text to compare."""
+        text = listing_text(info)
+        if not text:
+            return None
+        return self.signature_of_shingles(shingle_hashes(text, self.shingle_size))
+
+    def signature_of_shingles(self, hashes):
+        hashed = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def check(self, key, label, info, threshold):
+        """
+        Listings seen before that are at least `threshold` similar to this
+        one (most similar first), then adds the listing to the index.
+        Checking the same key again never matches the listing itself.
+        """
+        signature = self.signature(info)
+        if signature is None:
+            return []
+        # One lock for both, so two similar listings checked at the same
+        # time still see each other
+        with self._lock:
+            matches = self._query(signature, threshold, key)
+            self._add([key], [label], signature[None, :])
+        return matches
+
+    def query(self, signature, threshold, exclude=None):
+        """[{key, label, similarity}] of the indexed listings similar to `signature`."""
+        with self._lock:
+            return self._query(signature, threshold, exclude)
+
+    def _query(self, signature, threshold, exclude):
+        band_keys = self._band_keys(signature[None, :])[0]
+        candidates = []
+        for run_keys, run_rows in self._runs:
+            starts = np.searchsorted(run_keys, band_keys, "left")
+            ends = np.searchsorted(run_keys, band_keys, "right")
+            candidates.extend(run_rows[start:end] for start, end in zip(starts, ends) if end > start)
+        tail = self._band_keys(self._signatures[self._tail_start:len(self._keys)])
+        candidates.append(np.nonzero((tail == band_keys).any(axis=1))[0] + self._tail_start)
+        rows = np.unique(np.concatenate(candidates))
+        similarity = (self._signatures[rows] == signature).mean(axis=1)
+        matches = [
+            {"key": self._keys[row], "label": self._labels[row], "similarity": round(float(sim), 3)}
+            for row, sim in zip(rows, similarity)
+            if sim >= threshold and self._keys[row] not in (None, exclude)
+        ]
+        return sorted(matches, key=lambda match: -match["similarity"])
+
+    def add(self, key, label, signature):
+        """Adds or replaces the signature stored for `key`."""
+        self.add_signatures([key], [label], signature[None, :])
+
+    def add_signatures(self, keys, labels, signatures):
+        """Adds many signatures (an array of shape (n, num_perm)) at once."""
+        with self._lock:
+            self._add(keys, labels, signatures)
+
+    def _add(self, keys, labels, signatures):
+        for key, label, signature in zip(keys, labels, signatures):
+            self._dirty = True
+            row = self._positions.get(key)
+            if row is not None and (row >= self._tail_start or (self._signatures[row] == signature).all()):
+                # Tail rows are banded on demand, so they can change in place
+                self._signatures[row] = signature
+                self._labels[row] = label
+                continue
+            if row is not None:
+                # Its band keys are already sorted into a run: retire the row
+                self._keys[row] = None
+            row = len(self._keys)
+            if row == len(self._signatures):
+                grown = np.empty((2 * row, self.num_perm), dtype=np.uint32)
+                grown[:row] = self._signatures
+                self._signatures = grown
+            self._signatures[row] = signature
+            self._keys.append(key)
+            self._labels.append(label)
+            self._positions[key] = row
+        if len(self._keys) - self._tail_start >= self.tail_size:
+            self._flush_tail()
+
+    def _band_keys(self, signatures):
+        # One 64-bit key per band, salted per band so all bands share one key space
+        rows = self.num_perm // self.bands
+        banded = signatures.astype(np.uint64).reshape(len(signatures), self.bands, rows)
+        return (banded * self._band_mult).sum(axis=2) ^ self._band_salt
+
+    def _flush_tail(self):
+        end = len(self._keys)
+        keys = self._band_keys(self._signatures[self._tail_start:end]).ravel()
+        rows = np.repeat(np.arange(self._tail_start, end, dtype=np.int32), self.bands)
+        order = np.argsort(keys, kind="stable")
+        self._runs.append((keys[order], rows[order]))
+        self._tail_start = end
+        # Merge runs of similar size so there are only O(log n) of them
+        while len(self._runs) > 1 and len(self._runs[-2][0]) <= 2 * len(self._runs[-1][0]):
+            (keys_a, rows_a), (keys_b, rows_b) = self._runs.pop(-2), self._runs.pop()
+            keys = np.concatenate([keys_a, keys_b])
+            rows = np.concatenate([rows_a, rows_b])
+            order = np.argsort(keys, kind="stable")
+            self._runs.append((keys[order], rows[order]))
+
+    def save(self, force=False):
+        """
+        Writes all signatures to `path` (atomically, via a temporary file)
+        if anything changed, and at most every `save_interval` seconds
+        unless `force` is set, e.g. at the end of a batch.
+        """
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty or (not force and time.monotonic() - self._saved_at < self.save_interval):
+                    return
+                # Copy under the lock, write without it, so checks go on meanwhile
+                rows = sorted(self._positions.values())
+                signatures = self._signatures[rows]
+                keys = np.array([self._keys[row] for row in rows], dtype=str)
+                labels = np.array([self._labels[row] for row in rows], dtype=str)
+                self._dirty = False
+                self._saved_at = time.monotonic()
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    np.savez(
+                        f,
+                        params=np.array([self.num_perm, self.bands, self.shingle_size, self.seed]),
+                        signatures=signatures, keys=keys, labels=labels
+                    )
+                os.replace(tmp, self.path)
+            except OSError:
+                with self._lock:
+                    self._dirty = True
+                raise
+
+    def _load(self):
+        with np.load(self.path) as data:
+            if list(data["params"]) != [self.num_perm, self.bands, self.shingle_size, self.seed]:
+                # Signatures from other settings aren't comparable; start over
+                return
+            self.add_signatures(data["keys"].tolist(), data["labels"].tolist(), data["signatures"])
+        with self._lock:
+            if len(self._keys) > self._tail_start:
+                self._flush_tail()
@@ -0,0 +1,122 @@
+# extractors.py
+
+import json
+import os
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+SELECTOR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extractors.json")
+
+DEFAULTS = {
+    "title": "Nicht gefunden",
+    "description": "Nicht gefunden",
+    "price": "Nicht gefunden",
+    "location": "Keine Adresse gefunden"
+}
+
+# Meta tags that carry the same information as the selectors.
+META_FIELDS = {
+    "title": ("og:title",),
+    "description": ("og:description", "description"),
+    "price": ("product:price:amount", "og:price:amount")
+}
+
+@lru_cache(maxsize=None)
+def parser_name():
+    """lxml if it is installed (much faster), else Python's html.parser."""
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+@lru_cache(maxsize=None)
+def load_site_config(path=SELECTOR_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def site_selectors(url, path=SELECTOR_FILE):
+    """Selector config for the site of `url` (matched by domain suffix), else 'default'."""
+    config = load_site_config(path)
+    host = urlsplit(url).netloc.lower()
+    for site, selectors in config.items():
+        if site != "default" and (host == site or host.endswith("." + site)):
+            return selectors
+    return config["default"]
+
+def _strainer(selectors):
+    # Only build tree nodes for JSON-LD/meta and the tags the selectors use.
+    from bs4 import SoupStrainer
+
+    tags = {"script", "meta"}
+    for candidates in selectors.values():
+        tags.update(candidate["tag"] for candidate in candidates)
+    return SoupStrainer(list(tags))
+
+def _from_json_ld(soup):
+    found = {}
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            items = data.get("@graph", [data])
+        elif isinstance(data, list):
+            items = data
+        else:
+            # Valid JSON, but not an object (e.g. a bare string or number)
+            continue
+        if not isinstance(items, list):
+            items = [items]
+        for item in items:
+            if not isinstance(item, dict) or item.get("@type") not in ("Product", "Offer", "IndividualProduct"):
+                continue
+            found.setdefault("title", item.get("name"))
+            found.setdefault("description", item.get("description"))
+            offers = item.get("offers")
+            if isinstance(offers, list):
+                offers = offers[0] if offers else None
+            if isinstance(offers, dict) and offers.get("price") is not None:
+                currency = offers.get("priceCurrency", "")
+                found.setdefault("price", f"{offers['price']} {currency}".strip())
+    return {k: str(v).strip() for k, v in found.items() if v}
+
+def _from_meta(soup):
+    found = {}
+    for field, names in META_FIELDS.items():
+        for name in names:
+            tag = soup.find("meta", attrs={"property": name}) or soup.find("meta", attrs={"name": name})
+            if tag and tag.get("content", "").strip():
+                found[field] = tag["content"].strip()
+                break
+    return found
+
+def _from_selectors(soup, selectors):
+    found = {}
+    for field, candidates in selectors.items():
+        for candidate in candidates:
+            attrs = {k: v for k, v in candidate.items() if k != "tag"}
+            if "class" in attrs:
+                attrs["class_"] = attrs.pop("class")
+            tag = soup.find(candidate["tag"], **attrs)
+            if tag and tag.get_text().strip():
+                found[field] = tag.get_text().strip()
+                break
+    return found
+
+def extract_listing(content, url):
+    """
+    Extracts title, description, price and location from a listing page.
+    Structured data (JSON-LD, then meta tags) is used first; the per-site
+    selectors from extractors.json fill in whatever is still missing.
+    """
+    from bs4 import BeautifulSoup
+
+    selectors = site_selectors(url)
+    soup = BeautifulSoup(content, parser_name(), parse_only=_strainer(selectors))
+
+    info = _from_selectors(soup, selectors)
+    info.update(_from_meta(soup))
+    info.update(_from_json_ld(soup))
+    return {field: info.get(field) or default for field, default in DEFAULTS.items()}
@@ -0,0 +1,77 @@
+# gauges.py
+
+import math
+
+import plotly.graph_objects as go
+
+LAYOUT = dict(paper_bgcolor="rgba(0,0,0,0)", font={'color': "darkblue", 'family': "Arial"})
+
+def _gauge_style(value, max_value):
+    return {
+        'axis': {'range': [None, max_value], 'tickwidth': 1, 'tickcolor': "darkblue"},
+        'bar': {'color': "lightgray"},
+        'bgcolor': "white",
+        'borderwidth': 2,
+        'bordercolor': "gray",
+        'steps': [
+            {'range': [0, value], 'color': "blue"}
+        ],
+        'threshold': {
+            'line': {'color': "red", 'width': 4},
+            'thickness': 0.75,
+            'value': value}}
+
+def create_gauge(title, value, max_value):
+    """Single gauge as its own figure."""
+    fig = go.Figure(go.Indicator(
+        mode = "gauge+number+delta",
+        value = value,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': title, 'font': {'size': 14}},
+        delta = {'reference': max_value, 'increasing': {'color': "green"}, 'decreasing': {'color': "red"}},
+        gauge = _gauge_style(value, max_value)))
+    fig.update_layout(width=300, height=250, margin=dict(l=10, r=10, t=30, b=10), **LAYOUT)
+    return fig
+
+class GaugePanel:
+    """
+    All gauges as indicators in one figure, so a rerun sends a single
+    Plotly payload instead of one per KPI. The layout is built once per
+    set of titles; update() only patches the gauges whose value changed.
+    """
+
+    def __init__(self, titles, max_value=100, columns=5):
+        self.titles = tuple(titles)
+        self.max_value = max_value
+        self.values = [None] * len(self.titles)
+
+        columns = max(1, min(columns, len(self.titles)))
+        rows = math.ceil(len(self.titles) / columns)
+        self.figure = go.Figure()
+        for i, title in enumerate(self.titles):
+            self.figure.add_trace(go.Indicator(
+                mode="gauge+number+delta",
+                value=0,
+                domain={'row': i // columns, 'column': i % columns},
+                title={'text': title, 'font': {'size': 14}},
+                delta={'reference': max_value, 'increasing': {'color': "green"}, 'decreasing': {'color': "red"}},
+                gauge=_gauge_style(0, max_value)))
+        self.figure.update_layout(
+            grid={'rows': rows, 'columns': columns, 'pattern': "independent"},
+            height=250 * rows,
+            margin=dict(l=10, r=10, t=30, b=10),
+            **LAYOUT
+        )
+
+    def update(self, values):
+        """Sets the gauge values (in title order) and returns the figure."""
+        changed = [(i, v) for i, v in enumerate(values) if v != self.values[i]]
+        if changed:
+            with self.figure.batch_update():
+                for i, value in changed:
+                    trace = self.figure.data[i]
+                    trace.value = value
+                    trace.gauge.steps = [{'range': [0, value], 'color': "blue"}]
+                    trace.gauge.threshold.value = value
+                    self.values[i] = value
+        return self.figure
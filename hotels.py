@@ -0,0 +1,131 @@
+# hotels.py
+
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from instrumentation import tracer
+
+PLZ_RE = re.compile(r"\b(\d{5})\b")
+
+class PlacesError(Exception):
+    pass
+
+def location_key(location):
+    """
+    Cache key for a hotel search area: the postal code if the location
+    contains one (e.g. '10115 Berlin Mitte' -> 'plz:10115'), otherwise the
+    normalised place name.
+    """
+    match = PLZ_RE.search(location)
+    if match:
+        return f"plz:{match.group(1)}"
+    return "ort:" + " ".join(location.lower().split())
+
+class HotelLookup:
+    """
+    Google Places text search for hotels with a persistent per-area cache.
+
+    Results are stored page by page; page n is only requested when the UI
+    asks for it, using the next_page_token stored with page n-1. All pages
+    of an area expire together with its first page after `ttl` seconds.
+    Google's page tokens expire much sooner: once the token is older than
+    `token_ttl` seconds, the area is fetched again from its first page.
+    """
+
+    def __init__(self, path, api_key, base_url, client, ttl=7 * 24 * 3600, token_delay=2.0, token_ttl=120):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.client = client
+        self.ttl = ttl
+        self.token_ttl = token_ttl
+        self.token_delay = token_delay
+        self.stats = {"hits": 0, "api_calls": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS hotel_pages ("
+                " area TEXT NOT NULL,"
+                " page INTEGER NOT NULL,"
+                " results TEXT NOT NULL,"
+                " next_token TEXT,"
+                " fetched_at REAL NOT NULL,"
+                " PRIMARY KEY (area, page))"
+            )
+
+    def page(self, location, page=0):
+        """Returns (hotels, has_more) for the 0-based result page of `location`."""
+        area = location_key(location)
+        # The lock only guards the cache; API calls and the token delay run
+        # outside it, so one slow area doesn't hold up all other lookups.
+        with self._lock:
+            pages = self._load(area)
+            if pages and time.time() - pages[0][2] <= self.ttl and page < len(pages):
+                self.stats["hits"] += 1
+                tracer.count("places.cache_hits")
+
+        restarted = not pages or time.time() - pages[0][2] > self.ttl
+        if restarted:
+            pages = [self._fetch(area, 0, {"query": f"hotels in {location}"})]
+        while len(pages) <= page and pages[-1][1]:
+            if not restarted and time.time() - pages[-1][2] > self.token_ttl:
+                # The stored token has expired at Google: start the area over
+                restarted = True
+                pages = [self._fetch(area, 0, {"query": f"hotels in {location}"})]
+                continue
+            pages.append(self._fetch(area, len(pages), {"pagetoken": pages[-1][1]}))
+
+        if page >= len(pages):
+            return [], False
+        hotels, next_token, _ = pages[page]
+        return hotels, next_token is not None
+
+    def _load(self, area):
+        rows = self._conn.execute(
+            "SELECT results, next_token, fetched_at FROM hotel_pages WHERE area = ? ORDER BY page",
+            (area,)
+        ).fetchall()
+        return [(json.loads(results), token, fetched_at) for results, token, fetched_at in rows]
+
+    def _fetch(self, area, page, params):
+        data = self._request(params)
+        if data.get("status") == "INVALID_REQUEST" and "pagetoken" in params:
+            # Google activates next_page_token only after a short delay
+            with tracer.span("places.token_delay"):
+                time.sleep(self.token_delay)
+            data = self._request(params)
+        if data.get("status") not in ("OK", "ZERO_RESULTS"):
+            raise PlacesError(data.get("error_message") or data.get("status", "Unbekannter Fehler"))
+
+        hotels = [
+            {
+                "name": r.get("name"),
+                "address": r.get("formatted_address"),
+                "rating": r.get("rating", "Keine Bewertung")
+            }
+            for r in data.get("results", [])
+        ]
+        next_token = data.get("next_page_token")
+        fetched_at = time.time()
+        with self._lock, self._conn:
+            if page == 0:
+                # A new first page starts the area over
+                self._conn.execute("DELETE FROM hotel_pages WHERE area = ?", (area,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO hotel_pages VALUES (?, ?, ?, ?, ?)",
+                (area, page, json.dumps(hotels, ensure_ascii=False), next_token, fetched_at)
+            )
+        return hotels, next_token, fetched_at
+
+    def _request(self, params):
+        with self._lock:
+            self.stats["api_calls"] += 1
+        with tracer.span("places.request", page_token="pagetoken" in params) as span:
+            response = self.client.get(self.base_url, params=dict(params, key=self.api_key))
+            response.raise_for_status()
+            data = response.json()
+            span["results"] = len(data.get("results", []))
+        return data
@@ -0,0 +1,163 @@
+# http_client.py
+
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_SETTINGS
+from instrumentation import percentile, tracer
+
+# Responses worth another attempt; everything else is returned to the caller.
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Responses whose Retry-After header says when to try again.
+RETRY_AFTER_STATUS = {429, 503}
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes "br" only if brotli is installed)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+class HttpClient:
+    """
+    HTTP client shared by all integrations (scraper, ICS feed, Places).
+
+    One requests.Session keeps a keep-alive connection pool per host, every
+    request gets explicit connect/read timeouts, and connection errors,
+    timeouts and 429/5xx answers are retried with exponential backoff and
+    full jitter. A Retry-After on 429/503 is honoured up to
+    `max_retry_after` seconds; a longer one ends the retries. Latency,
+    error and retry counts are tracked per host.
+    """
+
+    def __init__(self, connect_timeout=3.05, read_timeout=15, retries=3, backoff=1.0,
+                 max_backoff=8.0, max_retry_after=30.0, pool_maxsize=10):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method, url, retries=None, throttle=None, **kwargs):
+        """
+        Sends a request with the shared retry policy. Returns the last
+        response (callers still call raise_for_status) or raises the last
+        requests exception once all attempts failed. `throttle` (e.g. the
+        scraper's HostThrottle) is waited on before every attempt, so
+        retries keep the per-host interval as well.
+        """
+        retries = self.retries if retries is None else retries
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc.lower()
+
+        with tracer.span("http.request", method=method, host=host) as span:
+            for attempt in range(retries + 1):
+                span["attempts"] = attempt + 1
+                if throttle is not None:
+                    throttle.wait(url)
+                start = time.perf_counter()
+                delay = self._backoff_delay(attempt)
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout):
+                    self._record(host, start, error=True)
+                    if attempt == retries:
+                        raise
+                else:
+                    span["status_code"] = response.status_code
+                    self._record(host, start, error=response.status_code >= 500)
+                    if response.status_code not in RETRY_STATUS or attempt == retries:
+                        return response
+                    if response.status_code in RETRY_AFTER_STATUS:
+                        retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                        if retry_after is not None:
+                            if retry_after > self.max_retry_after:
+                                span["retry_after"] = retry_after
+                                return response
+                            delay = max(delay, retry_after)
+                self._record_retry(host)
+                with tracer.span("http.backoff", host=host, attempt=attempt + 1):
+                    time.sleep(delay)
+
+    def _backoff_delay(self, attempt):
+        # "Full jitter": uniformly random up to the exponential cap
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _host(self, host):
+        if host not in self._metrics:
+            self._metrics[host] = {"requests": 0, "errors": 0, "retries": 0, "latencies": deque(maxlen=500)}
+        return self._metrics[host]
+
+    def _record(self, host, start, error):
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            metrics = self._host(host)
+            metrics["requests"] += 1
+            metrics["errors"] += int(error)
+            metrics["latencies"].append(elapsed)
+
+    def _record_retry(self, host):
+        with self._lock:
+            self._host(host)["retries"] += 1
+
+    def host_metrics(self):
+        """Per-host request count, error rate, retries and latency percentiles (ms)."""
+        rows = []
+        with self._lock:
+            for host, metrics in sorted(self._metrics.items()):
+                latencies = sorted(metrics["latencies"])
+                rows.append({
+                    "host": host,
+                    "requests": metrics["requests"],
+                    "errors": metrics["errors"],
+                    "error_rate": round(metrics["errors"] / metrics["requests"], 3) if metrics["requests"] else 0.0,
+                    "retries": metrics["retries"],
+                    "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                    "p95_ms": round(percentile(latencies, 95) * 1000, 1)
+                })
+        return rows
+
+def retry_after_seconds(value):
+    """
+    Seconds to wait according to a Retry-After header, given either as
+    seconds or as an HTTP date; None if missing or unreadable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """The process-wide HttpClient configured from HTTP_SETTINGS."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(**HTTP_SETTINGS)
+        return _client
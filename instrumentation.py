@@ -0,0 +1,169 @@
+# instrumentation.py
+
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import INSTRUMENTATION_SETTINGS
+
+# The span that is open in the current thread / task; new spans become its children.
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile `pct` (0-100) of an already sorted list; 0.0 if empty."""
+    if not sorted_values:
+        return 0.0
+    index = round(pct / 100 * (len(sorted_values) - 1))
+    return sorted_values[index]
+
+class Tracer:
+    """
+    In-process tracing for the hot paths: timed spans with attributes and
+    monotonic counters.
+
+    Finished spans are kept in a ring buffer of `max_spans` and, if
+    `export_path` is set, appended to that file as JSON lines. Nested spans
+    share the trace id of the span that was open when they started; worker
+    threads join a trace when they run inside contextvars.copy_context().
+    """
+
+    def __init__(self, max_spans=5000, export_path=None, enabled=True):
+        self.enabled = enabled
+        self.export_path = export_path
+        self._spans = deque(maxlen=max_spans)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Times the with-block as a child of the current span; the yielded dict takes more attributes."""
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span["attributes"]
+        except BaseException as e:
+            self.end_span(span, error=e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    def start_span(self, name, **attributes):
+        """
+        Opens a span without making it the current one, for code that can't
+        use a with-block (e.g. generators that outlive the caller's frame).
+        Finish it with end_span().
+        """
+        parent = _current_span.get()
+        return {
+            "name": name,
+            "trace_id": parent["trace_id"] if parent else os.urandom(16).hex(),
+            "span_id": os.urandom(8).hex(),
+            "parent_id": parent["span_id"] if parent else None,
+            "start": time.time(),
+            "attributes": attributes,
+            "_perf": time.perf_counter()
+        }
+
+    def end_span(self, span, error=None, **attributes):
+        span["attributes"].update(attributes)
+        span["duration_ms"] = round((time.perf_counter() - span.pop("_perf")) * 1000, 3)
+        span["status"] = "error" if error is not None else "ok"
+        if error is not None:
+            span["error"] = f"{type(error).__name__}: {error}"
+        if not self.enabled:
+            return
+        with self._lock:
+            self._spans.append(span)
+            if self.export_path:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def spans(self, limit=None):
+        """Finished spans, newest first."""
+        with self._lock:
+            spans = list(self._spans)
+        spans.reverse()
+        return spans[:limit] if limit else spans
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def summary(self):
+        """One row per span name: count, errors, p50/p95/max duration and total time."""
+        by_name = {}
+        for span in self.spans():
+            by_name.setdefault(span["name"], []).append(span)
+        rows = []
+        for name, spans in sorted(by_name.items()):
+            durations = sorted(span["duration_ms"] for span in spans)
+            rows.append({
+                "stage": name,
+                "count": len(spans),
+                "errors": sum(1 for span in spans if span["status"] == "error"),
+                "p50_ms": round(percentile(durations, 50), 2),
+                "p95_ms": round(percentile(durations, 95), 2),
+                "max_ms": round(durations[-1], 2),
+                "total_s": round(sum(durations) / 1000, 3)
+            })
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+    def export_jsonl(self):
+        """All buffered spans as JSON lines (oldest first)."""
+        return "".join(json.dumps(span, ensure_ascii=False, default=str) + "\n" for span in reversed(self.spans()))
+
+    def export_otlp(self, service_name="moebelkauf-assistent"):
+        """The buffered spans in the OpenTelemetry OTLP/JSON trace format."""
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        otlp_spans = []
+        for span in reversed(self.spans()):
+            start_ns = int(span["start"] * 1e9)
+            otlp_span = {
+                "traceId": span["trace_id"],
+                "spanId": span["span_id"],
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(start_ns + int(span["duration_ms"] * 1e6)),
+                "attributes": [attribute(k, v) for k, v in span["attributes"].items() if v is not None],
+                "status": {"code": 2, "message": span["error"]} if span["status"] == "error" else {"code": 1}
+            }
+            if span["parent_id"]:
+                otlp_span["parentSpanId"] = span["parent_id"]
+            otlp_spans.append(otlp_span)
+
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [attribute("service.name", service_name)]},
+                "scopeSpans": [{"scope": {"name": "instrumentation"}, "spans": otlp_spans}]
+            }]
+        })
+
+tracer = Tracer(
+    max_spans=INSTRUMENTATION_SETTINGS["max_spans"],
+    export_path=INSTRUMENTATION_SETTINGS["export_path"],
+    enabled=INSTRUMENTATION_SETTINGS["enabled"]
+)
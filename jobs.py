@@ -0,0 +1,136 @@
+# jobs.py
+
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import tracer
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+def job_key(kind, *parts):
+    """Stable job key from a kind and any JSON-serialisable inputs."""
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f"{kind}:{digest[:16]}"
+
+class Job:
+    """
+    One background job. The worker function reports progress and partial
+    results through report() and should check `cancelled` between steps.
+    """
+
+    def __init__(self, key, label):
+        self.key = key
+        self.label = label
+        self.status = PENDING
+        self.progress = 0.0
+        self.progress_text = ""
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def active(self):
+        return self.status not in FINISHED
+
+    def report(self, progress=None, text=None, partial=None):
+        if progress is not None:
+            self.progress = progress
+        if text is not None:
+            self.progress_text = text
+        if partial is not None:
+            self.partial = partial
+
+class JobManager:
+    """
+    Runs long actions (scraping, LLM generation, hotel search) on a worker
+    pool so the Streamlit script thread never waits for them.
+
+    Jobs are identified by a key: submitting a key that is already queued,
+    running or finished returns the existing job, so reruns pick up the
+    work instead of restarting it. At most `max_finished` finished jobs are
+    kept; the oldest are dropped first.
+    """
+
+    def __init__(self, max_workers=4, max_finished=50):
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, label=None, force=False):
+        """
+        Schedules fn(job, *args) unless a job with this key exists. With
+        force=True a finished job is replaced; running jobs are never
+        started twice.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job and (job.active or (not force and job.status == DONE)):
+                return job
+            job = Job(key, label or key)
+            self._jobs[key] = job
+            job.future = self._pool.submit(self._run, job, fn, args)
+            return job
+
+    def get(self, key):
+        return self._jobs.get(key)
+
+    def cancel(self, key):
+        """Asks the job to stop; jobs that have not started yet are dropped at once."""
+        job = self._jobs.get(key)
+        if job is None or not job.active:
+            return
+        job._cancel.set()
+        if job.future.cancel():
+            self._finish(job, CANCELLED)
+
+    def jobs(self, keys=None):
+        """All jobs (or the ones for `keys`), newest first."""
+        with self._lock:
+            jobs = list(self._jobs.values()) if keys is None else [self._jobs[k] for k in keys if k in self._jobs]
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    def _run(self, job, fn, args):
+        if job.cancelled:
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        try:
+            # One trace per job; the job's scraping/LLM spans become its children
+            with tracer.span("job", kind=job.key.split(":")[0]):
+                result = fn(job, *args)
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, FAILED)
+            return
+        if job.cancelled:
+            self._finish(job, CANCELLED)
+        else:
+            job.result = result
+            job.progress = 1.0
+            self._finish(job, DONE)
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        with self._lock:
+            finished = sorted((j for j in self._jobs.values() if not j.active), key=lambda j: j.finished)
+            for old in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[old.key]
@@ -0,0 +1,166 @@
+# kpi_analytics.py
+
+import datetime
+import statistics
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from config import KPI_SETTINGS
+from kpi_history import get_history_engine, week_months
+
+def month_calendar(wochen, start_year):
+    """
+    Month of each week and its position in that month, by real calendar
+    weeks: like ISO weeks, a week belongs to the month of its Thursday, so
+    a month has 4 or 5 weeks. Returns a frame indexed by woche with the
+    columns monat, woche_im_monat (1-based) and wochen_im_monat.
+    """
+    wochen = np.asarray(wochen, dtype=np.int64)
+    first_thursday = np.datetime64(datetime.date.fromisocalendar(start_year, 1, 4), "D")
+    # Months of the weeks up to five weeks before and after each week
+    nearby = wochen[:, None] + np.arange(-5, 6)
+    months = (first_thursday + (nearby - 1) * 7).astype("datetime64[M]")
+    same = months == months[:, [5]]
+    return pd.DataFrame(
+        {
+            "monat": week_months(wochen, start_year),
+            "woche_im_monat": same[:, :6].sum(axis=1),
+            "wochen_im_monat": same.sum(axis=1)
+        },
+        index=pd.Index(wochen, name="woche")
+    )
+
+def select_stage(values, thresholds):
+    """
+    Index of the first threshold each value does not exceed, for all
+    values at once (-1 if it exceeds all of them). `thresholds` is one
+    list for all values or one row per value; the order is kept, so this
+    matches a loop that stops at the first `value <= threshold`.
+    """
+    values = np.asarray(values, dtype="float64")
+    reached = values[:, None] <= np.broadcast_to(thresholds, (len(values), np.shape(thresholds)[-1]))
+    return np.where(reached.any(axis=1), reached.argmax(axis=1), -1)
+
+class KPIAnalytics:
+    """
+    Progress, month-end projection and required pace for all KPIs and
+    weeks at once, on top of the HistoryEngine's weekly frame.
+
+    Everything that depends only on the data (dense week range, calendar,
+    month-to-date sums, spread of the weekly values) is computed once per
+    store revision; the parts that depend on the Monatsziele are a few
+    array operations, so what-if targets recompute instantly.
+    """
+
+    def __init__(self, history, band=0.8):
+        self.history = history
+        self.band = band
+        self._z = statistics.NormalDist().inv_cdf((1 + band) / 2)
+        self._base = None
+        self._base_key = None
+        self._lock = threading.Lock()
+
+    def _data(self, wochen):
+        frame = self.history.refresh()
+        lo, hi = min(wochen), max(wochen)
+        if not frame.empty:
+            lo, hi = min(lo, frame.index.min()), max(hi, frame.index.max())
+        key = (self.history.revision, lo, hi)
+        with self._lock:
+            if self._base_key != key:
+                # Weeks without entries count as 0, like in the Verlauf
+                dense = frame.reindex(range(lo, hi + 1)).fillna(0.0)
+                calendar = month_calendar(dense.index, self.history.start_year)
+                self._base = {
+                    "kalender": calendar,
+                    "kpis": dense.columns,
+                    "werte": dense.to_numpy(),
+                    "monat_bisher": dense.groupby(calendar["monat"].to_numpy()).cumsum().to_numpy(),
+                    "streuung": dense.rolling(self.history.rolling_window, min_periods=2).std().fillna(0.0).to_numpy()
+                }
+                self._base_key = key
+            return self._base
+
+    def _measures(self, kpis, wochen, overrides):
+        base = self._data(wochen if wochen is not None else [1])
+        calendar = base["kalender"]
+        rows = slice(None) if wochen is None else np.asarray(wochen) - calendar.index[0]
+        calendar = calendar.iloc[rows]
+        # KPIs without any entries yet are all zeros
+        columns = base["kpis"].get_indexer(kpis)
+        known = columns >= 0
+
+        def select(name):
+            values = np.zeros((len(calendar), len(kpis)))
+            values[:, known] = base[name][rows][:, columns[known]]
+            return values
+
+        ziele = dict(self.history.monatsziele, **(overrides or {}))
+        ziel = np.array([float(ziele.get(kpi, 0) or 0) for kpi in kpis])
+        teiler = np.where(ziel != 0, ziel, np.nan)
+        werte = select("werte")
+        bisher = select("monat_bisher")
+        woche_im_monat = calendar["woche_im_monat"].to_numpy()[:, None]
+        wochen_im_monat = calendar["wochen_im_monat"].to_numpy()[:, None]
+        rest_wochen = wochen_im_monat - woche_im_monat
+
+        # Run rate: the average week so far, continued to the end of the month
+        prognose = bisher / woche_im_monat * wochen_im_monat
+        spanne = self._z * select("streuung") * np.sqrt(rest_wochen)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            benoetigt = np.where(rest_wochen > 0, np.maximum(ziel - bisher, 0) / rest_wochen, np.nan)
+
+        return calendar, {
+            "wert": werte,
+            "monatsziel": np.broadcast_to(ziel, werte.shape),
+            "wochenziel": ziel / wochen_im_monat,
+            "prozent_woche": werte / teiler * 100,
+            "monat_bisher": bisher,
+            "prozent_monat": bisher / teiler * 100,
+            "prognose": prognose,
+            "prognose_min": prognose - spanne,
+            "prognose_max": prognose + spanne,
+            "prognose_prozent": prognose / teiler * 100,
+            "benoetigt_pro_woche": benoetigt
+        }
+
+    def compute(self, kpis, wochen=None, overrides=None):
+        """
+        Weeks x KPIs frames for `kpis`, keyed by measure: wert, monatsziel,
+        wochenziel, prozent_woche, monat_bisher, prozent_monat, prognose,
+        prognose_min, prognose_max, prognose_prozent, benoetigt_pro_woche.
+        Without `wochen`, all weeks of the history are covered.
+        `overrides` ({kpi: ziel}) replaces stored Monatsziele, e.g. for a
+        what-if scenario. Percentages are NaN where the target is 0.
+        """
+        kpis = list(kpis)
+        calendar, measures = self._measures(kpis, wochen, overrides)
+        return {
+            name: pd.DataFrame(values, index=calendar.index, columns=kpis)
+            for name, values in measures.items()
+        }
+
+    def analyse(self, woche, kpis, overrides=None):
+        """
+        One row per KPI for the week `woche`: all measures of compute()
+        plus the month and the week's position in it.
+        """
+        kpis = list(kpis)
+        calendar, measures = self._measures(kpis, [woche], overrides)
+        result = pd.DataFrame(
+            {name: values[0] for name, values in measures.items()},
+            index=pd.Index(kpis, name="kpi")
+        )
+        calendar = calendar.iloc[0]
+        result["monat"] = calendar["monat"]
+        result["woche_im_monat"] = int(calendar["woche_im_monat"])
+        result["wochen_im_monat"] = int(calendar["wochen_im_monat"])
+        return result
+
+@st.cache_resource
+def get_kpi_analytics():
+    """One analytics engine per process, on top of the shared history engine."""
+    return KPIAnalytics(get_history_engine(), band=KPI_SETTINGS["projection_band"])
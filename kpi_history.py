@@ -0,0 +1,106 @@
+# kpi_history.py
+
+import datetime
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from config import KPI_SETTINGS
+from kpi_store import get_kpi_store
+
+def week_months(wochen, start_year):
+    """
+    Maps week numbers to "YYYY-MM" month labels. Week 1 is ISO week 1 of
+    `start_year` and later weeks simply continue, so multi-year histories
+    work. Like ISO weeks, a week belongs to the month of its Thursday.
+    """
+    first_monday = pd.Timestamp(datetime.date.fromisocalendar(start_year, 1, 1))
+    offsets = (pd.Index(wochen, dtype="int64") - 1) * 7 + 3
+    return (first_monday + pd.to_timedelta(offsets, unit="D")).strftime("%Y-%m")
+
+class HistoryEngine:
+    """
+    Keeps the weekly KPI values as a numerically indexed float frame
+    (index: woche, columns: KPIs) and updates it incrementally from the
+    store's revision log instead of rebuilding it on every rerun. Rollups
+    are computed once per revision.
+    """
+
+    def __init__(self, store, start_year, rolling_window=4):
+        self.store = store
+        self.start_year = start_year
+        self.rolling_window = rolling_window
+        self.revision = -1
+        self.frame = pd.DataFrame(dtype="float64", index=pd.Index([], dtype="int64", name="woche"))
+        self.monatsziele = {}
+        self._rollups = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Applies all cells written since the last refresh and returns the frame."""
+        with self._lock:
+            revision = self.store.revision()
+            if revision == self.revision:
+                return self.frame
+
+            rows = self.store.wochenwerte_since(self.revision)
+            if rows:
+                delta = (
+                    pd.DataFrame(rows, columns=["woche", "kpi", "wert"])
+                    .pivot(index="woche", columns="kpi", values="wert")
+                    .astype("float64")
+                )
+                frame = delta.combine_first(self.frame)
+                frame.index = frame.index.astype("int64")
+                frame.index.name = "woche"
+                self.frame = frame.sort_index().sort_index(axis=1)
+
+            self.monatsziele = self.store.monatsziele()
+            self.revision = revision
+            self._rollups = {}
+            return self.frame
+
+    def _dense(self):
+        # Continuous week range without gaps; weeks without entries count as 0.
+        if self.frame.empty:
+            return self.frame
+        wochen = range(self.frame.index.min(), self.frame.index.max() + 1)
+        return self.frame.reindex(wochen).fillna(0.0)
+
+    def _rollup(self, name, compute):
+        if name not in self._rollups:
+            self._rollups[name] = compute()
+        return self._rollups[name]
+
+    def monthly_sums(self):
+        """Sum of the weekly values per calendar month."""
+        def compute():
+            dense = self._dense()
+            return dense.groupby(week_months(dense.index, self.start_year)).sum().rename_axis("monat")
+        return self._rollup("monthly_sums", compute)
+
+    def rolling_average(self):
+        """Rolling average over the last `rolling_window` weeks."""
+        return self._rollup(
+            "rolling_average",
+            lambda: self._dense().rolling(self.rolling_window, min_periods=1).mean()
+        )
+
+    def cumulative_progress(self):
+        """Month-to-date sum per week in percent of the Monatsziel."""
+        def compute():
+            dense = self._dense()
+            cumulative = dense.groupby(week_months(dense.index, self.start_year)).cumsum()
+            ziele = pd.Series(self.monatsziele, dtype="float64").reindex(dense.columns)
+            return cumulative.div(ziele.where(ziele != 0)) * 100
+        return self._rollup("cumulative_progress", compute)
+
+@st.cache_resource
+def get_history_engine():
+    """One engine per process, kept across reruns and sessions."""
+    return HistoryEngine(
+        get_kpi_store(),
+        KPI_SETTINGS["start_year"],
+        rolling_window=KPI_SETTINGS["rolling_window"]
+    )
@@ -0,0 +1,171 @@
+# kpi_store.py
+
+import json
+import os
+import sqlite3
+import threading
+
+import streamlit as st
+
+from config import KPI_SETTINGS
+from instrumentation import tracer
+
+DEFAULT_MONATSZIELE = {"Umsatz": 500, "Gewinn": 500}
+
+class KPIStore:
+    """
+    SQLite storage (WAL mode) for Monatsziele and Wochenwerte, shared by
+    Dashboard.py and pages/Monatsziele.py. Writes touch a single
+    week/KPI cell, reads load only the requested weeks, and concurrent
+    sessions are serialised by SQLite instead of overwriting each other's
+    JSON file. Every write bumps a global revision and stamps the changed
+    cell with it, so readers can fetch only what changed since their last
+    visit (see wochenwerte_since).
+    """
+
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS monatsziele ("
+                " kpi TEXT PRIMARY KEY,"
+                " ziel NUMERIC NOT NULL,"
+                " position INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS wochenwerte ("
+                " woche INTEGER NOT NULL,"
+                " kpi TEXT NOT NULL,"
+                " wert NUMERIC NOT NULL,"
+                " rev INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (woche, kpi)) WITHOUT ROWID"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(wochenwerte)")]
+            if "rev" not in columns:
+                conn.execute("ALTER TABLE wochenwerte ADD COLUMN rev INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS revision ("
+                " id INTEGER PRIMARY KEY CHECK (id = 0),"
+                " value INTEGER NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO revision VALUES (0, 0)")
+        self._initialise(legacy_json)
+
+    def _conn(self):
+        # sqlite3 connections must not be shared between Streamlit's session threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _initialise(self, legacy_json):
+        """Imports the old kpi_data.json once, or seeds the default goals."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT COUNT(*) FROM monatsziele").fetchone()[0] == 0:
+                data = {"monatsziele": DEFAULT_MONATSZIELE, "wochenwerte": {}}
+                if legacy_json and os.path.exists(legacy_json):
+                    with open(legacy_json, "r") as f:
+                        data = json.load(f)
+                conn.executemany(
+                    "INSERT INTO monatsziele VALUES (?, ?, ?)",
+                    [(kpi, ziel, i) for i, (kpi, ziel) in enumerate(data["monatsziele"].items())]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO wochenwerte (woche, kpi, wert) VALUES (?, ?, ?)",
+                    [
+                        (int(woche), kpi, wert)
+                        for woche, werte in data["wochenwerte"].items()
+                        for kpi, wert in werte.items()
+                    ]
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def monatsziele(self):
+        """Returns {kpi: ziel} in the order the KPIs were created."""
+        with tracer.span("kpi.load", query="monatsziele"):
+            rows = self._conn().execute("SELECT kpi, ziel FROM monatsziele ORDER BY position")
+            return dict(rows.fetchall())
+
+    def revision(self):
+        """Current data revision; changes whenever a goal or value is written."""
+        return self._conn().execute("SELECT value FROM revision").fetchone()[0]
+
+    def _write(self, sql, params):
+        # Runs one write and bumps the revision in the same transaction;
+        # the new revision is available to the statement as :rev.
+        conn = self._conn()
+        with tracer.span("kpi.save"):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("UPDATE revision SET value = value + 1")
+                rev = conn.execute("SELECT value FROM revision").fetchone()[0]
+                conn.execute(sql, dict(params, rev=rev))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def set_monatsziel(self, kpi, ziel):
+        """Creates or updates the monthly goal of one KPI."""
+        self._write(
+            "INSERT INTO monatsziele VALUES (:kpi, :ziel, (SELECT COUNT(*) FROM monatsziele))"
+            " ON CONFLICT (kpi) DO UPDATE SET ziel = excluded.ziel"
+            " WHERE ziel IS NOT excluded.ziel",
+            {"kpi": kpi, "ziel": ziel}
+        )
+
+    def wochenwerte(self, wochen):
+        """Returns {woche: {kpi: wert}} for the given weeks only."""
+        wochen = [int(w) for w in wochen]
+        result = {w: {} for w in wochen}
+        if not wochen:
+            return result
+        placeholders = ",".join("?" * len(wochen))
+        with tracer.span("kpi.load", query="wochenwerte", wochen=len(wochen)):
+            rows = self._conn().execute(
+                f"SELECT woche, kpi, wert FROM wochenwerte WHERE woche IN ({placeholders})", wochen
+            )
+            for woche, kpi, wert in rows:
+                result[woche][kpi] = wert
+        return result
+
+    def all_wochenwerte(self):
+        """Returns the complete history as {woche: {kpi: wert}}."""
+        result = {}
+        with tracer.span("kpi.load", query="all_wochenwerte"):
+            for woche, kpi, wert in self._conn().execute(
+                "SELECT woche, kpi, wert FROM wochenwerte ORDER BY woche"
+            ):
+                result.setdefault(woche, {})[kpi] = wert
+        return result
+
+    def wochenwerte_since(self, rev):
+        """Returns (woche, kpi, wert) for all cells written after revision `rev`."""
+        with tracer.span("kpi.load", query="wochenwerte_since"):
+            return self._conn().execute(
+                "SELECT woche, kpi, wert FROM wochenwerte WHERE rev > ?", (rev,)
+            ).fetchall()
+
+    def set_wochenwert(self, woche, kpi, wert):
+        """Writes a single week/KPI cell."""
+        self._write(
+            "INSERT INTO wochenwerte VALUES (:woche, :kpi, :wert, :rev)"
+            " ON CONFLICT (woche, kpi) DO UPDATE SET wert = excluded.wert, rev = excluded.rev"
+            " WHERE wert IS NOT excluded.wert",
+            {"woche": int(woche), "kpi": kpi, "wert": wert}
+        )
+
+@st.cache_resource
+def get_kpi_store():
+    """One store per process, shared by all pages and sessions."""
+    return KPIStore(KPI_SETTINGS["db_path"], legacy_json=KPI_SETTINGS["legacy_json"])
@@ -0,0 +1,116 @@
+# listing_cache.py
+
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that don't change the listing and only fragment the cache.
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "ref")
+
+def normalize_url(url):
+    """
+    Normalises a listing URL into a cache key: lower-case scheme and host
+    without 'www.', no fragment, no trailing slash, sorted query without
+    tracking parameters.
+    """
+    parts = urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(((parts.scheme or "https").lower(), netloc, path, urlencode(query), ""))
+
+class ListingCache:
+    """
+    Persistent SQLite cache for extracted listing dicts, keyed by normalised URL.
+
+    Entries younger than `ttl` seconds are served without any request. Older
+    entries keep their ETag/Last-Modified validators so the caller can send a
+    conditional GET and reuse the entry on a 304. The least recently used
+    entries are evicted once the stored data exceeds `max_bytes`.
+    """
+
+    def __init__(self, path, ttl=6 * 3600, max_bytes=5 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS listings ("
+                " url TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " fetched_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " size INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS listings_accessed ON listings (accessed_at)"
+            )
+
+    def lookup(self, url):
+        """
+        Returns the cached entry for `url` as a dict with the keys
+        info, etag, last_modified and fresh, or None if nothing is cached.
+        """
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT data, etag, last_modified, fetched_at FROM listings WHERE url = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE listings SET accessed_at = ? WHERE url = ?", (now, key))
+            fresh = now - row[3] < self.ttl
+            if fresh:
+                self.stats["hits"] += 1
+        return {"info": json.loads(row[0]), "etag": row[1], "last_modified": row[2], "fresh": fresh}
+
+    def touch(self, url):
+        """Marks a stale entry as fresh again after the server answered 304."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE listings SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, normalize_url(url))
+            )
+            self.stats["revalidated"] += 1
+
+    def store(self, url, info, etag=None, last_modified=None):
+        """Stores a freshly extracted listing and evicts old entries if needed."""
+        data = json.dumps(info, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), data, etag, last_modified, now, now, len(data.encode("utf-8")))
+            )
+            self.stats["misses"] += 1
+            self._evict()
+
+    def _evict(self):
+        # Keep the most recently used entries whose sizes add up to max_bytes.
+        self._conn.execute(
+            "DELETE FROM listings WHERE url IN ("
+            " SELECT url FROM ("
+            "  SELECT url, SUM(size) OVER (ORDER BY accessed_at DESC, url) AS running"
+            "  FROM listings)"
+            " WHERE running > ?)",
+            (self.max_bytes,)
+        )
+
+    def clear(self):
+        """Removes all cached listings."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM listings")
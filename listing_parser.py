@@ -0,0 +1,90 @@
+# listing_parser.py
+
+import re
+
+# A line of at least three -, =, * or _ separates listings in a paste.
+BOUNDARY_RE = re.compile(r"-{3,}|={3,}|\*{3,}|_{3,}")
+BOUNDARY_START = frozenset("-=*_")
+
+SELLER_RE = re.compile(r"verkäufer", re.IGNORECASE)
+CONDITION_RE = re.compile(r"zustand", re.IGNORECASE)
+LOCATION_RE = re.compile(r"\d{5}\s+\w+")
+
+DEFAULTS = {
+    "seller_name": "Unbekannter Verkäufer",
+    "title": "Nicht verfügbar",
+    "condition": "Keine Angaben",
+    "location": "Keine Adresse gefunden",
+    "description": "Keine Beschreibung verfügbar"
+}
+
+def _after_colon(line):
+    return line.split(":")[-1].strip()
+
+def _whole(line):
+    return line
+
+def _is_title(line):
+    return len(line) > 10
+
+def _any(line):
+    return True
+
+# Ordered extraction rules (field, matcher, extractor). Each line is claimed
+# by the first rule whose field is still empty and whose matcher accepts it.
+RULES = (
+    ("seller_name", SELLER_RE.search, _after_colon),
+    ("title", _is_title, _whole),
+    ("condition", CONDITION_RE.search, _after_colon),
+    ("location", LOCATION_RE.match, _whole),
+    ("description", _any, _whole)
+)
+
+def _apply_rules(record, line):
+    for field, matches, extract in RULES:
+        if not record[field] and matches(line):
+            record[field] = extract(line)
+            return
+
+def _finish(record):
+    return {field: value or DEFAULTS[field] for field, value in record.items()}
+
+def parse_listing(lines):
+    """
+    Extracts one listing from an iterable of lines. Stops reading as soon
+    as every field is filled; missing fields get the DEFAULTS. The original
+    casing of names and titles is kept.
+    """
+    record = dict.fromkeys(DEFAULTS)
+    for line in lines:
+        line = line.strip()
+        if line:
+            _apply_rules(record, line)
+            if all(record.values()):
+                break
+    return _finish(record)
+
+def _blocks(text):
+    """The stripped, non-empty lines of each listing in a paste; empty listings are skipped."""
+    block = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] in BOUNDARY_START and BOUNDARY_RE.fullmatch(line):
+            if block:
+                yield block
+            block = []
+        else:
+            block.append(line)
+    if block:
+        yield block
+
+def parse_listings(text):
+    """
+    Parses a paste that may contain several listings separated by boundary
+    lines and returns one record per listing (at least one, even for empty
+    input). The text is scanned once and each listing goes through
+    parse_listing(), which skips its remaining lines once it is complete.
+    """
+    return [parse_listing(block) for block in _blocks(text)] or [parse_listing([])]
@@ -1,68 +1,441 @@
 # llm_manager.py
 
-import openai
-import ollama
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 
+from config import BULK_SETTINGS, OLLAMA_SETTINGS, ROUTER_SETTINGS
+from instrumentation import percentile, tracer
+from response_cache import make_cache_key
+
+# Process-wide request queue for the local Ollama server: all sessions share
+# these slots, so bulk runs can't flood it with more parallel requests than
+# it handles.
+_OLLAMA_SLOTS = threading.BoundedSemaphore(BULK_SETTINGS["ollama_concurrency"])
+
+# Request fields that Ollama does not accept as sampling options.
+_OLLAMA_REQUEST_FIELDS = ("model", "keep_alive")
+
+def _ollama_stats(response):
+    """Timings of a finished Ollama request in seconds (Ollama reports nanoseconds)."""
+    return {
+        "load": (response.get("load_duration") or 0) / 1e9,
+        "prompt_eval": (response.get("prompt_eval_duration") or 0) / 1e9,
+        "eval": (response.get("eval_duration") or 0) / 1e9,
+        "total": (response.get("total_duration") or 0) / 1e9,
+        "prompt_tokens": response.get("prompt_eval_count") or 0,
+        "eval_tokens": response.get("eval_count") or 0
+    }
+
+class LLMError(Exception):
+    """
+    Raised when no provider produced an answer. `attempts` lists the
+    {"provider", "model", "error"} of every provider that was tried.
+    """
+
+    def __init__(self, message, attempts=()):
+        super().__init__(message)
+        self.attempts = list(attempts)
+
+class LatencyTracker:
+    """
+    Rolling latency and error rate per (provider, model) over the last
+    `window` requests.
+    """
+
+    def __init__(self, window=100):
+        self.window = window
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider, model, latency=None, error=False):
+        with self._lock:
+            history = self._requests.setdefault((provider, model), deque(maxlen=self.window))
+            history.append((latency, error))
+
+    def summary(self):
+        """One row per provider/model with request count, error rate and p50/p95 latency."""
+        rows = []
+        with self._lock:
+            for (provider, model), history in sorted(self._requests.items()):
+                latencies = sorted(latency for latency, error in history if not error)
+                errors = sum(1 for _, error in history if error)
+                rows.append({
+                    "provider": provider,
+                    "model": model,
+                    "requests": len(history),
+                    "error_rate": round(errors / len(history), 3),
+                    "p50_s": round(percentile(latencies, 50), 2),
+                    "p95_s": round(percentile(latencies, 95), 2)
+                })
+        return rows
+
+# Shared by all managers, so the sidebar shows the whole process
+_LATENCY = LatencyTracker(ROUTER_SETTINGS["window"])
+
 class LLMManager:
     """
     A helper class to either call a local model via Ollama
     or ChatGPT / OpenAI’s GPT-3.5+ based on user's choice.
+
+    Requests go to the chosen provider first and fail over to the providers
+    in `fallback` if it errors before answering. With `hedge_after` set, a
+    duplicate request goes to the next provider when the first one hasn't
+    produced a token within that many seconds; the first to answer wins.
+    Further providers can be added with register_provider().
     """
 
-    def __init__(self, provider="ollama", ollama_config=None, openai_model="gpt-3.5-turbo"):
+    def __init__(self, provider="ollama", ollama_config=None, openai_model="gpt-3.5-turbo",
+                 response_cache=None, ollama_host=None, keep_alive=None, fallback=None, hedge_after=None):
         """
         provider: 'ollama' or 'openai'
         ollama_config: dict with model, temperature, etc. for Ollama
         openai_model: which OpenAI model to use (e.g. 'gpt-4' or 'gpt-3.5-turbo')
+        response_cache: optional ResponseCache for repeated prompts
+        ollama_host, keep_alive: Ollama server and how long it keeps the model loaded
+        fallback: providers to try after the chosen one (default ROUTER_SETTINGS)
+        hedge_after: latency budget in seconds before a hedged request (None = no hedging)
         """
         self.provider = provider
         self.ollama_config = ollama_config or {}
         self.openai_model = openai_model
+        self.openai_options = {"temperature": 0.7}
+        self.response_cache = response_cache
+        self.ollama_host = ollama_host or OLLAMA_SETTINGS["host"]
+        self.keep_alive = keep_alive if keep_alive is not None else OLLAMA_SETTINGS["keep_alive"]
 
-        # If we have an OpenAI key in st.secrets, set it
-        openai.api_key = st.secrets.get("openai_api_key", None)
+        # Timings of the warm-up and of the last generated Ollama response
+        self.warming_up = False
+        self.warmup_stats = None
+        self.last_stats = None
+        self._ollama_client = None
+
+        # If we have an OpenAI key in st.secrets, use it. The provider SDKs
+        # themselves are only imported on the first request.
+        try:
+            self.openai_api_key = st.secrets.get("openai_api_key", None)
+        except FileNotFoundError:
+            self.openai_api_key = None
+
+        self.fallback = list(ROUTER_SETTINGS["fallback"] if fallback is None else fallback)
+        self.hedge_after = ROUTER_SETTINGS["hedge_after"] if hedge_after is None else hedge_after
+        self._providers = {}
+        self.register_provider("ollama", self._stream_ollama, self.ollama_config.get("model", "llama2"),
+                               options=self.ollama_config)
+        self.register_provider("openai", self._stream_openai, self.openai_model, options=self.openai_options,
+                               available=lambda: bool(self.openai_api_key))
+
+    def register_provider(self, name, stream, model, options=None, available=None):
+        """
+        Adds (or replaces) a provider. stream(prompt, system) yields the
+        answer piece by piece and raises on errors; available() may return
+        False to skip the provider, e.g. without an API key.
+        """
+        self._providers[name] = {
+            "stream": stream,
+            "model": model,
+            "options": options or {},
+            "available": available or (lambda: True)
+        }
+
+    @staticmethod
+    def router_stats():
+        """Rolling p50/p95 latency and error rate per provider and model."""
+        return _LATENCY.summary()
 
     def set_provider(self, provider):
         """Change which provider (ollama or openai) we use."""
         self.provider = provider
 
-    def generate(self, prompt):
+    def warm_up(self):
+        """
+        Loads the Ollama model with an empty request, so the first real
+        message doesn't pay for loading it from disk, and keeps it resident
+        for `keep_alive`. Returns the timings of the load.
+        """
+        with _OLLAMA_SLOTS:
+            response = self._ollama().generate(
+                model=self.ollama_config.get("model", "llama2"),
+                prompt="",
+                keep_alive=self.keep_alive
+            )
+        self.warmup_stats = _ollama_stats(response)
+        return self.warmup_stats
+
+    def warm_up_in_background(self):
+        """Starts warm_up() on a daemon thread; errors end up in warmup_stats."""
+        if self.warming_up:
+            return
+        self.warming_up = True
+
+        def run():
+            try:
+                self.warm_up()
+            except Exception as e:
+                self.warmup_stats = {"error": str(e)}
+            finally:
+                self.warming_up = False
+
+        threading.Thread(target=run, name="ollama-warmup", daemon=True).start()
+
+    def generate(self, prompt, refresh=False, system=None):
         """
         Generate text from either local Ollama model or OpenAI’s ChatGPT.
+        Blocking wrapper around generate_stream() for callers that need
+        the complete text at once. Raises LLMError if no provider answered.
         """
-        if self.provider == "ollama":
-            return self._generate_ollama(prompt)
-        else:
-            return self._generate_openai(prompt)
+        return "".join(self.generate_stream(prompt, refresh=refresh, system=system))
 
-    def _generate_ollama(self, prompt):
+    def generate_result(self, prompt, refresh=False, system=None):
         """
-        Calls a local model via Ollama. Adjust if your Ollama server
-        expects different parameters.
+        Like generate(), but never raises: returns a dict with the text (None
+        on failure), provider, model, latency, whether it was cached or hedged,
+        the error message and the failed attempts.
         """
+        route = {}
+        start = time.perf_counter()
         try:
-            response = ollama.chat(
-                model=self.ollama_config.get("model", "llama2"),
-                messages=[{"role": "user", "content": prompt}],
-                options=self.ollama_config
-            )
-            return response.get("message", {}).get("content", "Keine Antwort erhalten.")
-        except Exception as e:
-            return f"Ollama-Fehler: {e}"
+            text = "".join(self._generate_stream(prompt, refresh, system, route))
+            error = None
+        except LLMError as e:
+            text, error = None, str(e)
+            route["attempts"] = e.attempts
+        return {
+            "text": text,
+            "provider": route.get("provider"),
+            "model": route.get("model"),
+            "latency": time.perf_counter() - start,
+            "cached": route.get("cached", False),
+            "hedged": route.get("hedged", False),
+            "error": error,
+            "attempts": route.get("attempts", [])
+        }
 
-    def _generate_openai(self, prompt):
+    def generate_many(self, prompts, max_concurrency=None, refresh=False, system=None):
+        """
+        Generates completions for many prompts concurrently. Returns the
+        generate_result() dicts in the same order as `prompts`.
+        max_concurrency defaults to the provider's value in BULK_SETTINGS.
         """
-        Calls OpenAI’s ChatCompletion endpoint for chat-based completion.
+        if max_concurrency is None:
+            max_concurrency = BULK_SETTINGS[f"{self.provider}_concurrency"]
+        max_concurrency = max(1, min(max_concurrency, len(prompts) or 1))
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            return list(pool.map(lambda prompt: self.generate_result(prompt, refresh=refresh, system=system), prompts))
+
+    def generate_stream(self, prompt, refresh=False, system=None):
         """
+        Yields the completion piece by piece as the provider streams it,
+        so the UI can show the first words while the rest is generated.
+        Cached responses are returned in one piece; refresh=True skips the
+        cache lookup and stores the new response instead. `system` is sent
+        as the system message in front of the prompt. Raises LLMError if no
+        provider answered (or the answering one broke off).
+        """
+        return self._generate_stream(prompt, refresh, system, {})
+
+    def _generate_stream(self, prompt, refresh, system, route):
+        if self.response_cache and not refresh:
+            # An answer a fallback provider gave earlier counts as well
+            keys = {self._cache_key(prompt, system, name): name for name in self._candidates()}
+            key, cached = self.response_cache.get_first(keys)
+            if cached is not None:
+                name = keys[key]
+                tracer.count("llm.cache_hits")
+                route.update(provider=name, model=self._providers[name]["model"], cached=True)
+                return iter([cached])
+        return self._route(prompt, system, route)
+
+    def _candidates(self):
+        order = [self.provider] + [name for name in self.fallback if name != self.provider]
+        return [name for name in order if name in self._providers and self._providers[name]["available"]()]
+
+    def _route(self, prompt, system, route):
+        """
+        Runs the providers on worker threads and yields the tokens of the
+        first one that answers. Fails over to the next candidate when a
+        provider errors before its first token, and starts a hedged request
+        once `hedge_after` passes without a token.
+        """
+        pending = deque(self._candidates())
+        if not pending:
+            raise LLMError("Kein LLM-Provider verfügbar.")
+        events = queue.Queue()
+        running = {}
+        attempts = []
+        winner = None
+        parts = []
+        # Not a with-block: the generator may be finished from another context
+        span = tracer.start_span("llm.request", provider=self.provider)
+
+        def launch():
+            name = pending.popleft()
+            cancel = threading.Event()
+            running[name] = (cancel, time.perf_counter())
+            threading.Thread(
+                target=self._pump, args=(name, prompt, system, events, cancel), name=f"llm-{name}", daemon=True
+            ).start()
+
+        def fail(name, error):
+            model = self._providers[name]["model"]
+            _LATENCY.record(name, model, error=True)
+            attempts.append({"provider": name, "model": model, "error": str(error)})
+            del running[name]
+
+        def hedge_deadline():
+            # A hedged request needs a provider left to send it to
+            return time.perf_counter() + self.hedge_after if self.hedge_after and pending else None
+
+        launch()
+        hedge_at = hedge_deadline()
         try:
-            if not openai.api_key:
-                return "Fehler: Kein OpenAI-API-Key gefunden."
-            response = openai.ChatCompletion.create(
-                model=self.openai_model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7
+            while running:
+                timeout = None
+                if winner is None and hedge_at is not None:
+                    timeout = max(0, hedge_at - time.perf_counter())
+                try:
+                    name, kind, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    hedge_at = None
+                    if not pending:
+                        continue
+                    route["hedged"] = True
+                    tracer.count("llm.hedged")
+                    launch()
+                    continue
+                if name not in running:
+                    continue  # a hedged request that lost the race
+
+                if kind == "token":
+                    if winner is None:
+                        winner = name
+                        span["attributes"]["first_token_ms"] = round((time.perf_counter() - span["_perf"]) * 1000, 1)
+                        for other, (cancel, _) in list(running.items()):
+                            if other != name:
+                                cancel.set()
+                                del running[other]
+                    parts.append(value)
+                    yield value
+                elif kind == "error" or (kind == "done" and not parts):
+                    fail(name, value if kind == "error" else "Keine Antwort erhalten.")
+                    if winner is not None:
+                        raise LLMError(f"Antwort von {name} abgebrochen: {value}", attempts)
+                    if not running and pending:
+                        tracer.count("llm.failover")
+                        launch()
+                        # The new provider gets its own latency budget
+                        hedge_at = hedge_deadline()
+                else:
+                    _, started = running.pop(name)
+                    _LATENCY.record(name, self._providers[name]["model"], latency=time.perf_counter() - started)
+        finally:
+            # Stop any request still running, e.g. when the caller stops reading
+            for cancel, _ in running.values():
+                cancel.set()
+            tracer.end_span(
+                span, error=None if winner else LLMError("Keine Antwort"),
+                answered_by=winner, attempts=len(attempts) + bool(winner), chunks=len(parts),
+                hedged=route.get("hedged", False)
             )
-            return response.choices[0].message.content.strip()
+
+        if winner is None:
+            details = "; ".join(f"{a['provider']}: {a['error']}" for a in attempts)
+            raise LLMError(f"Kein LLM-Provider hat geantwortet ({details})", attempts)
+
+        route.update(provider=winner, model=self._providers[winner]["model"], attempts=attempts)
+        if self.response_cache:
+            self.response_cache.put(self._cache_key(prompt, system, winner), "".join(parts))
+
+    def _pump(self, name, prompt, system, events, cancel):
+        """Feeds one provider's stream into the shared event queue until cancelled."""
+        stream = None
+        try:
+            # Inside the try: a provider that fails when called must still
+            # post an error, or the router would wait for it forever
+            stream = self._providers[name]["stream"](prompt, system)
+            for token in stream:
+                if cancel.is_set():
+                    return
+                events.put((name, "token", token))
         except Exception as e:
-            return f"OpenAI-Fehler: {e}"
+            events.put((name, "error", e))
+            return
+        finally:
+            # Closing the generator releases e.g. the Ollama slot right away
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+        events.put((name, "done", None))
+
+    def _cache_key(self, prompt, system=None, provider=None):
+        provider = provider or self.provider
+        spec = self._providers[provider]
+        return make_cache_key(provider, spec["model"], spec["options"], prompt, system)
+
+    def _ollama(self):
+        if self._ollama_client is None:
+            import ollama
+            self._ollama_client = ollama.Client(host=self.ollama_host)
+        return self._ollama_client
+
+    def _ollama_options(self):
+        return {k: v for k, v in self.ollama_config.items() if k not in _OLLAMA_REQUEST_FIELDS}
+
+    @staticmethod
+    def _messages(prompt, system):
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        return messages
+
+    def _stream_ollama(self, prompt, system=None):
+        """
+        Calls a local model via Ollama in streaming mode. Adjust if your
+        Ollama server expects different parameters. Waits for a free slot
+        in the shared Ollama request queue first. The system message stays
+        identical across requests, so Ollama reuses its evaluated prefix
+        while the model is kept loaded.
+        """
+        with _OLLAMA_SLOTS:
+            stream = self._ollama().chat(
+                model=self.ollama_config.get("model", "llama2"),
+                messages=self._messages(prompt, system),
+                options=self._ollama_options(),
+                keep_alive=self.keep_alive,
+                stream=True
+            )
+            for chunk in stream:
+                content = chunk.get("message", {}).get("content", "")
+                if content:
+                    yield content
+                if chunk.get("done"):
+                    self.last_stats = _ollama_stats(chunk)
+
+    def _stream_openai(self, prompt, system=None):
+        """
+        Calls OpenAI’s ChatCompletion endpoint in streaming mode.
+        """
+        import openai
+
+        if not self.openai_api_key:
+            raise ValueError("Kein OpenAI-API-Key gefunden.")
+        openai.api_key = self.openai_api_key
+        stream = openai.ChatCompletion.create(
+            model=self.openai_model,
+            messages=self._messages(prompt, system),
+            stream=True,
+            **self.openai_options
+        )
+        received = False
+        for chunk in stream:
+            content = chunk.choices[0].delta.get("content", "")
+            if not received:
+                content = content.lstrip()
+            if content:
+                received = True
+                yield content
@@ -1,14 +1,39 @@
 # negotiation.py
 
-def generate_personal_message(llm, info, purposes):
+import csv
+import io
+import json
+import time
+
+from instrumentation import percentile
+
+WOCHENTAGE = ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"]
+
+# Fixed part of every request. Sent as the system message, so Ollama can
+# reuse the already evaluated prefix instead of processing it per message.
+SYSTEM_PROMPT = (
+    "Ich bin Gabi und zusammen mit meinem Freund auf Deutschlandtour. "
+    "Wir richten uns neu ein und schreiben Verkäufern auf Kleinanzeigen. "
+    "Bitte verfasse aus dem Entwurf des Nutzers eine freundliche, höfliche Nachricht in meinem Namen."
+)
+
+def format_slots(slots):
+    """Formats (start, end) slots as e.g. 'Mo, 20.10. 10:00–11:00 Uhr'."""
+    return "; ".join(
+        f"{WOCHENTAGE[start.weekday()]}, {start:%d.%m.} {start:%H:%M}–{end:%H:%M} Uhr"
+        for start, end in slots
+    )
+
+def build_prompt(info, purposes, slots=None):
     """
-    Combine text blocks into one single message that references
-    extracted information (seller_name, title, etc.).
+    Combine text blocks into one single prompt that references
+    extracted information (seller_name, title, etc.). `slots` are
+    free (start, end) times offered for the appointment. The persona and
+    instruction live in SYSTEM_PROMPT.
     """
     introduction = (
         f"Sehr geehrte/r {info.get('seller_name')},\n\n"
-        f"ich bin Gabi und zusammen mit meinem Freund auf Deutschlandtour. "
-        f"Wir richten uns neu ein und da ist uns '{info.get('title')}' aufgefallen.\n\n"
+        f"uns ist '{info.get('title')}' aufgefallen.\n\n"
     )
 
     text_parts = {
@@ -18,14 +43,84 @@ def generate_personal_message(llm, info, purposes):
                            f"Aktueller Zustand laut Anzeige: {info.get('condition')}",
         "Terminvereinbarung": f"Könnten wir einen Termin in {info.get('location')} vereinbaren?"
     }
+    if slots:
+        text_parts["Terminvereinbarung"] += f" Mir würden zum Beispiel folgende Termine passen: {format_slots(slots)}."
 
     # Create a message body by appending each selected text block
     body = "\n".join([text_parts[p] for p in purposes if p in text_parts])
     
     # Feed the combined text into the LLM for a refined final message
-    prompt = (
-        f"{introduction}{body}\n\n"
-        f"Bitte verfasse eine freundliche, höfliche Nachricht in meinem Namen."
+    return f"{introduction}{body}"
+
+def generate_personal_message(llm, info, purposes, slots=None, refresh=False):
+    """
+    Let the LLM turn the selected text blocks into a polished message.
+    refresh=True bypasses the response cache ("neu generieren"). Raises
+    LLMError if no provider answered.
+    """
+    return llm.generate(build_prompt(info, purposes, slots), refresh=refresh, system=SYSTEM_PROMPT)
+
+def stream_personal_message(llm, info, purposes, slots=None, refresh=False):
+    """
+    Same as generate_personal_message, but yields the message piece by
+    piece while the LLM is still generating.
+    """
+    return llm.generate_stream(build_prompt(info, purposes, slots), refresh=refresh, system=SYSTEM_PROMPT)
+
+
+def build_polish_prompt(draft):
+    """Prompt for the optional LLM pass over a message rendered from templates."""
+    return (
+        f"Entwurf:\n\n{draft}\n\n"
+        f"Bitte formuliere den Entwurf flüssiger, ohne Inhalte hinzuzufügen oder wegzulassen."
     )
 
-    return llm.generate(prompt)
+def stream_polished_message(llm, draft, refresh=False):
+    """Streams the LLM-polished version of a Schnellmodus message."""
+    return llm.generate_stream(build_polish_prompt(draft), refresh=refresh, system=SYSTEM_PROMPT)
+
+def generate_bulk_messages(llm, items, max_concurrency=None, refresh=False):
+    """
+    Generates one message per (info, purposes) pair with concurrent LLM calls.
+    Returns (results, report): results in input order, each with the listing
+    title, seller, message, answering provider, error and latency; report
+    with total time, throughput, error count and latency percentiles.
+    """
+    prompts = [build_prompt(info, purposes) for info, purposes in items]
+    start = time.perf_counter()
+    outputs = llm.generate_many(prompts, max_concurrency=max_concurrency, refresh=refresh, system=SYSTEM_PROMPT)
+    total = time.perf_counter() - start
+
+    results = []
+    for (info, purposes), output in zip(items, outputs):
+        results.append({
+            "title": info.get("title"),
+            "seller_name": info.get("seller_name"),
+            "purposes": ", ".join(purposes),
+            "message": output["text"] or "",
+            "provider": output["provider"],
+            "error": output["error"],
+            "latency": round(output["latency"], 3)
+        })
+
+    latencies = sorted(r["latency"] for r in results)
+    report = {
+        "count": len(results),
+        "total_seconds": round(total, 3),
+        "throughput": round(len(results) / total, 3) if total > 0 else 0.0,
+        "errors": sum(1 for r in results if r["error"]),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95)
+    }
+    return results, report
+
+def export_messages(results, fmt="csv"):
+    """Serialises bulk results as CSV or JSON text."""
+    if fmt == "json":
+        return json.dumps(results, ensure_ascii=False, indent=2)
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=["title", "seller_name", "purposes", "message", "provider", "error", "latency"])
+    writer.writeheader()
+    writer.writerows(results)
+    return buffer.getvalue()
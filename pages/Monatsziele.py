@@ -1,39 +1,72 @@
+import pandas as pd
 import streamlit as st
-import json
-import os
+from kpi_store import get_kpi_store
+from kpi_analytics import get_kpi_analytics
 
-DATA_FILE = "kpi_data.json"
-
-# Daten laden
-if os.path.exists(DATA_FILE):
-    with open(DATA_FILE, "r") as f:
-        kpi_data = json.load(f)
-else:
-    kpi_data = {"monatsziele": {"Umsatz": 500, "Gewinn": 500}, "wochenwerte": {}}
-
-# Funktion zum Speichern der Daten
-def save_data():
-    with open(DATA_FILE, "w") as f:
-        json.dump(kpi_data, f, indent=4)
+# Gemeinsamer KPI-Speicher (SQLite) für alle Seiten und Sessions
+store = get_kpi_store()
+monatsziele = store.monatsziele()
 
 # Monatsziele
 st.subheader("Monatsziele")
 
 # Standard KPIs
 default_monatsziele = ["Anzahl Einkäufe", "Ausgabenbudget", "Anzahl Verkäufe", "Umsatz", "Gewinn"]
-monatsziele_keys = list(kpi_data.get("monatsziele", default_monatsziele))
+monatsziele_keys = list(monatsziele or default_monatsziele)
 
 # Anzahl der Spalten für Monatsziele
 number_of_monatsziele_columns = len(monatsziele_keys)
 monatsziele_columns = st.columns(number_of_monatsziele_columns)
 
 for kpi_index, kpi_name in enumerate(monatsziele_keys):
-    if kpi_name not in kpi_data["monatsziele"]:
-        kpi_data["monatsziele"][kpi_name] = 500 if kpi_name in ("Umsatz", "Gewinn") else 0
-    kpi_data["monatsziele"][kpi_name] = monatsziele_columns[kpi_index].number_input(
+    if kpi_name not in monatsziele:
+        monatsziele[kpi_name] = 500 if kpi_name in ("Umsatz", "Gewinn") else 0
+        store.set_monatsziel(kpi_name, monatsziele[kpi_name])
+    neues_ziel = monatsziele_columns[kpi_index].number_input(
         f"Monatsziel für {kpi_name}",
-        value=kpi_data["monatsziele"][kpi_name],
+        value=monatsziele[kpi_name],
         key=f"monatsziel_{kpi_name}",
         step=100 if kpi_name in ("Umsatz", "Gewinn") else 1
     )
-save_data()
+    if neues_ziel != monatsziele[kpi_name]:
+        monatsziele[kpi_name] = neues_ziel
+        store.set_monatsziel(kpi_name, neues_ziel)
+
+# Was-wäre-wenn: Ziele probeweise ändern, ohne sie zu speichern
+st.subheader("Was-wäre-wenn")
+st.write("Ziele probeweise ändern – die Prognose wird sofort neu berechnet, gespeichert wird nichts.")
+analytics = get_kpi_analytics()
+wochen_df = analytics.history.refresh()
+woche = st.number_input(
+    "Woche", min_value=1, step=1,
+    value=int(wochen_df.index.max()) if not wochen_df.empty else 1
+)
+szenario = st.data_editor(
+    pd.DataFrame(
+        {"Monatsziel": [monatsziele[k] for k in monatsziele_keys], "Szenario": [monatsziele[k] for k in monatsziele_keys]},
+        index=pd.Index(monatsziele_keys, name="KPI"),
+        dtype="float64"
+    ),
+    disabled=["Monatsziel"],
+    use_container_width=True,
+    key="szenario"
+)
+overrides = {kpi: ziel for kpi, ziel in szenario["Szenario"].items() if ziel != monatsziele[kpi]}
+
+basis = analytics.analyse(woche, monatsziele_keys)
+auswertung = analytics.analyse(woche, monatsziele_keys, overrides) if overrides else basis
+st.write(
+    f"Monat {basis['monat'].iloc[0]}, Woche {basis['woche_im_monat'].iloc[0]} "
+    f"von {basis['wochen_im_monat'].iloc[0]}"
+)
+st.dataframe(
+    pd.DataFrame({
+        "Bisher im Monat": basis["monat_bisher"],
+        "Prognose": basis["prognose"],
+        "Prognose (% vom Ziel)": basis["prognose_prozent"],
+        "Szenario (% vom Ziel)": auswertung["prognose_prozent"],
+        "Nötig pro Woche": basis["benoetigt_pro_woche"],
+        "Nötig pro Woche (Szenario)": auswertung["benoetigt_pro_woche"]
+    }).round(1),
+    use_container_width=True
+)
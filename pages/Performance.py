@@ -0,0 +1,60 @@
+import streamlit as st
+from instrumentation import tracer
+
+# Versteckte Diagnoseseite: nur mit ?perf=1 in der URL sichtbar
+if st.query_params.get("perf") != "1":
+    st.info("Diese Seite ist nur für die Fehlersuche gedacht.")
+    st.stop()
+
+st.subheader("Performance")
+
+col_refresh, col_clear = st.columns(2)
+if col_refresh.button("Aktualisieren"):
+    st.rerun()
+if col_clear.button("Messwerte löschen"):
+    tracer.clear()
+
+# p50/p95 je Messpunkt – der langsamste Schritt steht oben
+summary = sorted(tracer.summary(), key=lambda row: -row["total_s"])
+st.write("**Zeit pro Schritt**")
+if summary:
+    st.dataframe(summary, hide_index=True, use_container_width=True)
+else:
+    st.write("Noch keine Messwerte. Die App einmal benutzen und dann aktualisieren.")
+
+counters = tracer.counters()
+if counters:
+    st.write("**Zähler**")
+    st.dataframe([{"zähler": name, "wert": value} for name, value in sorted(counters.items())], hide_index=True)
+
+# Letzte Traces: Wurzel-Spans mit ihren Kind-Spans
+st.write("**Letzte Traces**")
+spans = tracer.spans()
+children = {}
+for span in spans:
+    children.setdefault(span["parent_id"], []).append(span)
+
+def span_rows(span, depth=0):
+    rows = [{
+        "schritt": "  " * depth + span["name"],
+        "ms": span["duration_ms"],
+        "status": span["status"],
+        "details": ", ".join(f"{k}={v}" for k, v in span["attributes"].items() if v is not None)
+    }]
+    for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start"]):
+        rows.extend(span_rows(child, depth + 1))
+    return rows
+
+for root in children.get(None, [])[:20]:
+    with st.expander(f"{root['name']} – {root['duration_ms']:.0f} ms"):
+        st.dataframe(span_rows(root), hide_index=True, use_container_width=True)
+
+col_jsonl, col_otlp = st.columns(2)
+col_jsonl.download_button(
+    "Als JSONL exportieren", tracer.export_jsonl(),
+    file_name="traces.jsonl", mime="application/jsonl"
+)
+col_otlp.download_button(
+    "Als OTLP-JSON exportieren", tracer.export_otlp(),
+    file_name="traces_otlp.json", mime="application/json"
+)
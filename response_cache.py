@@ -0,0 +1,101 @@
+# response_cache.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def make_cache_key(provider, model, options, prompt, system=None):
+    """
+    Cache key for one LLM request: provider, model and sampling options
+    plus a hash of the prompt (and of the system prompt, if any).
+    """
+    request = {
+        "provider": provider,
+        "model": model,
+        "options": options,
+        "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    }
+    if system:
+        request["system"] = hashlib.sha256(system.encode("utf-8")).hexdigest()
+    payload = json.dumps(request, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Two-level cache for LLM responses: an in-memory LRU in front of a
+    persistent SQLite table, so repeated prompts survive app restarts.
+    """
+
+    def __init__(self, path, max_memory_entries=256, ttl=7 * 24 * 3600):
+        self.max_memory_entries = max_memory_entries
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " text TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+
+    def get(self, key):
+        """Returns the cached response text for `key` or None."""
+        return self.get_first([key])[1]
+
+    def get_first(self, keys):
+        """
+        (key, text) of the first of `keys` with a cached response, or
+        (None, None). Counts as one hit or miss, however many keys it tries.
+        """
+        with self._lock:
+            for key in keys:
+                text = self._lookup(key)
+                if text is not None:
+                    self.stats["hits"] += 1
+                    return key, text
+            self.stats["misses"] += 1
+            return None, None
+
+    def _lookup(self, key):
+        if key in self._memory:
+            text, created_at = self._memory[key]
+            if time.time() - created_at <= self.ttl:
+                self._memory.move_to_end(key)
+                return text
+            del self._memory[key]
+
+        row = self._conn.execute(
+            "SELECT text, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        self._remember(key, row[0], row[1])
+        return row[0]
+
+    def put(self, key, text):
+        """Stores a response in memory and on disk."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._remember(key, text, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, text, now)
+            )
+
+    def _remember(self, key, text, created_at):
+        # The creation time travels along, so memory hits expire like disk hits
+        self._memory[key] = (text, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """Drops all cached responses."""
+        with self._lock, self._conn:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM responses")
@@ -0,0 +1,153 @@
+# templates.py
+
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+
+from config import TEMPLATE_SETTINGS
+from negotiation import format_slots
+
+PLACEHOLDER_RE = re.compile(r"\s?\[([^\]]+)\]")
+
+# Placeholder -> listing field (or value passed to render); anything else
+# stays in the text for the user to fill in.
+PLACEHOLDERS = {
+    "Name": "seller_name",
+    "Titel": "title",
+    "Produkt/Dienstleistung": "title",
+    "Preis": "price",
+    "Betrag": "betrag"
+}
+
+class Template:
+    """
+    A text block compiled once into a str.format pattern, so rendering is a
+    single format_map call. Known placeholders become fields; unfilled
+    fields fall back to the original placeholder, '[Optional: ...]' parts
+    are dropped.
+    """
+
+    __slots__ = ("name", "source", "fields", "_pattern")
+
+    def __init__(self, name, source):
+        self.name = name
+        self.source = source
+        self.fields = set()
+        parts = []
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            parts.append(_escape(source[position:match.start()]))
+            position = match.end()
+            label = match.group(1)
+            leading = match.group(0)[:-len(label) - 2]
+            if label.startswith("Optional"):
+                continue
+            field = PLACEHOLDERS.get(label)
+            if field is None:
+                parts.append(_escape(match.group(0)))
+                continue
+            if field == "betrag" and not source[match.end():].startswith(" €"):
+                field = "betrag_eur"
+            self.fields.add(field)
+            parts.append(f"{_escape(leading)}{{{field}}}")
+        parts.append(_escape(source[position:]))
+        self._pattern = "".join(parts)
+
+    def render(self, values):
+        return self._pattern.format_map(values)
+
+class _Values(dict):
+    # Missing or empty values show the placeholder again
+    def __missing__(self, field):
+        if field == "betrag_eur":
+            return "[Betrag]"
+        label = next(label for label, f in PLACEHOLDERS.items() if f == field)
+        return f"[{label}]"
+
+def _escape(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+class TemplateLibrary:
+    """
+    The text_templates*.json files by category, compiled once. A file is
+    reloaded when its modification time changes (checked at most every
+    `check_interval` seconds), so edits apply without restarting the app;
+    if an edited file is invalid the previous version stays in use.
+    """
+
+    def __init__(self, files, check_interval=1.0, closing=""):
+        self.files = dict(files)
+        self.check_interval = check_interval
+        self.closing = closing
+        self.errors = {}
+        self._loaded = {}
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def categories(self):
+        return list(self.files)
+
+    def templates(self, category):
+        """{name: Template} of a category, in file order."""
+        self._reload_changed()
+        return self._loaded[category][1]
+
+    def render_message(self, category, names, info, betrag=None, slots=None):
+        """
+        Joins the chosen templates of a category into a complete message.
+        `betrag` fills [Betrag]; proposed `slots` are appended to the
+        Terminvereinbarung block.
+        """
+        values = _Values((k, v) for k, v in info.items() if v)
+        if betrag:
+            values["betrag"] = f"{betrag:g}".replace(".", ",")
+            values["betrag_eur"] = values["betrag"] + " €"
+        templates = self.templates(category)
+        blocks = []
+        for name in names:
+            if name not in templates:
+                continue
+            text = templates[name].render(values)
+            if name == "Terminvereinbarung" and slots:
+                text += f" Mir würden zum Beispiel folgende Termine passen: {format_slots(slots)}."
+            blocks.append(text)
+        if self.closing:
+            blocks.append(self.closing)
+        return "\n\n".join(blocks)
+
+    def _reload_changed(self):
+        now = time.monotonic()
+        if self._loaded and now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            self._checked = now
+            for category, path in self.files.items():
+                previous = self._loaded.get(category, (None, {}))
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                    if previous[0] == mtime:
+                        continue
+                    with open(path, encoding="utf-8") as f:
+                        raw = json.load(f)
+                    compiled = {name: Template(name, text) for name, text in raw.items()}
+                except (OSError, ValueError, AttributeError, TypeError) as e:
+                    # Missing (e.g. mid-save by an editor) or invalid: keep the
+                    # last good version and look again at the next check
+                    self.errors[category] = str(e)
+                    self._loaded[category] = (None, previous[1])
+                    continue
+                self.errors.pop(category, None)
+                self._loaded[category] = (mtime, compiled)
+
+@lru_cache(maxsize=None)
+def get_template_library():
+    """The process-wide template library."""
+    base = os.path.dirname(os.path.abspath(__file__))
+    return TemplateLibrary(
+        {category: os.path.join(base, path) for category, path in TEMPLATE_SETTINGS["files"].items()},
+        check_interval=TEMPLATE_SETTINGS["check_interval"],
+        closing=TEMPLATE_SETTINGS["closing"]
+    )
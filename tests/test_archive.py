@@ -0,0 +1,69 @@
+import pytest
+
+from archive import ListingArchive, fts_query, listing_key, parse_price
+
+@pytest.mark.parametrize("raw, expected", [
+    ("250 € VB", 250.0),
+    ("1.200 €", 1200.0),
+    ("1.250,50 €", 1250.5),
+    ("99.5 EUR", 99.5),
+    ("1 200 €", 1200.0),
+    ("1 200,00 €", 1200.0),
+    ("€ 45", 45.0),
+    ("2 Stühle je 40 €", 40.0),
+    ("10115 Berlin, 85 Euro", 85.0),
+    ("VB 120", 120.0),
+    ("Zu verschenken", 0.0),
+    ("VB", None),
+    ("Nicht gefunden", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_price(raw, expected):
+    assert parse_price(raw) == expected
+
+def test_fts_query_quotes_terms():
+    assert fts_query('Komm OR "ode') == '"komm"* "or"* "ode"*'
+    assert fts_query("  ") == ""
+
+def test_listing_key():
+    assert not listing_key({"title": "Sofa"}, "https://a/1").startswith("text:")
+    assert listing_key({"title": "Sofa"}).startswith("text:")
+    assert listing_key({"title": "Sofa"}) != listing_key({"title": "Sessel"})
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = ListingArchive(str(tmp_path / "archive.sqlite"))
+    archive.add_many([
+        ({"title": "Kommode Eiche", "description": "Massivholz", "location": "10115 Berlin", "price": "120 €"}, "https://a/1"),
+        ({"title": "Sofa grau", "description": "mit Kommode-Aufsatz", "location": "10245 Berlin", "price": "1 200 €"}, "https://a/2"),
+        ({"title": "Stuhl", "description": "Eiche, 2 Stück", "location": "20095 Hamburg", "price": "2 Stühle je 40 €"}, "https://a/3"),
+        ({"title": "Regal", "description": "", "location": "20095 Hamburg", "price": "Zu verschenken"}, "https://a/4"),
+        (None, "https://a/5"),
+    ], seen_at=1000)
+    yield archive
+    archive.close()
+
+def test_search_ranks_title_hits_first(archive):
+    assert [row["title"] for row in archive.search("komm")] == ["Kommode Eiche", "Sofa grau"]
+
+def test_search_filters(archive):
+    assert [row["title"] for row in archive.search("eiche", price_max=50)] == ["Stuhl"]
+    assert {row["title"] for row in archive.search(plz="10")} == {"Kommode Eiche", "Sofa grau"}
+    assert {row["title"] for row in archive.search(price_min=100)} == {"Kommode Eiche", "Sofa grau"}
+    assert archive.search(since=2000) == []
+
+def test_search_without_text_lists_newest_first(archive):
+    archive.add({"title": "Sofa grau", "location": "10245 Berlin", "price": "1.100 €"}, "https://a/2", seen_at=3000)
+    rows = archive.search()
+    assert rows[0]["title"] == "Sofa grau" and rows[0]["price"] == 1100.0
+    assert archive.count() == 4
+
+def test_price_stats(archive):
+    assert archive.price_stats() == {"count": 4, "min": 0.0, "median": 80.0, "mean": 340.0, "max": 1200.0}
+    assert archive.price_stats("gibtsnicht")["count"] == 0
+
+def test_clear(archive):
+    archive.clear()
+    assert archive.count() == 0
+    assert archive.search("kommode") == []
@@ -0,0 +1,44 @@
+import datetime
+
+from availability import round_up, earliest_start, working_windows, find_free_slots, propose_slots
+
+def dt(day, hour, minute=0, second=0, micro=0):
+    return datetime.datetime(2026, 3, day, hour, minute, second, micro)
+
+def test_round_up():
+    assert round_up(dt(2, 14, 37, 12, 345678), 30) == dt(2, 15, 0)
+    assert round_up(dt(2, 14, 30), 30) == dt(2, 14, 30)
+    assert round_up(dt(2, 23, 50), 30) == dt(3, 0, 0)
+
+def test_earliest_start_is_stable_and_not_immediate():
+    first = earliest_start(dt(2, 14, 37, 12, 345678), lead_minutes=120, round_minutes=30)
+    later = earliest_start(dt(2, 14, 37, 12, 355678), lead_minutes=120, round_minutes=30)
+    assert first == later == dt(2, 17, 0)
+
+def test_working_windows_skip_sunday_and_clip_to_range():
+    # 2026-03-01 is a Sunday
+    windows = working_windows(dt(1, 12), dt(3, 10), "09:00", "18:00", workdays=(0, 1, 2, 3, 4, 5))
+    assert windows == [(dt(2, 9), dt(2, 18)), (dt(3, 9), dt(3, 10))]
+
+def test_free_slots_respect_travel_buffer():
+    windows = [(dt(2, 9), dt(2, 18))]
+    busy = [(dt(2, 11), dt(2, 12)), (dt(2, 12), dt(2, 13))]
+    slots = find_free_slots(busy, windows, min_minutes=60, buffer_minutes=30)
+    assert slots == [(dt(2, 9), dt(2, 10, 30)), (dt(2, 13, 30), dt(2, 18))]
+
+def test_overlapping_busy_intervals():
+    windows = [(dt(2, 9), dt(2, 18))]
+    busy = [(dt(2, 10), dt(2, 15)), (dt(2, 11), dt(2, 12))]
+    assert find_free_slots(busy, windows, 60) == [(dt(2, 9), dt(2, 10)), (dt(2, 15), dt(2, 18))]
+
+def test_proposals_one_per_day_on_the_grid():
+    free = [
+        (dt(2, 9, 7), dt(2, 10, 0)),    # too short once rounded to 9:30
+        (dt(2, 13, 10), dt(2, 18)),
+        (dt(2, 18, 0), dt(2, 19)),      # same day, skipped
+        (dt(3, 9), dt(3, 12)),
+    ]
+    assert propose_slots(free, count=3, slot_minutes=60, round_minutes=30) == [
+        (dt(2, 13, 30), dt(2, 14, 30)),
+        (dt(3, 9), dt(3, 10)),
+    ]
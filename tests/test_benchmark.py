@@ -0,0 +1,32 @@
+from benchmark import BENCHMARKS, COMPARED, find_regressions
+
+def test_every_benchmark_declares_its_compared_fields():
+    for name in BENCHMARKS:
+        key, compare = COMPARED[name]
+        assert key and compare, name
+        assert set(compare.values()) <= {1, -1}, name
+
+def test_only_compared_fields_are_checked():
+    baseline = {"html": [{"kib": 33, "parser": "lxml", "alt_ms": 40.0, "neu_ms": 18.0, "neu_peak_kib": 280}]}
+    # Bigger input and a slower old code path are no regression
+    results = {"html": [{"kib": 33, "parser": "lxml", "alt_ms": 90.0, "neu_ms": 18.5, "neu_peak_kib": 280}]}
+    assert find_regressions(results, baseline, 0.2) == []
+
+    results["html"][0]["neu_ms"] = 30.0
+    (message,) = find_regressions(results, baseline, 0.2)
+    assert message.startswith("html (kib=33, parser=lxml): neu_ms 18.0 -> 30.0")
+
+def test_higher_is_better_fields():
+    baseline = {"parser": [{"anzeigen": 100, "alt_mb_s": 50.0, "neu_mb_s": 200.0}]}
+    assert find_regressions({"parser": [{"anzeigen": 100, "alt_mb_s": 10.0, "neu_mb_s": 300.0}]}, baseline, 0.2) == []
+    assert len(find_regressions({"parser": [{"anzeigen": 100, "neu_mb_s": 100.0}]}, baseline, 0.2)) == 1
+
+def test_rows_are_matched_by_key():
+    baseline = {"kpi": [{"kpis": 5, "wochen": 52, "woche_ms": 1.0}, {"kpis": 500, "wochen": 260, "woche_ms": 10.0}]}
+    # Rows in another order, and one without a baseline row
+    results = {"kpi": [
+        {"kpis": 500, "wochen": 260, "woche_ms": 10.5},
+        {"kpis": 100, "wochen": 260, "woche_ms": 99.0},
+        {"kpis": 5, "wochen": 52, "woche_ms": 1.1}
+    ]}
+    assert find_regressions(results, baseline, 0.2) == []
@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+
+from dedup import DuplicateIndex, listing_text, shingle_hashes
+
+SOFA = {"title": "Graues Sofa, 3-Sitzer", "description": "Gut erhaltenes Sofa aus Nichtraucherhaushalt, Stoffbezug grau, Abholung in Berlin."}
+SOFA_REPOST = {"title": "Graues Sofa 3 Sitzer", "description": "Gut erhaltenes Sofa aus Nichtraucherhaushalt, Stoffbezug grau, Abholung in Berlin!"}
+KOMMODE = {"title": "Kommode Eiche massiv", "description": "Vier Schubladen, leichte Gebrauchsspuren, Maße 80 x 45 x 90 cm."}
+
+def test_listing_text_skips_placeholders():
+    assert listing_text({"title": "Sofa, grau!", "description": None}) == "sofa grau"
+    assert listing_text({}) == ""
+
+def test_shingle_hashes_are_distinct_and_stable():
+    assert len(shingle_hashes("aaaaaaa")) == 1
+    assert np.array_equal(shingle_hashes("sofa grau"), shingle_hashes("sofa grau"))
+    assert len(shingle_hashes("abc")) == 1  # shorter than one shingle
+    assert len(shingle_hashes("")) == 0
+
+def test_check_finds_near_duplicates_only():
+    index = DuplicateIndex()
+    assert index.check("a", "Sofa", SOFA, 0.5) == []
+    assert index.check("b", "Kommode", KOMMODE, 0.5) == []
+    matches = index.check("c", "Sofa neu", SOFA_REPOST, 0.5)
+    assert [match["key"] for match in matches] == ["a"]
+    assert matches[0]["label"] == "Sofa" and matches[0]["similarity"] >= 0.75
+    assert len(index) == 3
+
+def test_same_key_does_not_match_itself():
+    index = DuplicateIndex()
+    index.check("a", "Sofa", SOFA, 0.5)
+    assert index.check("a", "Sofa", SOFA, 0.5) == []
+    assert len(index) == 1
+
+def test_listing_without_text_is_not_indexed():
+    index = DuplicateIndex()
+    assert index.check("a", None, {"title": None}, 0.5) == []
+    assert len(index) == 0
+
+def test_matches_survive_tail_flushes_and_replacement():
+    index = DuplicateIndex(tail_size=4)
+    for i in range(20):
+        index.check(f"k{i}", str(i), {"title": f"Artikel {i}", "description": f"Beschreibung Nummer {i * 7919}"}, 0.5)
+    index.check("sofa", "Sofa", SOFA, 0.5)
+    for i in range(20, 30):
+        index.check(f"k{i}", str(i), {"title": f"Artikel {i}", "description": f"Beschreibung Nummer {i * 7919}"}, 0.5)
+    assert [match["key"] for match in index.query(index.signature(SOFA_REPOST), 0.5)] == ["sofa"]
+
+    # A key whose row is already in a run gets a new row; the old one no longer matches
+    index.check("sofa", "Kommode", KOMMODE, 0.5)
+    assert index.query(index.signature(SOFA_REPOST), 0.5) == []
+    assert [match["label"] for match in index.query(index.signature(KOMMODE), 0.5)] == ["Kommode"]
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = DuplicateIndex(path)
+    index.check("a", "Sofa", SOFA, 0.5)
+    index.save()
+    loaded = DuplicateIndex(path)
+    assert len(loaded) == 1
+    assert loaded.check("b", "Sofa neu", SOFA_REPOST, 0.5)[0]["key"] == "a"
+
+    # Other MinHash settings can't reuse the stored signatures
+    assert len(DuplicateIndex(path, num_perm=64)) == 0
+
+def test_save_is_debounced(tmp_path):
+    path = tmp_path / "index.npz"
+    index = DuplicateIndex(str(path), save_interval=3600)
+    index.check("a", "Sofa", SOFA, 0.5)
+    index.save()
+    written = path.stat().st_mtime_ns
+
+    index.check("b", "Kommode", KOMMODE, 0.5)
+    index.save()
+    assert path.stat().st_mtime_ns == written
+    assert len(DuplicateIndex(str(path))) == 1
+
+    index.save(force=True)
+    assert len(DuplicateIndex(str(path))) == 2
+
+def test_unchanged_index_is_not_written(tmp_path):
+    path = tmp_path / "index.npz"
+    DuplicateIndex(str(path)).save(force=True)
+    assert not path.exists()
+
+def test_concurrent_checks_see_each_other():
+    index = DuplicateIndex()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def check(i):
+        barrier.wait()
+        results.append(index.check(f"k{i}", str(i), SOFA, 0.5))
+
+    threads = [threading.Thread(target=check, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Checked one after another: the n-th check finds the n-1 before it
+    assert sorted(len(matches) for matches in results) == list(range(8))
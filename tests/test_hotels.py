@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from hotels import HotelLookup, PlacesError, location_key
+from http_client import HttpClient
+
+class PlacesStub:
+    """
+    Local stand-in for the Places text search: two pages per query, and
+    the page token only works from its second use on, like at Google.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []
+        self.tokens_seen = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+                stub.requests.append(params)
+                time.sleep(stub.delay)
+                body = json.dumps(stub.answer(params)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/textsearch/json"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def answer(self, params):
+        if params.get("query") == "hotels in kaputt":
+            return {"status": "REQUEST_DENIED", "error_message": "Schlüssel ungültig"}
+        if "pagetoken" in params:
+            token = params["pagetoken"]
+            if token not in self.tokens_seen:
+                self.tokens_seen.add(token)
+                return {"status": "INVALID_REQUEST"}
+            return {"status": "OK", "results": [{"name": f"Hotel {token}-2", "formatted_address": "Weg 2"}]}
+        token = params["query"].split()[-1]
+        return {
+            "status": "OK",
+            "results": [{"name": f"Hotel {token}-1", "formatted_address": "Weg 1", "rating": 4.5}],
+            "next_page_token": token
+        }
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stub():
+    stub = PlacesStub()
+    yield stub
+    stub.close()
+
+def _lookup(tmp_path, stub, **kwargs):
+    kwargs.setdefault("token_delay", 0.01)
+    return HotelLookup(str(tmp_path / "hotels.sqlite"), "key", stub.url, HttpClient(retries=0), **kwargs)
+
+def test_location_key():
+    assert location_key("10115 Berlin Mitte") == "plz:10115"
+    assert location_key("  Berlin   Mitte ") == "ort:berlin mitte"
+
+def test_pages_follow_the_next_page_token(tmp_path, stub):
+    lookup = _lookup(tmp_path, stub)
+    hotels, has_more = lookup.page("10115 Berlin", 0)
+    assert hotels == [{"name": "Hotel Berlin-1", "address": "Weg 1", "rating": 4.5}]
+    assert has_more
+
+    hotels, has_more = lookup.page("10115 Berlin", 1)
+    assert hotels == [{"name": "Hotel Berlin-2", "address": "Weg 2", "rating": "Keine Bewertung"}]
+    assert not has_more
+    assert lookup.page("10115 Berlin", 2) == ([], False)
+
+def test_token_delay_retries_the_page_once(tmp_path, stub):
+    lookup = _lookup(tmp_path, stub, token_delay=0.2)
+    lookup.page("10115 Berlin", 0)
+    start = time.perf_counter()
+    lookup.page("10115 Berlin", 1)
+    assert time.perf_counter() - start >= 0.2
+    # Query, then the token twice: rejected before the delay, accepted after it
+    assert [sorted(request) for request in stub.requests] == [["key", "query"], ["key", "pagetoken"], ["key", "pagetoken"]]
+    assert lookup.stats["api_calls"] == 3
+
+def test_same_plz_is_served_from_the_cache(tmp_path, stub):
+    lookup = _lookup(tmp_path, stub)
+    lookup.page("10115 Berlin", 0)
+    lookup.page("10115 Berlin", 1)
+    calls = len(stub.requests)
+
+    # Another spelling of the same postal code area needs no API call
+    assert lookup.page("10115 Berlin-Mitte", 0)[0][0]["name"] == "Hotel Berlin-1"
+    assert lookup.page("Nähe 10115", 1)[0][0]["name"] == "Hotel Berlin-2"
+    assert len(stub.requests) == calls
+    assert lookup.stats["hits"] == 2
+
+    # The cache outlives the lookup object
+    assert _lookup(tmp_path, stub).page("10115", 0)[0][0]["name"] == "Hotel Berlin-1"
+    assert len(stub.requests) == calls
+
+def test_expired_area_is_fetched_again(tmp_path, stub):
+    lookup = _lookup(tmp_path, stub, ttl=0)
+    lookup.page("10115 Berlin", 0)
+    time.sleep(0.01)
+    lookup.page("10115 Berlin", 0)
+    assert len(stub.requests) == 2
+    assert lookup.stats["hits"] == 0
+
+def test_api_error_raises(tmp_path, stub):
+    with pytest.raises(PlacesError, match="Schlüssel ungültig"):
+        _lookup(tmp_path, stub).page("kaputt", 0)
+
+def test_cached_area_does_not_wait_for_a_slow_one(tmp_path, stub):
+    lookup = _lookup(tmp_path, stub, token_delay=0.5)
+    lookup.page("20095 Hamburg", 0)
+    lookup.page("10115 Berlin", 0)
+    slow = threading.Thread(target=lookup.page, args=("10115 Berlin", 1))
+    slow.start()
+    time.sleep(0.1)  # the slow lookup is now in its token delay
+    start = time.perf_counter()
+    assert lookup.page("20095 Hamburg", 0)[0]
+    assert time.perf_counter() - start < 0.25
+    slow.join()
+
+def test_stale_page_token_starts_the_area_over(tmp_path, stub):
+    lookup = _lookup(tmp_path, stub, token_ttl=0.05)
+    lookup.page("10115 Berlin", 0)
+    time.sleep(0.1)
+    hotels, has_more = lookup.page("10115 Berlin", 1)
+    assert hotels[0]["name"] == "Hotel Berlin-2"
+    assert not has_more
+    # The first page again for a fresh token, then the token as usual
+    assert [sorted(request) for request in stub.requests] == [
+        ["key", "query"], ["key", "query"], ["key", "pagetoken"], ["key", "pagetoken"]
+    ]
+    # Cached pages are still served without a new token
+    calls = len(stub.requests)
+    time.sleep(0.1)
+    assert lookup.page("10115 Berlin", 1)[0][0]["name"] == "Hotel Berlin-2"
+    assert len(stub.requests) == calls
@@ -0,0 +1,97 @@
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import HttpClient, retry_after_seconds
+from utils import HostThrottle
+
+class FlakyServer:
+    """Answers with the queued (status, headers) pairs, then with 200."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.times = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.times.append(time.monotonic())
+                status, headers = server.answers.pop(0) if server.answers else (200, {})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def gaps(self):
+        return [b - a for a, b in zip(self.times, self.times[1:])]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def flaky():
+    servers = []
+
+    def start(*answers):
+        servers.append(FlakyServer(*answers))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+def test_retry_after_seconds():
+    assert retry_after_seconds("3") == 3.0
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("bald") is None
+    assert 8 <= retry_after_seconds(formatdate(time.time() + 10, usegmt=True)) <= 10
+    assert retry_after_seconds(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+def test_retries_server_errors(flaky):
+    server = flaky((500, {}), (502, {}))
+    response = HttpClient(backoff=0.0).get(server.url)
+    assert response.status_code == 200
+    assert len(server.times) == 3
+    assert HttpClient(backoff=0.0, retries=1).get(flaky((500, {}), (500, {})).url).status_code == 500
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retry_after_is_honoured(flaky, status):
+    server = flaky((status, {"Retry-After": "1"}))
+    response = HttpClient(backoff=0.0).get(server.url)
+    assert response.status_code == 200
+    assert server.gaps()[0] >= 1.0
+
+def test_too_long_retry_after_ends_the_retries(flaky):
+    server = flaky((429, {"Retry-After": "120"}))
+    start = time.monotonic()
+    response = HttpClient(backoff=0.0, max_retry_after=30).get(server.url)
+    assert response.status_code == 429
+    assert len(server.times) == 1
+    assert time.monotonic() - start < 1.0
+
+def test_retries_keep_the_host_interval(flaky):
+    server = flaky((500, {}), (429, {}))
+    response = HttpClient(backoff=0.0).get(server.url, throttle=HostThrottle(0.3))
+    assert response.status_code == 200
+    assert len(server.times) == 3
+    # Measured at the server, so allow a little scheduling noise
+    assert all(gap >= 0.28 for gap in server.gaps()), server.gaps()
+
+def test_host_metrics_count_retries(flaky):
+    client = HttpClient(backoff=0.0)
+    client.get(flaky((500, {})).url)
+    (row,) = client.host_metrics()
+    assert row["requests"] == 2 and row["errors"] == 1 and row["retries"] == 1
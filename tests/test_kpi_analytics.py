@@ -0,0 +1,58 @@
+import calendar as cal
+import datetime
+
+import numpy as np
+import pytest
+
+from kpi_analytics import month_calendar, select_stage
+
+def _thursday(woche, start_year):
+    return datetime.date.fromisocalendar(start_year, 1, 4) + datetime.timedelta(weeks=woche - 1)
+
+@pytest.mark.parametrize("start_year", [2020, 2024, 2025])
+def test_month_calendar_matches_the_thursdays(start_year):
+    wochen = list(range(1, 157))
+    calendar = month_calendar(wochen, start_year)
+    thursdays = [_thursday(woche, start_year) for woche in wochen]
+    months = [(day.year, day.month) for day in thursdays]
+
+    assert list(calendar.index) == wochen
+    assert list(calendar["monat"]) == [f"{year}-{month:02d}" for year, month in months]
+    # Position and count of the weeks whose Thursday falls in the same month
+    assert list(calendar["woche_im_monat"]) == [(day.day - 1) // 7 + 1 for day in thursdays]
+    thursdays_in_month = [sum(1 for week in cal.monthcalendar(year, month) if week[3]) for year, month in months]
+    assert list(calendar["wochen_im_monat"]) == thursdays_in_month
+
+def test_month_calendar_known_weeks():
+    calendar = month_calendar([1, 5, 9, 13], 2024)
+    # 2024: January has 4 weeks (Thursdays 4.-25.), February 5 (1.-29.)
+    assert calendar.loc[1].tolist() == ["2024-01", 1, 4]
+    assert calendar.loc[5].tolist() == ["2024-02", 1, 5]
+    assert calendar.loc[9].tolist() == ["2024-02", 5, 5]
+    assert calendar.loc[13].tolist() == ["2024-03", 4, 4]
+
+def _first_stage(value, thresholds):
+    for index, threshold in enumerate(thresholds):
+        if value <= threshold:
+            return index
+    return -1
+
+def test_select_stage_matches_the_loop():
+    thresholds = [0, 25, 25, 75, 100]
+    values = [-5, 0, 0.1, 25, 26, 75, 99.9, 100, 100.1, 250, float("nan")]
+    expected = [_first_stage(value, thresholds) for value in values]
+    assert select_stage(values, thresholds).tolist() == expected
+    assert expected[-3:] == [-1, -1, -1]
+
+def test_select_stage_per_value_thresholds():
+    thresholds = [[10, 20], [1, 2], [100, 200]]
+    assert select_stage([15, 15, 15], thresholds).tolist() == [1, -1, 0]
+
+def test_select_stage_random_against_loop():
+    rng = np.random.default_rng(7)
+    values = rng.uniform(-10, 130, 500)
+    thresholds = [0, 50, 80, 100, 120]
+    assert select_stage(values, thresholds).tolist() == [_first_stage(v, thresholds) for v in values]
+
+def test_select_stage_empty():
+    assert select_stage([], [0, 100]).tolist() == []
@@ -0,0 +1,35 @@
+from listing_parser import DEFAULTS, parse_listing, parse_listings
+
+LISTING = """
+Verkäufer: Helga Schmidt
+Kommode aus Eiche, massiv
+Zustand: Gut
+10115 Berlin
+Vier Schubladen, kaum Gebrauchsspuren.
+"""
+
+def test_parse_listing_fields():
+    assert parse_listing(LISTING.splitlines()) == {
+        "seller_name": "Helga Schmidt",
+        "title": "Kommode aus Eiche, massiv",
+        "condition": "Gut",
+        "location": "10115 Berlin",
+        "description": "Vier Schubladen, kaum Gebrauchsspuren."
+    }
+
+def test_missing_fields_get_defaults():
+    assert parse_listing(["Verkäufer: Jonas"]) == dict(DEFAULTS, seller_name="Jonas")
+
+def test_parse_listings_splits_at_boundaries():
+    records = parse_listings(LISTING + "\n-----\n" + "Verkäufer: Jonas\nSofa, drei Sitze, grau\n=====\n\n***\n")
+    assert [record["seller_name"] for record in records] == ["Helga Schmidt", "Jonas"]
+    assert records[1]["title"] == "Sofa, drei Sitze, grau"
+    assert records[1]["location"] == DEFAULTS["location"]
+
+def test_parse_listings_matches_parse_listing_per_block():
+    blocks = [LISTING, "Verkäufer: Jonas\nSofa, drei Sitze, grau\n12345 Irgendwo"]
+    assert parse_listings("\n---\n".join(blocks)) == [parse_listing(block.splitlines()) for block in blocks]
+
+def test_empty_paste_gives_one_default_record():
+    assert parse_listings("") == [DEFAULTS]
+    assert parse_listings("---\n\n===") == [DEFAULTS]
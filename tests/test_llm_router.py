@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from llm_manager import LLMError, LLMManager
+
+def _manager(providers, hedge_after=None):
+    """A manager that routes only between the given stub providers, in order."""
+    manager = LLMManager(provider=providers[0][0], fallback=[name for name, _ in providers], hedge_after=hedge_after)
+    manager._providers.clear()
+    for name, stream in providers:
+        manager.register_provider(name, stream, f"{name}-model")
+    return manager
+
+def _answer(*tokens, delay=0.0):
+    def stream(prompt, system):
+        time.sleep(delay)
+        yield from tokens
+    return stream
+
+def _failing(message):
+    def stream(prompt, system):
+        raise RuntimeError(message)
+        yield
+    return stream
+
+def _generate(manager, prompt="Hallo"):
+    # Guard against a hanging router: fail the test instead of blocking the run
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(manager.generate_result(prompt)), daemon=True)
+    worker.start()
+    worker.join(5)
+    assert not worker.is_alive(), "generate_result() hat nicht zurückgegeben"
+    return result
+
+def test_first_provider_answers():
+    result = _generate(_manager([("a", _answer("Hal", "lo")), ("b", _answer("b"))]))
+    assert result["text"] == "Hallo"
+    assert result["provider"] == "a" and result["model"] == "a-model"
+    assert result["error"] is None and not result["hedged"]
+
+def test_failover_after_error_in_stream():
+    result = _generate(_manager([("a", _failing("kaputt")), ("b", _answer("von b"))]))
+    assert result["text"] == "von b"
+    assert result["provider"] == "b"
+    assert [attempt["provider"] for attempt in result["attempts"]] == ["a"]
+    assert "kaputt" in result["attempts"][0]["error"]
+
+def test_provider_that_raises_when_called():
+    def broken(prompt, system):
+        raise ConnectionError("nicht erreichbar")
+
+    result = _generate(_manager([("a", broken), ("b", _answer("ok"))]))
+    assert result["text"] == "ok"
+    assert "nicht erreichbar" in result["attempts"][0]["error"]
+
+def test_all_providers_fail():
+    def broken(prompt, system):
+        raise ConnectionError("nicht erreichbar")
+
+    result = _generate(_manager([("a", broken), ("b", _failing("kaputt"))]))
+    assert result["text"] is None
+    assert "nicht erreichbar" in result["error"] and "kaputt" in result["error"]
+    assert [attempt["provider"] for attempt in result["attempts"]] == ["a", "b"]
+
+def test_empty_answer_counts_as_failure():
+    result = _generate(_manager([("a", _answer()), ("b", _answer("ok"))]))
+    assert result["text"] == "ok"
+    assert result["attempts"][0]["provider"] == "a"
+
+def test_hedged_request_wins_over_slow_provider():
+    result = _generate(_manager([("a", _answer("langsam", delay=1.0)), ("b", _answer("schnell"))], hedge_after=0.05))
+    assert result["text"] == "schnell"
+    assert result["provider"] == "b"
+    assert result["hedged"]
+
+def test_no_hedging_when_first_token_is_in_time():
+    result = _generate(_manager([("a", _answer("schnell")), ("b", _answer("b"))], hedge_after=1.0))
+    assert result["provider"] == "a"
+    assert not result["hedged"]
+
+def test_generate_raises_llm_error():
+    with pytest.raises(LLMError):
+        _manager([("a", _failing("kaputt"))]).generate("Hallo")
+
+def test_hedge_timer_after_failover_to_the_last_provider():
+    # a fails, failover starts b, the last one: the hedge timer must not fire
+    result = _generate(_manager([("a", _failing("kaputt")), ("b", _answer("spät", delay=1.0))], hedge_after=0.3))
+    assert result["text"] == "spät"
+    assert result["provider"] == "b"
+    assert not result["hedged"]
+
+def test_hedge_timer_restarts_after_failover():
+    providers = [("a", _failing("kaputt")), ("b", _answer("langsam", delay=1.0)), ("c", _answer("schnell"))]
+    result = _generate(_manager(providers, hedge_after=0.1))
+    assert result["text"] == "schnell"
+    assert result["provider"] == "c"
+    assert result["hedged"]
@@ -0,0 +1,55 @@
+import response_cache
+from llm_manager import LLMManager
+from response_cache import ResponseCache, make_cache_key
+
+def test_cache_key_depends_on_every_part():
+    key = make_cache_key("ollama", "llama2", {"temperature": 0.7}, "Hallo")
+    assert key == make_cache_key("ollama", "llama2", {"temperature": 0.7}, "Hallo")
+    assert key != make_cache_key("openai", "llama2", {"temperature": 0.7}, "Hallo")
+    assert key != make_cache_key("ollama", "llama2", {"temperature": 0.2}, "Hallo")
+    assert key != make_cache_key("ollama", "llama2", {"temperature": 0.7}, "Hallo", system="Sei kurz.")
+
+def test_get_and_put(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"))
+    assert cache.get("k") is None
+    cache.put("k", "Antwort")
+    assert cache.get("k") == "Antwort"
+    assert cache.stats == {"hits": 1, "misses": 1}
+    # From disk after a restart
+    assert ResponseCache(str(tmp_path / "c.sqlite")).get("k") == "Antwort"
+
+def test_memory_hits_expire(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(str(tmp_path / "c.sqlite"), ttl=60)
+    cache.put("k", "Antwort")
+    now[0] += 59
+    assert cache.get("k") == "Antwort"
+    now[0] += 2
+    assert cache.get("k") is None
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+def test_memory_lru_keeps_disk_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"), max_memory_entries=1)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+
+def test_get_first_counts_one_miss(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"))
+    assert cache.get_first(["a", "b", "c"]) == (None, None)
+    cache.put("b", "B")
+    assert cache.get_first(["a", "b", "c"]) == ("b", "B")
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+def test_one_miss_per_request_with_fallback_providers(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"))
+    manager = LLMManager(provider="a", fallback=["a", "b", "c"], response_cache=cache)
+    manager._providers.clear()
+    for name in ("a", "b", "c"):
+        manager.register_provider(name, lambda prompt, system: iter(["Hallo"]), f"{name}-model")
+
+    assert manager.generate_result("Frage")["cached"] is False
+    assert cache.stats == {"hits": 0, "misses": 1}
+    assert manager.generate_result("Frage")["cached"] is True
+    assert cache.stats == {"hits": 1, "misses": 1}
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmark import HEAVY_MODULES, STARTUP_MODULES, heavy_imports, import_times
+
+def test_heavy_imports_matches_submodules():
+    times = {"google": 1, "google.auth": 1, "google.auth.transport": 1, "requests_toolbelt": 1, "bs4": 1}
+    assert heavy_imports(times) == ["bs4", "google.auth", "google.auth.transport"]
+
+@pytest.mark.parametrize("module", STARTUP_MODULES + ["app"])
+def test_no_heavy_module_is_imported_at_startup(module):
+    # Runs in a fresh interpreter, so modules imported by other tests don't count
+    assert heavy_imports(import_times([module])) == [], f"{module} importiert eines von {HEAVY_MODULES}"
+
+def test_importing_creates_no_files(tmp_path):
+    # Stores such as listing_cache.sqlite are opened on first use, not on import
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run(
+        [sys.executable, "-c", "import " + ", ".join(STARTUP_MODULES)],
+        cwd=tmp_path, env=dict(os.environ, PYTHONPATH=repo), check=True
+    )
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,52 @@
+import json
+import os
+
+from templates import Template, TemplateLibrary
+
+def test_known_placeholders_are_filled():
+    template = Template("Erstkontakt", "Hallo [Name], ich interessiere mich für '[Titel]'.")
+    assert template.fields == {"seller_name", "title"}
+    assert template.render({"seller_name": "Helga", "title": "Kommode"}) == "Hallo Helga, ich interessiere mich für 'Kommode'."
+
+def test_unknown_and_optional_placeholders():
+    template = Template("X", "Infos zu [Details] bitte. [Optional: Begründung]")
+    assert template.fields == set()
+    assert template.render({}) == "Infos zu [Details] bitte."
+
+def test_braces_in_text_are_kept():
+    assert Template("X", "{kein Feld} [Name]").render({"seller_name": "Jonas"}) == "{kein Feld} Jonas"
+
+def test_betrag_with_and_without_euro_sign(tmp_path):
+    path = tmp_path / "t.json"
+    path.write_text(json.dumps({"A": "Auf [Betrag] €?", "B": "Auf [Betrag]?"}), encoding="utf-8")
+    library = TemplateLibrary({"c": str(path)})
+    assert library.render_message("c", ["A", "B"], {}, betrag=199.5) == "Auf 199,5 €?\n\nAuf 199,5 €?"
+    # Without a value the placeholder stays for the user to fill in
+    assert library.render_message("c", ["B"], {}) == "Auf [Betrag]?"
+
+def _library(tmp_path, content):
+    path = tmp_path / "t.json"
+    path.write_text(json.dumps(content), encoding="utf-8")
+    return path, TemplateLibrary({"c": str(path)}, check_interval=0)
+
+def test_invalid_edit_keeps_last_good_version(tmp_path):
+    path, library = _library(tmp_path, {"A": "Hallo [Name]"})
+    assert list(library.templates("c")) == ["A"]
+
+    path.write_text('{"A": 5}', encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    assert list(library.templates("c")) == ["A"]
+    assert "c" in library.errors
+
+    path.write_text("{kaputt", encoding="utf-8")
+    os.utime(path, ns=(2, 2))
+    assert list(library.templates("c")) == ["A"]
+
+def test_missing_file_keeps_last_good_version_until_it_returns(tmp_path):
+    path, library = _library(tmp_path, {"A": "Hallo"})
+    library.templates("c")
+    path.unlink()
+    assert list(library.templates("c")) == ["A"]
+    path.write_text(json.dumps({"B": "Neu"}), encoding="utf-8")
+    assert list(library.templates("c")) == ["B"]
+    assert "c" not in library.errors
@@ -1,21 +1,34 @@
 # utils.py
+#
+# Heavy integrations (requests, BeautifulSoup, icalendar, Google API client)
+# are imported on first use, so importing this module stays cheap.
 
-import requests
-from bs4 import BeautifulSoup
-from tenacity import retry, stop_after_attempt, wait_random_exponential
-import re
+import atexit
+import contextvars
 import random
 import time
-from icalendar import Calendar
-from datetime import datetime
-import os
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+from datetime import datetime, timedelta
 
-# Google Calendar integration
-import google.auth
-import google.auth.transport.requests
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from config import (
+    SCRAPER_SETTINGS,
+    CACHE_SETTINGS,
+    CALENDAR_SETTINGS,
+    AVAILABILITY_SETTINGS,
+    PLACES_SETTINGS,
+    GOOGLE_CALENDAR_SETTINGS,
+    ARCHIVE_SETTINGS,
+    DEDUP_SETTINGS
+)
+from listing_cache import ListingCache
+from listing_parser import parse_listings
+from availability import earliest_start, working_windows, find_free_slots, propose_slots
+from hotels import HotelLookup
+from archive import ListingArchive, listing_key
+from instrumentation import tracer
 
 class ExtractionError(Exception):
     pass
@@ -29,30 +42,124 @@ USER_AGENTS = [
     "(KHTML, like Gecko) Chrome/99.0 Safari/537.36"
 ]
 
-@retry(stop=stop_after_attempt(5), wait=wait_random_exponential(min=2, max=6), reraise=True)
-def extract_info_from_url(url):
+class HostThrottle:
     """
-    Extracts title, description, and price from a Kleinanzeigen URL.
-    (You likely need to adapt this for the real structure.)
+    Per-host politeness limit. Requests to the same host are spaced at least
+    `min_interval` (+ random jitter) seconds apart, requests to different
+    hosts never wait for each other.
     """
+
+    def __init__(self, min_interval, jitter=0.0):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        """Blocks until the host of `url` may be contacted again."""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval + random.uniform(0, self.jitter)
+        delay = slot - time.monotonic()
+        if delay > 0:
+            with tracer.span("scrape.throttle", host=host):
+                time.sleep(delay)
+
+_throttle = HostThrottle(
+    SCRAPER_SETTINGS["min_host_interval"],
+    SCRAPER_SETTINGS["host_interval_jitter"]
+)
+
+@lru_cache(maxsize=None)
+def get_listing_cache():
+    """The process-wide cache of extracted listings, opened on first use."""
+    return ListingCache(
+        CACHE_SETTINGS["path"],
+        ttl=CACHE_SETTINGS["ttl"],
+        max_bytes=CACHE_SETTINGS["max_bytes"]
+    )
+
+def extract_info_from_url(url, use_cache=True):
+    """
+    Extracts title, description, price and location from a Kleinanzeigen URL.
+    (Selectors per site live in extractors.json.)
+    Results are cached in get_listing_cache(); stale entries are revalidated
+    with a conditional GET. Network errors are retried by the shared
+    HTTP client.
+    """
+    with tracer.span("scrape.extract", host=urlsplit(url).netloc.lower()) as span:
+        return _extract_info_from_url(url, use_cache, span)
+
+def _extract_info_from_url(url, use_cache, span):
+    import requests
+    from extractors import extract_listing
+    from http_client import get_client
+
+    listing_cache = get_listing_cache()
+    cached = listing_cache.lookup(url) if use_cache else None
+    if cached and cached["fresh"]:
+        span["cache"] = "hit"
+        return cached["info"]
+
     headers = {'User-Agent': random.choice(USER_AGENTS)}
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
     try:
-        time.sleep(random.uniform(1, 3))  # Delay
-        response = requests.get(url, headers=headers)
+        # Politeness delay per host, before the first attempt and every retry
+        response = get_client().get(url, headers=headers, throttle=_throttle)
+        if cached and response.status_code == 304:
+            span["cache"] = "revalidated"
+            listing_cache.touch(url)
+            return cached["info"]
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.content, 'html.parser')
-        title = soup.find('h1').text.strip() if soup.find('h1') else "Nicht gefunden"
-        description = soup.find('p').text.strip() if soup.find('p') else "Nicht gefunden"
-        price_span = soup.find('span', class_='price')
-        price = price_span.text.strip() if price_span else "Nicht gefunden"
-
-        return {"title": title, "description": description, "price": price}
+        span["cache"] = "miss"
+        with tracer.span("scrape.parse", bytes=len(response.content)):
+            info = extract_listing(response.content, url)
     except requests.RequestException as e:
         raise ExtractionError(f"Fehler beim Abrufen der URL: {e}")
     except Exception as e:
         raise ExtractionError(f"Fehler beim Parsen der HTML-Daten: {e}")
 
+    listing_cache.store(url, info, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return info
+
+def extract_info_from_urls(urls, max_workers=None):
+    """
+    Extracts several listings concurrently through a bounded worker pool.
+    Yields (url, info, error) tuples as soon as each listing finishes;
+    exactly one of `info` and `error` (an ExtractionError) is set.
+    """
+    urls = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+    if not urls:
+        return
+
+    max_workers = max_workers or SCRAPER_SETTINGS["max_workers"]
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)))
+    try:
+        # Each worker runs in a copy of the caller's context to stay in its trace
+        futures = {
+            pool.submit(contextvars.copy_context().run, extract_info_from_url, url): url
+            for url in urls
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                yield url, future.result(), None
+            except ExtractionError as e:
+                yield url, None, e
+            except Exception as e:
+                yield url, None, ExtractionError(f"Unerwarteter Fehler: {e}")
+    finally:
+        # Don't keep downloading if the caller stops consuming (e.g. a Streamlit rerun)
+        pool.shutdown(wait=False, cancel_futures=True)
+
 def analyze_manual_text(text):
     """
     Analyzes manually pasted text to extract:
@@ -61,36 +168,63 @@ def analyze_manual_text(text):
     - condition
     - location
     - description
+    If the text contains several listings, only the first one is returned
+    (see analyze_manual_listings).
+    """
+    return parse_listings(text)[0]
+
+def analyze_manual_listings(text):
+    """
+    Like analyze_manual_text, but returns one record per listing for
+    pastes that contain several listings separated by lines like '---'.
     """
-    lines = text.splitlines()
-    extracted_info = {
-        "seller_name": None,
-        "title": None,
-        "condition": None,
-        "location": None,
-        "description": None
-    }
-
-    for line in lines:
-        line = line.strip().lower()
-        if "verkäufer" in line and not extracted_info["seller_name"]:
-            extracted_info["seller_name"] = line.split(":")[-1].strip().title()
-        elif len(line) > 10 and not extracted_info["title"]:
-            extracted_info["title"] = line.capitalize()
-        elif "zustand" in line and not extracted_info["condition"]:
-            extracted_info["condition"] = line.split(":")[-1].strip()
-        elif re.match(r"\d{5}\s+\w+", line) and not extracted_info["location"]:
-            extracted_info["location"] = line
-        elif not extracted_info["description"]:
-            extracted_info["description"] = line
-
-    return {
-        "seller_name": extracted_info["seller_name"] or "Unbekannter Verkäufer",
-        "title": extracted_info["title"] or "Nicht verfügbar",
-        "condition": extracted_info["condition"] or "Keine Angaben",
-        "location": extracted_info["location"] or "Keine Adresse gefunden",
-        "description": extracted_info["description"] or "Keine Beschreibung verfügbar"
-    }
+    return parse_listings(text)
+
+@lru_cache(maxsize=None)
+def get_listing_archive():
+    """The process-wide archive of analysed listings, opened on first use."""
+    return ListingArchive(ARCHIVE_SETTINGS["path"])
+
+@lru_cache(maxsize=None)
+def get_duplicate_index():
+    """The process-wide near-duplicate index (NumPy), loaded from disk on first use."""
+    from dedup import DuplicateIndex
+    index = DuplicateIndex(
+        DEDUP_SETTINGS["path"],
+        num_perm=DEDUP_SETTINGS["num_perm"],
+        bands=DEDUP_SETTINGS["bands"],
+        shingle_size=DEDUP_SETTINGS["shingle_size"],
+        save_interval=DEDUP_SETTINGS["save_interval"]
+    )
+    # Writes the listings added since the last (debounced) save
+    atexit.register(index.save, force=True)
+    return index
+
+def check_duplicates(items, save=True):
+    """
+    Checks (info, url) pairs against every listing seen before and adds
+    them to the duplicate index. Returns a list of similar listings
+    ({key, label, similarity}) per pair; failed extractions (info None)
+    get an empty list. save=True saves the index at most every
+    DEDUP_SETTINGS["save_interval"] seconds.
+    """
+    index = get_duplicate_index()
+    matches = [
+        index.check(listing_key(info, url), info.get("title"), info, DEDUP_SETTINGS["similar_threshold"])
+        if info else []
+        for info, url in items
+    ]
+    if save:
+        index.save()
+    return matches
+
+def find_duplicates(info, key):
+    """Similar listings to an already indexed one, without adding anything."""
+    index = get_duplicate_index()
+    signature = index.signature(info)
+    if signature is None:
+        return []
+    return index.query(signature, DEDUP_SETTINGS["similar_threshold"], exclude=key)
 
 ##################################################################
 # ICS-based calendar read (for demonstration)
@@ -98,102 +232,129 @@ def analyze_manual_text(text):
 
 CALENDAR_URL = "https://calendar.google.com/calendar/ical/your_calendar_id_here/basic.ics"
 
-def fetch_calendar_events():
+@lru_cache(maxsize=None)
+def get_calendar_feed():
+    """The process-wide cached ICS feed, created on first use."""
+    from calendar_index import CalendarFeed
+    from http_client import get_client
+    return CalendarFeed(CALENDAR_URL, max_age=CALENDAR_SETTINGS["max_age"], session=get_client())
+
+def fetch_calendar_events(days=None):
     """
-    Fetches the ICS calendar file and extracts events (read-only).
+    Returns the events of the ICS calendar (read-only), sorted by start.
+    With `days`, only events in the next `days` days are returned.
+    The feed is cached and refreshed in the background by get_calendar_feed().
     """
-    try:
-        response = requests.get(CALENDAR_URL)
-        response.raise_for_status()
-        calendar = Calendar.from_ical(response.text)
-
-        events = []
-        for component in calendar.walk():
-            if component.name == "VEVENT":
-                event_summary = component.get("summary")
-                event_start = component.get("dtstart").dt
-                event_end = component.get("dtend").dt
-                events.append({
-                    "summary": str(event_summary),
-                    "start": event_start,
-                    "end": event_end
-                })
-
-        return sorted(events, key=lambda x: x["start"])
-    except requests.RequestException as e:
+    index = get_calendar_feed().get_index()
+    if index is None:
         return [{"summary": "Fehler beim Laden des Kalenders", "start": None, "end": None}]
+    if days is None:
+        return index.events
+    return index.upcoming(days)
+
+def find_appointment_slots(extra_busy=(), now=None):
+    """
+    Proposes viewing appointments: merges the ICS events with `extra_busy`
+    intervals (e.g. from fetch_google_busy) and returns the top N free
+    slots within the horizon from AVAILABILITY_SETTINGS.
+    """
+    settings = AVAILABILITY_SETTINGS
+    # Never propose a meeting that starts right away; the rounded start
+    # also keeps the proposals identical across reruns.
+    now = earliest_start(now or datetime.now(), settings["lead_minutes"], settings["round_minutes"])
+    end = now + timedelta(days=settings["horizon_days"])
+
+    busy = list(extra_busy)
+    index = get_calendar_feed().get_index()
+    if index is not None:
+        busy.extend((e["start"], e["end"]) for e in index.between(now, end))
+
+    windows = working_windows(now, end, settings["work_start"], settings["work_end"], settings["workdays"])
+    free = find_free_slots(busy, windows, settings["slot_minutes"], settings["travel_buffer_minutes"])
+    return propose_slots(free, settings["top_n"], settings["slot_minutes"], settings["round_minutes"])
 
 ##################################################################
 # Google Calendar read/write (optional)
 ##################################################################
 
+@lru_cache(maxsize=None)
+def get_calendar_client():
+    """The process-wide Google Calendar client (cached credentials and service)."""
+    from calendar_client import CalendarClient
+    return CalendarClient(
+        token_path=GOOGLE_CALENDAR_SETTINGS["token_path"],
+        credentials_path=GOOGLE_CALENDAR_SETTINGS["credentials_path"],
+        refresh_margin=GOOGLE_CALENDAR_SETTINGS["refresh_margin"]
+    )
+
 def get_gcalendar_service():
     """
     Returns an authenticated Google Calendar service object using OAuth2 credentials.
-    Requires 'credentials.json' in your working directory.
+    Requires 'credentials.json' in your working directory. The service is
+    built once and kept by get_calendar_client().
     """
-    SCOPES = ["https://www.googleapis.com/auth/calendar"]
-    creds = None
-
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+    return get_calendar_client().service()
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(google.auth.transport.requests.Request())
-        else:
-            from google_auth_oauthlib.flow import InstalledAppFlow
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=8080)
-
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-
-    service = build("calendar", "v3", credentials=creds)
-    return service
+def fetch_google_busy(start, end):
+    """
+    Returns the busy (start, end) intervals of the primary Google Calendar
+    between `start` and `end` as naive local datetimes (free/busy query).
+    """
+    busy = get_calendar_client().freebusy(start, end)
+    return [
+        (
+            datetime.fromisoformat(b["start"]).astimezone().replace(tzinfo=None),
+            datetime.fromisoformat(b["end"]).astimezone().replace(tzinfo=None)
+        )
+        for b in busy
+    ]
 
 def add_event_to_google_calendar(summary, start_datetime, end_datetime):
     """
     Adds a new event to the user's Google Calendar (write access).
     """
+    return add_events_to_google_calendar([(summary, start_datetime, end_datetime)])[0]
+
+def add_events_to_google_calendar(events):
+    """
+    Adds several (summary, start_datetime, end_datetime) events in one
+    batch request. Returns the created events in order, or {"error": ...}
+    dicts for events that could not be created.
+    """
+    from googleapiclient.errors import HttpError
+
     try:
-        service = get_gcalendar_service()
-        event = {
-            "summary": summary,
-            "start": {"dateTime": start_datetime.isoformat()},
-            "end": {"dateTime": end_datetime.isoformat()},
-        }
-        created_event = service.events().insert(calendarId="primary", body=event).execute()
-        return created_event
+        return get_calendar_client().insert_events(events)
     except HttpError as error:
-        return {"error": f"An error occurred: {error}"}
+        return [{"error": f"An error occurred: {error}"}] * len(events)
 
 
 ##################################################################
 # Hotel search (Google Places)
 ##################################################################
 
-def search_hotels_near_location(location):
+@lru_cache(maxsize=None)
+def get_hotel_lookup():
+    """The process-wide cached hotel search, created on first use."""
+    from http_client import get_client
+    return HotelLookup(
+        PLACES_SETTINGS["cache_path"],
+        api_key=PLACES_SETTINGS["api_key"],
+        base_url=PLACES_SETTINGS["base_url"],
+        client=get_client(),
+        ttl=PLACES_SETTINGS["ttl"],
+        token_ttl=PLACES_SETTINGS["token_ttl"]
+    )
+
+def search_hotels_near_location(location, page=0):
     """
     Uses Google Places to find hotels near 'location'.
-    Make sure to enable the Places API and use your key below.
+    Make sure to enable the Places API and set your key in PLACES_SETTINGS.
+    Results are cached per area (postal code) by get_hotel_lookup(); `page`
+    selects further result pages, which are fetched only when requested.
     """
-    api_key = "YOUR_GOOGLE_API_KEY_HERE"
-    url = (
-        "https://maps.googleapis.com/maps/api/place/textsearch/json"
-        f"?query=hotels+in+{location}&key={api_key}"
-    )
     try:
-        response = requests.get(url)
-        data = response.json()
-        hotels = []
-        if data.get("results"):
-            for r in data["results"]:
-                name = r.get("name")
-                address = r.get("formatted_address")
-                rating = r.get("rating", "Keine Bewertung")
-                hotels.append({"name": name, "address": address, "rating": rating})
-
+        hotels, _ = get_hotel_lookup().page(location, page)
         return hotels
     except Exception as e:
         return [{"error": f"Fehler bei der Hotelsuche: {e}"}]